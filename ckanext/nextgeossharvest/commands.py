@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import sys
+
+from sqlalchemy import and_
+from sqlalchemy.sql import select
+
+from ckan.lib.cli import CkanCommand
+
+log = logging.getLogger(__name__)
+
+
+class DatasetExtraCommand(CkanCommand):
+    """
+    Manage the dataset_extra extras of the harvested datasets.
+
+    Usage:
+
+        nextgeoss-extras migrate [--batch-size=N]
+            Rewrite the dataset_extra extras that are still stored in the
+            legacy repr() format as JSON, N rows at a time (default: 1000).
+            It can be interrupted and run again. The rows that cannot be
+            converted are logged and left as they are.
+    """
+
+    summary = __doc__.split('\n')[1].strip()
+    usage = __doc__
+    max_args = 1
+    min_args = 1
+
+    def __init__(self, name):
+        super(DatasetExtraCommand, self).__init__(name)
+        self.parser.add_option('--batch-size', dest='batch_size', type='int',
+                               default=1000,
+                               help='number of rows per transaction')
+
+    def command(self):
+        self._load_config()
+        cmd = self.args[0]
+        if cmd == 'migrate':
+            self.migrate(self.options.batch_size)
+        else:
+            print 'Command {} not recognized'.format(cmd)
+            sys.exit(1)
+
+    def migrate(self, batch_size):
+        from ckan import model
+        from ckanext.nextgeossharvest.lib import extras_codec
+
+        table = model.package_extra_table
+        last_id = u''
+        migrated = 0
+        skipped = 0
+        while True:
+            # Page on the id, which stays fast however far we are
+            query = select([table.c.id, table.c.value]) \
+                .where(and_(table.c.key == u'dataset_extra',
+                            table.c.id > last_id)) \
+                .order_by(table.c.id) \
+                .limit(batch_size)
+            rows = model.Session.execute(query).fetchall()
+            if not rows:
+                break
+            for id_, value in rows:
+                if extras_codec.version(value) == extras_codec.LEGACY_VERSION:
+                    try:
+                        value = extras_codec.encode(extras_codec.decode(value))
+                    except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+                        # e.g. byte strings that are not UTF-8, which JSON
+                        # cannot hold
+                        log.warning('Cannot migrate the dataset_extra of '
+                                    'package extra {}: {}'.format(id_, e))
+                        skipped += 1
+                        continue
+                    model.Session.execute(table.update()
+                                          .where(table.c.id == id_)
+                                          .values(value=value))
+                    migrated += 1
+            model.Session.commit()
+            last_id = rows[-1][0]
+            print '{} extras migrated, {} skipped'.format(migrated, skipped)
+
+        print 'Done.'
@@ -5,11 +5,8 @@ import logging
 import json
 import uuid
 from datetime import datetime, timedelta
-import time
 from bs4 import BeautifulSoup
-from sqlalchemy import desc
 
-import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import Timeout
 
@@ -32,6 +29,8 @@ log = logging.getLogger(__name__)
 
 URL_TEMPLATE = 'http://www.vito-eodata.be/openSearch/findProducts.atom?collection=urn:eop:VITO:CGS_S1_{}&start={}&end={}&count=500'  # noqa: E501
 DATE_FORMAT = '%Y-%m-%d'
+# The dc:date range of an entry, for _get_checkpoint_cursor()
+DC_DATE = re.compile(r'<dc:date>([^<]*)</dc:date>')
 
 log = logging.getLogger(__name__)
 
@@ -140,6 +139,9 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                  "SLC_L1", "GRD_L1" or "GRD_SIGMA0_L1"''')
             if type(config_obj.get('make_private', False)) != bool:
                 raise ValueError('make_private must be true or false')
+            for key in ['parse_at_gather', 'keep_raw_content']:
+                if key in config_obj and not isinstance(config_obj[key], bool):
+                    raise ValueError('{} must be boolean'.format(key))
             if 'groups' in config_obj:
                 if not isinstance(config_obj['groups'], list):
                     raise ValueError('groups must be like [{"name":"group-id"}]')  # noqa E501
@@ -250,30 +252,37 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                         ids.append(_id)
             else:
                 log.info('No more datasets to collect until the current day')  # noqa: E501
+                self._flush_harvest_objects()
                 return ids
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
             timestamp = str(datetime.utcnow())
             self.harvester_logger.info(harvester_msg.format(self.provider, timestamp, self.job.id, len(ids), 0))  # noqa E501
+        self._flush_harvest_objects()
         return ids
 
+    def _get_checkpoint_cursor(self, harvest_object):
+        """The restart date is the end of the dc:date range of the product."""
+        record = self._get_record(harvest_object.content)
+        if record is not None:
+            date_range_end = record['timerange_end']
+        else:
+            # The import stage runs this for every object, so look for the
+            # date instead of parsing the whole entry again.
+            date_range = DC_DATE.search(harvest_object.content)
+            if date_range is None:
+                return None
+            date_range_end = date_range.group(1).split('/')[1]
+        return {'restart_date': date_range_end.split('T')[0]}
+
     def _get_last_harvesting_date(self, source_id):
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))  # noqa E501
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            soup = BeautifulSoup(last_object.content)
-            restart_date = soup.find('dc:date').string.split('/')[1].split('T')[0]  # noqa: E501
+        restart_date = self._get_checkpoint(source_id).get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d')
         else:
             return None
 
-    def _get_imported_harvest_objects_by_source(self, source_id):
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
-
     def _generate_harvest_url(self, collection, start_date, end_date):
         date_format = '%Y-%m-%d'
         return URL_TEMPLATE.format(collection,
@@ -427,7 +436,8 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
         log.info('getting %s', url)
         if auth:
             kwargs['auth'] = HTTPBasicAuth(*auth)
-        response = requests.get(url, **kwargs)
+        # Within the provider's rate limit, retrying while it throttles us
+        response = self._get_with_backoff(url, **kwargs)
         response.raise_for_status()
         return response
 
@@ -473,9 +483,6 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
         """
         retrieved_entries = 0
         while retrieved_entries < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
-
             # Make a request to the website
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
@@ -515,11 +522,6 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
             # Get the URL for the next loop, or None to break the loop
             harvest_url = self._get_next_url(soup)
             log.debug('next url: %s', harvest_url)
-
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
             yield soup
 
     def _parse_items_per_page(self, open_search_page):
@@ -566,7 +568,6 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                 .first()  # noqa: E712
             if previous_obj:
                 previous_obj.current = False
-                previous_obj.save()
 
             if update_all:
                 log.debug('{} already exists and will be updated.'.format(
@@ -579,12 +580,12 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                         HOExtra(key='status', value=status),
                         HOExtra(key='restart_date', value=entry_restart_date)
                     ])
-                obj.content = entry['content']
+                obj.content = self._get_gather_content(entry['content'],
+                                                       status)
                 obj.package = package
-                obj.save()
-                return obj.id
-            elif self.flagged_extra and not self._get_package_extra(
-                    package.as_dict(), self.flagged_extra):  # noqa: E501
+                return self._save_harvest_object(obj)
+            elif self.flagged_extra and not self._get_packages_with_extra(
+                    [package.id], self.flagged_extra):  # noqa: E501
                 log.debug('{} already exists and will be extended.'.format(
                     entry_name))  # noqa: E501
                 status = 'change'
@@ -595,10 +596,10 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                         HOExtra(key='status', value=status),
                         HOExtra(key='restart_date', value=entry_restart_date)
                     ])
-                obj.content = entry['content']
+                obj.content = self._get_gather_content(entry['content'],
+                                                       status)
                 obj.package = package
-                obj.save()
-                return obj.id
+                return self._save_harvest_object(obj)
             else:
                 log.debug(
                     '{} will not be updated.'.format(entry_name))  # noqa: E501  # noqa: E501
@@ -617,7 +618,6 @@ class CGSHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                     HOExtra(key='status', value='new'),
                     HOExtra(key='restart_date', value=entry_restart_date)
                 ])
-            obj.content = entry['content']
+            obj.content = self._get_gather_content(entry['content'])
             obj.package = None
-            obj.save()
-            return obj.id
+            return self._save_harvest_object(obj)
@@ -20,8 +20,6 @@ from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 
-from sqlalchemy import desc
-
 
 def parse_filename(url):
     fname = url.split('/')[-1]
@@ -167,7 +165,8 @@ class CMEMSHarvester(NextGEOSSHarvester, CMEMSBase):
             ids.append(self._gather_object(job,
                                            ftp_url, size,
                                            start_date, forecast_date))
-        
+
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
@@ -177,12 +176,16 @@ class CMEMSHarvester(NextGEOSSHarvester, CMEMSBase):
         objects = self._get_imported_harvest_objects_by_source(source_id)
         return set(obj.guid for obj in objects)
 
+    def _get_checkpoint_cursor(self, harvest_object):
+        """The restart date is kept in the content of the objects."""
+        restart_date = json.loads(harvest_object.content).get('restart_date')
+        if restart_date is None:
+            return None
+        return {'restart_date': restart_date}
+
     def _get_last_harvesting_date(self, source_id):
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            restart_date = json.loads(last_object.content)['restart_date']
+        restart_date = self._get_checkpoint(source_id).get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d %H:%M:%S')
         else:
             return None
@@ -228,8 +231,7 @@ class CMEMSHarvester(NextGEOSSHarvester, CMEMSBase):
                             extras=extras,
                             content=content)
         obj.package = package
-        obj.save()
-        return obj.id
+        return self._save_harvest_object(obj)
 
 
 def create_ftp_source(source_type):
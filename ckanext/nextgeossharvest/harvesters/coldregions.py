@@ -189,7 +189,7 @@ def _get_extras(extras_dict):
     """Return a list of CKAN extras."""
     skip = {'id', 'title', 'tags', 'status', 'notes', 'name', 'resource', 'groups'}  # noqa: E501
     extras_tmp = [{'key': key, 'value': value} for key, value in extras_dict.items() if key not in skip]
-    extras = [{'key': 'dataset_extra', 'value': str(extras_tmp)}]
+    extras = [{'key': 'dataset_extra', 'value': json.dumps(extras_tmp)}]
 
     return extras
 
@@ -18,7 +18,6 @@ from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 
 import base64
-import requests
 from bs4 import BeautifulSoup as Soup
 
 log = logging.getLogger(__name__)
@@ -114,7 +113,7 @@ class DEIMOSIMGHarvester(NextGEOSSHarvester, DEIMOSIMGBase):
         metadata_url = base_url.format(raw_identifier)
 
         try:
-            r = requests.get(metadata_url)
+            r = self._get_http_session().get(metadata_url)
         except Exception:
             return metadata
 
@@ -179,8 +178,7 @@ class DEIMOSIMGHarvester(NextGEOSSHarvester, DEIMOSIMGBase):
 
                 obj.content = content
                 obj.package = package
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
             elif not package:
                 log.debug('{} has not been harvested before. Creating a new harvest object.'.format(identifier))  # noqa: E501
@@ -195,8 +193,10 @@ class DEIMOSIMGHarvester(NextGEOSSHarvester, DEIMOSIMGBase):
 
                 obj.content = content
                 obj.package = None
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
+
+        # Commit the harvest objects at once
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | Job ID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
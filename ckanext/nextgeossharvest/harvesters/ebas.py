@@ -1,19 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import time
 import json
 from datetime import datetime
 
-import requests
 from requests.exceptions import Timeout
 
 from bs4 import BeautifulSoup as Soup
 
 import uuid
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -36,6 +32,8 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
     """A Harvester for EBAS Products."""
     implements(IHarvester)
 
+    checkpoint_keys = ('restart_date', 'restart_token')
+
     def info(self):
         return {
             'name': 'ebas',
@@ -91,27 +89,13 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the update time
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries, it also uses the resumption token to cycle internally
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object,
-                                                      'restart_date', '*')
-                restart_token = self._get_object_extra(last_object,
-                                                       'restart_token', None)
-            except IndexError:
-                restart_date = '*'
-                restart_token = None
-        else:
-            restart_date = '*'
-            restart_token = None
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
+        restart_token = checkpoint.get('restart_token', None)
 
         log.debug('Restart date is {}'.format(restart_date))
         log.debug('Restart token is {}'.format(restart_token))
@@ -302,14 +286,14 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
         new_counter = 0
         update_counter = 0
         while len(ids) < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
 
             # Make a request to the website
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
             try:
-                r = requests.get(harvest_url,
+                r = self._get_http_session().get(harvest_url,
                                  verify=False, timeout=timeout)
             except Timeout as e:
                 self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
@@ -360,7 +344,6 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                         .first()  # noqa: E712
                     if previous_obj:
                         previous_obj.current = False
-                        previous_obj.save()
 
                     if self.update_all:
                         log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -379,8 +362,7 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                                                 value=entry_restart_token)])
                     obj.content = entry['content']
                     obj.package = package
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
 
                 elif not package:
                     # It's a product we haven't harvested before.
@@ -395,13 +377,12 @@ class EBASHarvester(EBASbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                     new_counter += 1
                     obj.content = entry['content']
                     obj.package = None
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
+
+            # Commit the harvest objects of the page at once
+            self._flush_harvest_objects(final=False)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -15,6 +15,8 @@ class EBVSHarvester(EBVSBase, OpenSearchHarvester, NextGEOSSHarvester):
     """
     implements(IHarvester)
 
+    supports_bulk_import = True
+
     def info(self):
         return {
             'name': 'ebvs',
@@ -33,6 +35,7 @@ class EBVSHarvester(EBVSBase, OpenSearchHarvester, NextGEOSSHarvester):
                     raise ValueError('make_private must be true or false')
             else:
                 raise ValueError('make_private must be true or false')
+            self._validate_bulk_import_config(config_obj)
         except ValueError as e:
             raise e
 
@@ -62,6 +65,7 @@ class EBVSHarvester(EBVSBase, OpenSearchHarvester, NextGEOSSHarvester):
             if _id:
                 ids.append(_id)
 
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
@@ -99,8 +103,9 @@ class EBVSHarvester(EBVSBase, OpenSearchHarvester, NextGEOSSHarvester):
         # Perform the necessary harvester housekeeping
         self._refresh_harvest_objects(harvest_object, package_id)
 
-        # Finish up
-        if status == 'unchanged':
+        # Finish up. Changed objects whose content is the same as before are
+        # flagged as unchanged by _create_or_update_dataset().
+        if self._get_object_extra(harvest_object, 'status') == 'unchanged':
             return 'unchanged'
         else:
             log.debug('Package {} was successully harvested.'
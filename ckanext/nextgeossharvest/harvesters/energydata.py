@@ -5,13 +5,10 @@ import time
 import json
 from datetime import datetime
 
-import requests
 from requests.exceptions import Timeout
 
 from bs4 import BeautifulSoup as Soup
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -98,23 +95,12 @@ class EnergyDataHarvester(EnergyDataBaseHarvester, NextGEOSSHarvester,
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the update time
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries, it also uses the resumption token to cycle internally
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object,
-                                                      'restart_date', '*')
-            except IndexError:
-                restart_date = '*'
-        else:
-            restart_date = '*'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
 
         log.debug('Restart date is {}'.format(restart_date))
 
@@ -235,7 +221,7 @@ class EnergyDataHarvester(EnergyDataBaseHarvester, NextGEOSSHarvester,
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
         try:
-            r = requests.get(harvest_url,
+            r = self._get_http_session().get(harvest_url,
                                 verify=False, timeout=timeout)
         except Timeout as e:
             self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
@@ -286,7 +272,6 @@ class EnergyDataHarvester(EnergyDataBaseHarvester, NextGEOSSHarvester,
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -302,8 +287,7 @@ class EnergyDataHarvester(EnergyDataBaseHarvester, NextGEOSSHarvester,
                                             value=entry_restart_date)])
                 obj.content = json.dumps(entry['content'])
                 obj.package = package
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
             elif not package:
                 # It's a product we haven't harvested before.
@@ -316,8 +300,10 @@ class EnergyDataHarvester(EnergyDataBaseHarvester, NextGEOSSHarvester,
                 new_counter += 1
                 obj.content = json.dumps(entry['content'])
                 obj.package = None
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
+
+        # Commit the harvest objects at once
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
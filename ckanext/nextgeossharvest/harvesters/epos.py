@@ -1,19 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import time
 import json
 from datetime import datetime
 
-import requests
 from requests.exceptions import Timeout
 
 from bs4 import BeautifulSoup as Soup
 
 import uuid
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -36,6 +32,8 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
     """A Harvester for EPOS Sat Products."""
     implements(IHarvester)
 
+    checkpoint_keys = ('restart_page',)
+
     def info(self):
         return {
             'name': 'epossat',
@@ -100,23 +98,12 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the ingestion timestamp
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_page extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_page extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_page = self._get_object_extra(last_object,
-                                                      'restart_page', '1')
-            except IndexError:
-                restart_page = '1'
-        else:
-            restart_page = '1'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_page = checkpoint.get('restart_page', '1')
         log.debug('Restart page is {}'.format(restart_page))
 
         start_date = self.source_config.get('start_date', restart_page)
@@ -234,14 +221,14 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
         new_counter = 0
 
         while len(ids) < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
 
             # Make a request to the website
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
             try:
-                r = requests.get(harvest_url,
+                r = self._get_http_session().get(harvest_url,
                                  verify=False, timeout=timeout)
             except Timeout as e:
                 self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
@@ -289,7 +276,6 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                         .first()  # noqa: E712
                     if previous_obj:
                         previous_obj.current = False
-                        previous_obj.save()
 
                     # If the package already exists it
                     # will not create a new one
@@ -307,8 +293,7 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                                                 value=entry_restart_page)])
                     obj.content = entry['content']
                     obj.package = package
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
 
                 else:
                     # It's a product we haven't harvested before.
@@ -321,13 +306,12 @@ class EPOSHarvester(EPOSbaseHarvester, NextGEOSSHarvester, HarvesterBase):
                     new_counter += 1
                     obj.content = entry['content']
                     obj.package = None
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
+
+            # Commit the harvest objects of the page at once
+            self._flush_harvest_objects(final=False)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -4,13 +4,9 @@ import logging
 import json
 from datetime import datetime
 
-from sqlalchemy import desc
-
 from ckan.common import config
-from ckan.model import Session
 from ckan.plugins.core import implements
 
-from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.interfaces import IHarvester
 
 from ckanext.nextgeossharvest.lib.esa_base import SentinelHarvester
@@ -72,11 +68,22 @@ class ESAHarvester(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
                      OL_2_LRR___, SR_1_SRA___, SR_1_SRA_A_, SR_1_SRA_BS, \
                      SR_2_LAN___, SL_1_RBT___, SL_2_LST___, SY_2_SYN___, \
                      SY_2_V10___, SY_2_VG1___, SY_2_VGP___)')  # noqa: E501
-            for key in ['update_all', 'skip_raw', 'multiple_sources']:
+            if 'backfill_windows' in config_obj:
+                windows = config_obj['backfill_windows']
+                if not isinstance(windows, int) or windows < 1:
+                    raise ValueError('backfill_windows must be a positive integer')  # noqa: E501
+                if windows > 1 and not ('start_date' in config_obj and
+                                        'end_date' in config_obj):
+                    raise ValueError('backfill_windows requires start_date and end_date')  # noqa: E501
+            for key in ['update_all', 'skip_raw', 'multiple_sources',
+                        'parse_at_gather', 'keep_raw_content',
+                        'skip_unchanged']:
                 if key in config_obj and not isinstance(config_obj[key], bool):
                     raise ValueError('{} must be boolean'.format(key))
             if type(config_obj.get('make_private', False)) != bool:
                 raise ValueError('make_private must be true or false')
+            self._validate_footprint_config(config_obj)
+            self._validate_rate_limit_config(config_obj)
 
         except ValueError as e:
             raise e
@@ -95,23 +102,12 @@ class ESAHarvester(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the ingestion timestamp
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object,
-                                                      'restart_date', '*')
-            except IndexError:
-                restart_date = '*'
-        else:
-            restart_date = '*'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
         log.debug('Restart date is {}'.format(restart_date))
 
         if restart_date == '*':
@@ -206,6 +202,28 @@ class ESAHarvester(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
             self.provider_logger = self.make_provider_logger()
         self.provider = source
 
+        # A backfill splits the date range into windows that are crawled
+        # at the same time, each one restarting from its own checkpoint
+        windows = self.source_config.get('backfill_windows', 1)
+        if windows > 1:
+            harvest_urls = {}
+            for window_start, window_end, closing in self._get_date_windows(
+                    self.source_config['start_date'],
+                    self.source_config['end_date'], windows):
+                window_checkpoint = self._get_checkpoint(self.job.source_id,
+                                                         window_start)
+                window_range = '[{} TO {}{}'.format(
+                    window_checkpoint.get('restart_date', window_start),
+                    window_end, closing)
+                harvest_urls[window_start] = url_template.format(
+                    base_url=base_url, date_range=window_range, aoi=aoi,
+                    product_type=product_type, skip_raw=skip_raw, limit=limit)
+            log.debug('Harvest URLs are {}'.format(harvest_urls))
+
+            ids = self._crawl_windows(harvest_urls, limit, timeout, username,
+                                      password)
+            return ids
+
         # This can be a hook
         ids = self._crawl_results(harvest_url, limit, timeout, username,
                                   password)
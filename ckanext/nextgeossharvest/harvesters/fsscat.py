@@ -9,9 +9,7 @@ from ftplib import FTP
 from StringIO import StringIO
 
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import desc
 
-from ckan.model import Session
 from ckan.plugins.core import implements
 from ckanext.harvest.interfaces import IHarvester
 from ckanext.harvest.model import HarvestObject
@@ -91,6 +89,7 @@ class FSSCATHarvester(NextGEOSSHarvester, FSSCATBase):
                 raise ValueError('update_all must be true or false')
             if type(config_obj.get('max_dataset', 100)) != int:
                 raise ValueError('max_dataset must be an integer')
+            self._validate_footprint_config(config_obj)
         except ValueError as e:
             raise e
 
@@ -151,30 +150,30 @@ class FSSCATHarvester(NextGEOSSHarvester, FSSCATBase):
             ids.append(self._gather_object(harvest_job, product, resources,
                                            manifest_content, last_date))
 
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
         return True
 
+    def _get_checkpoint_cursor(self, harvest_object):
+        """The restart date is kept in the content of the objects."""
+        restart_date = json.loads(harvest_object.content).get('restart_date')
+        if restart_date is None:
+            return None
+        return {'restart_date': restart_date}
+
     def _get_last_harvesting_date(self, source_id):
         """
         Return the ingestion date of the last product harvested or none
         if no previous harvesting job
         """
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            restart_date = json.loads(last_object.content)['restart_date']
+        restart_date = self._get_checkpoint(source_id).get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d')
         else:
             return None
 
-    def _get_imported_harvest_objects_by_source(self, source_id):
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
-
     def _get_config(self, harvest_job):
         return json.loads(harvest_job.source.config)
 
@@ -198,8 +197,7 @@ class FSSCATHarvester(NextGEOSSHarvester, FSSCATBase):
                             extras=extras,
                             content=content)
         obj.package = package
-        obj.save()
-        return obj.id
+        return self._save_harvest_object(obj)
 
 
 def create_ftp_source(ftp_info):
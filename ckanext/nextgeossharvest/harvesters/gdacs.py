@@ -13,7 +13,6 @@ from ckanext.harvest.model import HarvestObject
 from ckanext.nextgeossharvest.lib.gdacs_base import GDACSBase
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
-from sqlalchemy import desc
 from bs4 import BeautifulSoup
 import requests
 
@@ -119,7 +118,7 @@ class GDACSHarvester(NextGEOSSHarvester, GDACSBase):
     def _gather(self, job, start_date, end_date, source_id, config):
         data_type = config['data_type']
         request_check = config['request_check']
-        http_source = create_http_source(data_type)
+        http_source = create_http_source(data_type, self._get_http_session())
         existing_files = (
             http_source._get_http_urls(start_date, end_date)
         )
@@ -136,6 +135,7 @@ class GDACSHarvester(NextGEOSSHarvester, GDACSBase):
                 start_date = http_source.parse_date(http_url)
                 assert start_date
                 ids.append(self._gather_object(job, http_url, start_date))
+        self._flush_harvest_objects()
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
             timestamp = str(datetime.utcnow())
@@ -149,12 +149,16 @@ class GDACSHarvester(NextGEOSSHarvester, GDACSBase):
         objects = self._get_imported_harvest_objects_by_source(source_id)
         return set(obj.guid for obj in objects)
 
+    def _get_checkpoint_cursor(self, harvest_object):
+        """The restart date is kept in the content of the objects."""
+        restart_date = json.loads(harvest_object.content).get('restart_date')
+        if restart_date is None:
+            return None
+        return {'restart_date': restart_date}
+
     def _get_last_harvesting_date(self, source_id):
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            restart_date = json.loads(last_object.content)['restart_date']
+        restart_date = self._get_checkpoint(source_id).get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d %H:%M:%S')
         else:
             return None
@@ -196,17 +200,18 @@ class GDACSHarvester(NextGEOSSHarvester, GDACSBase):
                             extras=extras,
                             content=content)
         obj.package = package
-        obj.save()
-        return obj.id
+        return self._save_harvest_object(obj)
 
 
-def create_http_source(data_type):
-    return HttpSource(**HTTP_SOURCE_CONF[data_type])
+def create_http_source(data_type, session=None):
+    return HttpSource(session=session, **HTTP_SOURCE_CONF[data_type])
 
 
 class HttpSource(object):
 
-    def __init__(self, domain, path, fname_pattern, date_dir=True):
+    def __init__(self, domain, path, fname_pattern, date_dir=True,
+                 session=None):
+        self.session = session or requests.Session()
         self.fname_pattern = re.compile(fname_pattern)
         self.domain = domain
         self.path = path
@@ -219,7 +224,7 @@ class HttpSource(object):
         ext = "tif"
         for directory in self._get_http_directories(start_date, end_date):
             http_url_date = http_url_complete + directory
-            page = requests.get(http_url_date).text
+            page = self.session.get(http_url_date).text
             soup = BeautifulSoup(page, 'html.parser')
             dir_list = [http_url + node.get('href') for node in soup.find_all('a') if node.get('href').endswith(ext)]  # noqa: E501
             http_urls = http_urls + dir_list
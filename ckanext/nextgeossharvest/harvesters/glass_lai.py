@@ -15,6 +15,8 @@ class GLASS_LAI_Harvester(GLASS_LAI_Base, OpenSearchHarvester, NextGEOSSHarveste
     """
     implements(IHarvester)
 
+    supports_bulk_import = True
+
     def info(self):
         return {
             'name': 'glass_lai',
@@ -35,6 +37,7 @@ class GLASS_LAI_Harvester(GLASS_LAI_Base, OpenSearchHarvester, NextGEOSSHarveste
                     raise ValueError('make_private must be true or false')
             else:
                 raise ValueError('make_private must be true or false')
+            self._validate_bulk_import_config(config_obj)
         except ValueError as e:
             raise e
 
@@ -62,6 +65,7 @@ class GLASS_LAI_Harvester(GLASS_LAI_Base, OpenSearchHarvester, NextGEOSSHarveste
             if _id:
                 ids.append(_id)
 
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
@@ -99,8 +103,9 @@ class GLASS_LAI_Harvester(GLASS_LAI_Base, OpenSearchHarvester, NextGEOSSHarveste
         # Perform the necessary harvester housekeeping
         self._refresh_harvest_objects(harvest_object, package_id)
 
-        # Finish up
-        if status == 'unchanged':
+        # Finish up. Changed objects whose content is the same as before are
+        # flagged as unchanged by _create_or_update_dataset().
+        if self._get_object_extra(harvest_object, 'status') == 'unchanged':
             return 'unchanged'
         else:
             log.debug('Package {} was successully harvested.'
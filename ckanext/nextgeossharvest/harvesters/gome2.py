@@ -7,14 +7,10 @@ from datetime import datetime, timedelta
 
 from ckan.plugins.core import implements
 
-from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.interfaces import IHarvester
 from ckanext.nextgeossharvest.lib.gome2_base import GOME2Base
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 
-from ckan.model import Session
-from sqlalchemy import desc
-
 
 class GOME2Harvester(GOME2Base,
                      NextGEOSSHarvester):
@@ -23,6 +19,8 @@ class GOME2Harvester(GOME2Base,
     '''
     implements(IHarvester)
 
+    supports_bulk_import = True
+
     def info(self):
         return {
             'name': 'gome2',
@@ -71,6 +69,8 @@ class GOME2Harvester(GOME2Base,
             if type(config_obj.get('time_interval', 15)) != int:
                 raise ValueError('time_interval must be an int')
 
+            self._validate_bulk_import_config(config_obj)
+
         except ValueError as e:
             raise e
 
@@ -131,14 +131,9 @@ class GOME2Harvester(GOME2Base,
         return True
 
     def get_last_harvesting_date(self):
-        last_object = Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == self.job.source_id,
-            HarvestObject.import_finished is not None).\
-            order_by(desc(HarvestObject.import_finished)).\
-            limit(1).first()
-        if last_object is not None:
-            restart_date = self._get_object_extra(last_object,
-                                                  'restart_date')
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d')
         else:
             return None
@@ -3,25 +3,23 @@
 import logging
 import json
 import os
-import time
 from datetime import datetime
+from itertools import izip, repeat
 
 from shapely.geometry import Polygon
-import requests
 from requests.exceptions import Timeout
 import jmespath
 
-from ckan import model
 from ckan import logic
 from ckan.common import config
-from ckan.logic import ValidationError
-from ckan.lib.navl.validators import not_empty
+from ckan.logic import NotFound, ValidationError
 from ckan.plugins.core import implements
 
 from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 from ckanext.harvest.interfaces import IHarvester
 
+from ckanext.nextgeossharvest.lib import prefetch
 from ckanext.nextgeossharvest.lib.esa_base import SentinelHarvester
 from ckanext.nextgeossharvest.lib.opensearch_base import OpenSearchHarvester
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
@@ -41,6 +39,9 @@ if log_dir:
 else:
     itag_logger = None
 
+# Number of untagged datasets read from Solr at once
+DEFAULT_PAGE_SIZE = 1000
+
 
 class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
     """
@@ -48,6 +49,9 @@ class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
     """
     implements(IHarvester)
 
+    # The fetch consumers share the requests to iTag
+    shared_rate_limit = True
+
     def info(self):
         return {
             'name': 'itag_enricher',
@@ -76,6 +80,18 @@ class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
                 datasets_per_job = config_obj['datasets_per_job']
                 if not isinstance(datasets_per_job, int) and not datasets_per_job > 0:  # noqa: E501
                     raise ValueError('datasets_per_job must be a positive integer')  # noqa: E501
+            if 'page_size' in config_obj:
+                page_size = config_obj['page_size']
+                if not isinstance(page_size, int) or page_size < 1:
+                    raise ValueError('page_size must be a positive integer')  # noqa: E501
+            for key in ['batch_fetch', 'shared_rate_limit']:
+                if key in config_obj and not isinstance(config_obj[key], bool):
+                    raise ValueError('{} must be boolean'.format(key))
+            if 'fetch_workers' in config_obj:
+                workers = config_obj['fetch_workers']
+                if not isinstance(workers, int) or workers < 1:
+                    raise ValueError('fetch_workers must be a positive integer')  # noqa: E501
+            self._validate_rate_limit_config(config_obj)
 
         except ValueError as e:
             raise e
@@ -91,124 +107,156 @@ class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
 
         self._set_source_config(self.job.source.config)
 
-        context = {'model': model,
-                   'session': model.Session,
-                   'user': self._get_user_name()}
+        context = self._get_context()
 
-        org_id = model.Package.get(harvest_job.source.id).owner_org
-        organization = logic.get_action('organization_show')(context, {'id': org_id})  # noqa: E501
+        organization = self._get_source_owner(harvest_job.source,
+                                              harvest_job.id)['organization']
 
         # Exclude Sentinel-3 because it seems like iTag can't handle the curved
         # footprints.
-        filter_query = '+organization:{} -itag:tagged -FamilyName:Sentinel-3'.format(organization['name'])  # noqa: E501
+        filter_query = '+organization:{} -itag:tagged -FamilyName:Sentinel-3'.format(organization)  # noqa: E501
 
         ids = []
 
-        # We'll limit this to 10 datasets per job so that results appear
-        # faster
-        start = 0
-        rows = self.source_config.get('datasets_per_job', 10)
-        untagged = logic.get_action('package_search')(context,
-                                                      {'fq': filter_query,
-                                                       'rows': rows,
-                                                       'start': start})
-        results = untagged['results']
-        for result in results:
-            spatial = None
-            for i in result['extras']:
-                if i['key'] == 'spatial':
-                    spatial = i['value']
-            if spatial:
-                obj = HarvestObject(guid=result['id'], job=self.job,
-                                    extras=[HOExtra(key='status', value='change'),  # noqa: E501
-                                            HOExtra(key='spatial', value=spatial),  # noqa: E501
-                                            HOExtra(key='package', value=json.dumps(result))])  # noqa: E501
-                obj.save()
-                ids.append(obj.id)
-
+        # We'll limit this to 10 datasets per job by default so that results
+        # appear faster
+        limit = self.source_config.get('datasets_per_job', 10)
+        page_size = self.source_config.get('page_size', DEFAULT_PAGE_SIZE)
+        results = list(self._get_untagged(context, filter_query, limit,
+                                          page_size))
+
+        # In batch mode, the footprints are tagged here, several at once,
+        # and the fetch stage only retries the ones that failed.
+        if self.source_config.get('batch_fetch', False):
+            workers = self.source_config.get('fetch_workers',
+                                             prefetch.DEFAULT_WORKERS)
+            responses = prefetch.ordered_map(self._request_result_tags,
+                                             results, workers)
+        else:
+            responses = repeat((None, None))
+
+        for (package_id, spatial), (response, error) in izip(results,
+                                                             responses):
+            obj = HarvestObject(guid=package_id, job=self.job,
+                                extras=[HOExtra(key='status', value='change'),  # noqa: E501
+                                        HOExtra(key='spatial', value=spatial)])  # noqa: E501
+            if error:
+                log.warning('Could not tag {}, the fetch stage will retry: {}'
+                            .format(package_id, error))
+            obj.content = response
+            ids.append(self._save_harvest_object(obj))
+
+        self._flush_harvest_objects()
         return ids
 
+    def _get_untagged(self, context, filter_query, limit, page_size):
+        """
+        Yield the id and the footprint of up to `limit` datasets that match
+        the filter query.
+
+        Only those two fields are read from Solr, in pages of `page_size`
+        datasets. The pages are walked through by id, each one starting
+        after the last id of the previous one, so that Solr doesn't have to
+        skip over the datasets that have already been read.
+        """
+        search = logic.get_action('package_search')
+        last_id = None
+        count = 0
+        while count < limit:
+            cursor = ' +id:{{{} TO *]'.format(last_id) if last_id else ''
+            rows = min(page_size, limit - count)
+            results = search(context, {'fq': filter_query + cursor,
+                                       'fl': ['id', 'extras_spatial'],
+                                       'sort': 'id asc',
+                                       'rows': rows})['results']
+            for result in results:
+                last_id = result['id']
+                spatial = result.get('extras_spatial')
+                if spatial:
+                    count += 1
+                    yield last_id, spatial
+            if len(results) < rows:
+                break
+
     def fetch_stage(self, harvest_object):
         log = logging.getLogger(__name__ + '.fetch')
         log.debug('Starting iTag fetch for package {}'
                   .format(harvest_object.id))
 
-        # Limit requests to one per second so the server doesn't fall over.
-        start_request = time.time()
+        # Already tagged by the gather stage in batch mode
+        if harvest_object.content is not None:
+            return True
 
-        template = '{}/?taggers={}&_pretty=true&footprint={}'
         self._set_source_config(harvest_object.job.source.config)
+        response, error = self._request_tags(
+            self._get_object_extra(harvest_object, 'spatial'))
+        if error:
+            self._save_object_error(error, harvest_object, 'Fetch')
+            return False
+
+        harvest_object.content = response
+        harvest_object.save()
+
+        return True
+
+    def _request_result_tags(self, result):
+        """Query iTag for the tags of a (package_id, spatial) result."""
+        package_id, spatial = result
+        return self._request_tags(spatial)
+
+    def _request_tags(self, spatial):
+        """
+        Query iTag for the tags of a footprint, and return the response and
+        None, or None and the error message.
+
+        It does not use the database, so that the gather stage can tag
+        several footprints at once.
+        """
+        log = logging.getLogger(__name__ + '.fetch')
+        template = '{}/?taggers={}&_pretty=true&footprint={}'
         base_url = self.source_config.get('base_url')
         if base_url[-1] == '/':
             base_url = base_url[:-1]
         taggers = 'Political,Geology,Hydrology,LandCover2009'
-        spatial = json.loads(self._get_object_extra(harvest_object, 'spatial'))
+        spatial = json.loads(spatial)
         coords = Polygon([(x[0], x[1]) for x in spatial['coordinates'][0]]).wkt
         query = template.format(base_url, taggers, coords)
         timeout = self.source_config.get('timeout', 5)
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
+        # Limit the requests so the server doesn't fall over. The limit is
+        # shared by all the processes, see shared_rate_limit.
+        self._get_rate_limiter('itag').acquire()
         try:
-            r = requests.get(query, timeout=timeout)
+            r = self._get_http_session('itag').get(query, timeout=timeout)
             assert r.status_code == 200
             response = r.text
         except AssertionError as e:
-            self._save_object_error('{} error on request: {}'
-                                    .format(r.status_code, r.text),
-                                    harvest_object, 'Fetch')
             elapsed = 9999
             if itag_logger:
                 itag_logger.info(log_message.format('itag',
                                  timestamp, r.status_code, elapsed))
-            # TODO: There should be a way to limit the fetch process itself
-            # to one request per second or similar. ###########################
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
-            # End TODO ########################################################
-            return False
+            return None, '{} error on request: {}'.format(r.status_code,
+                                                          r.text)
         except Timeout as e:
-            self._save_object_error('Request timed out: {}'
-                                    .format(e),
-                                    harvest_object, 'Fetch')
             status_code = 408
             if itag_logger:
                 log.debug('logging repsonse')
                 itag_logger.info(log_message.format('itag',
                                  timestamp, status_code, timeout))
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
-            return False
+            return None, 'Request timed out: {}'.format(e)
         except Exception as e:
             message = e.message
             if not message:
                 message = repr(e)
-            self._save_object_error('Error fetching: {}'
-                                    .format(message),
-                                    harvest_object, 'Fetch')
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
-            return False
+            return None, 'Error fetching: {}'.format(message)
         if itag_logger:
             log.debug('logging repsonse')
             itag_logger.info(log_message.format('itag',
                              timestamp, r.status_code,
                              r.elapsed.total_seconds()))
 
-        harvest_object.content = response
-        harvest_object.save()
-
-        end_request = time.time()
-        request_time = end_request - start_request
-        if request_time < 1.0:
-            time.sleep(1 - request_time)
-
-        return True
+        return response, None
 
     def import_stage(self, harvest_object):
         log = logging.getLogger(__name__ + '.import')
@@ -221,7 +269,20 @@ class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
                                     harvest_object, 'Import')
             return False
 
-        package = json.loads(self._get_object_extra(harvest_object, 'package'))
+        # The objects gathered before the package was loaded here have a
+        # copy of it in their extras.
+        package = self._get_object_extra(harvest_object, 'package')
+        if package:
+            package = json.loads(package)
+        else:
+            try:
+                package = logic.get_action('package_show')(
+                    self._get_context(), {'id': harvest_object.guid})
+            except NotFound:
+                self._save_object_error('Dataset {} no longer exists'
+                                        .format(harvest_object.guid),
+                                        harvest_object, 'Import')
+                return False
 
         content = json.loads(harvest_object.content)['content']
         itag_tags = self._get_itag_tags(content)
@@ -235,18 +296,8 @@ class ITagEnricher(SentinelHarvester, OpenSearchHarvester, NextGEOSSHarvester):
         package['tags'] = self._update_tags(package['tags'], itag_tags)
         package['extras'] = self._update_extras(package['extras'], itag_extras)
 
-        context = {
-            'model': model,
-            'session': model.Session,
-            'user': self._get_user_name(),
-        }
-        package_schema = logic.schema.default_update_package_schema()
-        tag_schema = logic.schema.default_tags_schema()
-        tag_schema['name'] = [not_empty, unicode]
-        extras_schema = logic.schema.default_extras_schema()
-        package_schema['tags'] = tag_schema
-        package_schema['extras'] = extras_schema
-        context['schema'] = package_schema
+        context = self._get_context(
+            schema=self._get_package_schema('package_update'))
 
         try:
             package = logic.get_action('package_update')(context, package)
@@ -8,11 +8,8 @@ import re
 import stringcase
 from datetime import datetime, timedelta
 
-import requests
 from requests.exceptions import Timeout
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -99,25 +96,18 @@ class LandsafHarvester(LandsafBaseHarvester, NextGEOSSHarvester,
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the update time
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries, it also uses the resumption token to cycle internally
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object, 'restart_date', '*')
-                # Go one second back because "DateFrom" is exclusive
-                restart_date = datetime.strptime(restart_date, '%Y-%m-%dT%H:%M:%S') - timedelta(seconds=1)
-                restart_date = restart_date.strftime('%Y-%m-%dT%H:%M:%S')
-            except IndexError:
-                restart_date = ''
-        else:
-            restart_date = ''
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '')
+        if restart_date:
+            # Go one second back because "DateFrom" is exclusive
+            restart_date = datetime.strptime(restart_date,
+                                             '%Y-%m-%dT%H:%M:%S')
+            restart_date -= timedelta(seconds=1)
+            restart_date = restart_date.strftime('%Y-%m-%dT%H:%M:%S')
 
         log.debug('Restart date is {}'.format(restart_date))
 
@@ -236,7 +226,8 @@ class LandsafHarvester(LandsafBaseHarvester, NextGEOSSHarvester,
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
         try:
-            r = requests.get(harvest_url, verify=False, timeout=timeout)
+            r = self._get_http_session().get(harvest_url, verify=False,
+                                             timeout=timeout)
         except Timeout as e:
             self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
             status_code = 408
@@ -281,7 +272,6 @@ class LandsafHarvester(LandsafBaseHarvester, NextGEOSSHarvester,
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -297,8 +287,7 @@ class LandsafHarvester(LandsafBaseHarvester, NextGEOSSHarvester,
                                             value=entry_restart_date)])
                 obj.content = json.dumps(entry['content'])
                 obj.package = package
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
             elif not package:
                 # It's a product we haven't harvested before.
@@ -311,8 +300,10 @@ class LandsafHarvester(LandsafBaseHarvester, NextGEOSSHarvester,
                 new_counter += 1
                 obj.content = json.dumps(entry['content'])
                 obj.package = None
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
+
+        # Commit the harvest objects at once
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
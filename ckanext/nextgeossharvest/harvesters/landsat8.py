@@ -5,7 +5,6 @@ import logging
 import json
 import uuid
 from datetime import datetime
-from sqlalchemy import desc
 
 import os
 
@@ -94,6 +93,8 @@ class Landsat8Harvester(NextGEOSSHarvester):
     """
     implements(IHarvester)
 
+    checkpoint_keys = ('path', 'row')
+
     def info(self):
         return {
             'name': 'landsat8',
@@ -220,27 +221,16 @@ class Landsat8Harvester(NextGEOSSHarvester):
             if _id:
                 ids.append(_id)
 
+        self._flush_harvest_objects()
         return ids
 
     def _get_last_harvesting_tile(self, source_id):
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            path = self._get_object_extra(last_object,
-                                          'path', '1')
-            row = self._get_object_extra(last_object,
-                                         'row', '1')
-
-            return (path, row)
+        checkpoint = self._get_checkpoint(source_id)
+        if checkpoint:
+            return (checkpoint.get('path', '1'), checkpoint.get('row', '1'))
         else:
             return None
 
-    def _get_imported_harvest_objects_by_source(self, source_id):
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
-
     def _zeropad(self, n, l):
         """ Add leading 0."""
         return str(n).zfill(l)
@@ -491,7 +481,6 @@ class Landsat8Harvester(NextGEOSSHarvester):
                 .first()  # noqa: E712
             if previous_obj:
                 previous_obj.current = False
-                previous_obj.save()
 
             if update_all:
                 log.debug('{} already exists and will be updated.'.format(
@@ -507,8 +496,7 @@ class Landsat8Harvester(NextGEOSSHarvester):
                     ])
                 obj.content = entry
                 obj.package = package
-                obj.save()
-                return obj.id
+                return self._save_harvest_object(obj)
 
             else:
                 log.debug(
@@ -524,8 +512,7 @@ class Landsat8Harvester(NextGEOSSHarvester):
                     ])
                 obj.content = entry
                 obj.package = package
-                obj.save()
-                return obj.id
+                return self._save_harvest_object(obj)
 
         elif not package:
             # It's a product we haven't harvested before.
@@ -542,5 +529,4 @@ class Landsat8Harvester(NextGEOSSHarvester):
                 ])
             obj.content = entry
             obj.package = None
-            obj.save()
-            return obj.id
+            return self._save_harvest_object(obj)
@@ -5,13 +5,9 @@ import json
 from datetime import datetime
 from datetime import timedelta
 
-from sqlalchemy import desc
-
 from ckan.common import config
-from ckan.model import Session
 from ckan.plugins.core import implements
 
-from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.interfaces import IHarvester
 
 from ckanext.nextgeossharvest.lib.modis_base import CMRHarvester
@@ -97,23 +93,12 @@ class MODISHarvester(CMRHarvester, OpenSearchHarvester, NextGEOSSHarvester):
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the start_date timestamp
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object,
-                                                      'restart_date', '*')
-            except IndexError:
-                restart_date = '*'
-        else:
-            restart_date = '*'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
 
         if '*' in restart_date:
             start_date = self.source_config.get('start_date', None)
@@ -1,7 +1,6 @@
  # -*- coding: utf-8 -*-
 
 import logging
-import time
 import json
 import shapely
 import itertools
@@ -14,8 +13,6 @@ import requests
 from requests.exceptions import Timeout
 from requests.auth import HTTPBasicAuth
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -39,6 +36,9 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
     """A Harvester for Noa Epidemics Products."""
     implements(IHarvester)
 
+    # The API answers 403 if it is queried too often.
+    requests_per_second = 0.5
+
     def info(self):
         return {
             'name': 'noa_epidemics',
@@ -91,6 +91,8 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
             if type(config_obj.get('update_all', False)) != bool:
                 raise ValueError('update_all must be true or false')
 
+            self._validate_rate_limit_config(config_obj)
+
         except ValueError as e:
             raise e
 
@@ -108,23 +110,12 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the update time
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries, it also uses the resumption token to cycle internally
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object,
-                                                      'restart_date', '*')
-            except IndexError:
-                restart_date = '*'
-        else:
-            restart_date = '*'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
 
         log.debug('Restart date is {}'.format(restart_date))
 
@@ -221,10 +212,12 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
             for product in products['results']:
                 yield product
             
-            req.get(products['next']).raise_for_status()
-            products = req.get(products['next']).json()
-
-            time.sleep(2)
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
+            # One request per page, so the rate limit holds
+            r = req.get(products['next'])
+            r.raise_for_status()
+            products = r.json()
 
         for product in products['results']:
             yield product
@@ -235,14 +228,19 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
         """
 
         req = requests.Session()
+        req.hooks['response'].append(
+            lambda r, *args, **kwargs: self._get_rate_limiter().update(r))
         req.headers.update({'Accept': 'application/json', 'Content-Type': 'application/json;charset=UTF-8',})
         
         # Make a request to the website
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
         try:
-            status_code = req.get(harvest_url).status_code
-            products_json = (req.get(harvest_url)).json()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
+            r = req.get(harvest_url)
+            status_code = r.status_code
+            products_json = r.json()
 
             # Get the products (returns generator)
             products = self._build_products(products_json, req)
@@ -338,7 +336,6 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -354,8 +351,7 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
                                             value=entry_restart_date)])
                 obj.content = json.dumps(entry)
                 obj.package = package
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
             elif not package:
                 # It's a product we haven't harvested before.
@@ -368,9 +364,10 @@ class NoaEpidemicsHarvester(NoaEpidemicsBaseHarvester, NextGEOSSHarvester,
                 new_counter += 1
                 obj.content = json.dumps(entry)
                 obj.package = None
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
+        # Commit the harvest objects at once
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -1,16 +1,12 @@
  # -*- coding: utf-8 -*-
 
 import logging
-import time
 import json
-import shapely
 from datetime import datetime, timedelta
 
 import requests
 from requests.exceptions import Timeout
 
-from sqlalchemy import desc
-
 from ckan import model
 from ckan.model import Package
 
@@ -20,6 +16,7 @@ from ckan.plugins.core import implements
 from ckanext.harvest.interfaces import IHarvester
 
 from ckanext.nextgeossharvest.lib.noa_groundsegment_base import NoaGroundsegmentBaseHarvester
+from ckanext.nextgeossharvest.lib import footprint
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 
 from ckanext.harvest.model import HarvestObject
@@ -34,6 +31,9 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
     """A Harvester for Noa Groundsegment Products."""
     implements(IHarvester)
 
+    # The API answers 403 if it is queried too often.
+    requests_per_second = 0.5
+
     def info(self):
         return {
             'name': 'noa_groundsegment',
@@ -75,6 +75,9 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
             if type(config_obj.get('update_all', False)) != bool:
                 raise ValueError('update_all must be true or false')
 
+            self._validate_footprint_config(config_obj)
+            self._validate_rate_limit_config(config_obj)
+
         except ValueError as e:
             raise e
 
@@ -92,30 +95,21 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the update time
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_date extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries, it also uses the resumption token to cycle internally
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_date = checkpoint.get('restart_date', '*')
+        if restart_date != '*':
             try:
-                last_object = last_object[0]
-                restart_date = self._get_object_extra(last_object, 'restart_date', '*')
                 # Convert _get_object_extra datetime to the API datetime format
                 restart_dt = datetime.strptime(restart_date, "%Y-%m-%dT%H:%M:%S")
-                restart_date = restart_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-            except IndexError:
-                restart_date = '*'
             except ValueError:
                 # MERSI products throw this error due to different datetime format
                 # Change format and subtract one second to account for rounding
                 restart_dt = datetime.strptime(restart_date, "%Y-%m-%dT%H:%M:%S.%f") + timedelta(seconds=-1)
-                restart_date = restart_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-        else:
-            restart_date = '*'
+            restart_date = restart_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
         log.debug('Restart date is {}'.format(restart_date))
 
@@ -174,11 +168,14 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
             for product in products['results']:
                 yield product
             
-            req.get(products['next']).raise_for_status()
-            products = req.get(products['next']).json()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
+            # One request per page, so the rate limit holds
+            r = req.get(products['next'])
+            r.raise_for_status()
+            products = r.json()
 
             page_counter += 1
-            time.sleep(2)
 
         for product in products['results']:
             yield product
@@ -190,6 +187,8 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
 
         # Create requests session
         req = requests.Session()
+        req.hooks['response'].append(
+            lambda r, *args, **kwargs: self._get_rate_limiter().update(r))
         req.auth = (username, password)
         req.headers.update({'Accept': 'application/json', 'Content-Type': 'application/json;charset=UTF-8',})
         
@@ -197,8 +196,11 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
         try:
-            status_code = req.get(harvest_url).status_code
-            products_json = (req.get(harvest_url)).json()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
+            r = req.get(harvest_url)
+            status_code = r.status_code
+            products_json = r.json()
 
             # Get the products
             products = self._build_products(products_json, req, page_timeout)
@@ -258,7 +260,6 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -274,8 +275,7 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
                                             value=entry_restart_date)])
                 obj.content = json.dumps(entry)
                 obj.package = package
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
             elif not package:
                 # It's a product we haven't harvested before.
@@ -288,9 +288,10 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
                 new_counter += 1
                 obj.content = json.dumps(entry)
                 obj.package = None
-                obj.save()
-                ids.append(obj.id)
+                ids.append(self._save_harvest_object(obj))
 
+        # Commit the harvest objects at once
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -319,19 +320,17 @@ class NoaGroundsegmentHarvester(NoaGroundsegmentBaseHarvester, NextGEOSSHarveste
             if temp_reception_id != product['reception_id']:
                 temp_reception_id = product['reception_id']
 
-                # Wait for 2 seconds before calling the API to avoid possible 403 errors
-                # in case too many requests need to be done
-                time.sleep(2)
+                # Wait for the rate limit before calling the API to avoid
+                # possible 403 errors in case too many requests need to be
+                # done
+                self._get_rate_limiter().acquire()
                 # Api call for geometry
                 spatial_wkb = (req.get(reception_url + product['reception_id'])).json()['results'][0]['geom']
                 
                 if spatial_wkb is not None:
-                    # Convert wkb to wkt
-                    spatial_shpl = shapely.wkb.loads(spatial_wkb, hex=True)
-                    spatial_wkt = spatial_shpl.wkt
-
-                    # wkt to geojson
-                    spatial_geojson = self._convert_to_geojson(spatial_wkt)
+                    # wkb to geojson
+                    spatial_geojson = self._shape_to_geojson(
+                        footprint.from_wkb(spatial_wkb))
                     product["spatial"] = spatial_geojson
                 else:
                     # Some older receptions have a null geometry
@@ -6,7 +6,6 @@ import requests_cache
 import logging
 import xmltodict
 from datetime import datetime
-from sqlalchemy import desc
 import uuid
 from os import path
 import mimetypes
@@ -157,6 +156,9 @@ class OSCARHarvester(NextGEOSSHarvester):
     '''
     implements(IHarvester)
 
+    checkpoint_keys = ('last_token', 'next_token', 'next_station',
+                       'restart_date')
+
     def info(self):
         info =  {   'name': 'oscar',
                     'title': 'OSCAR Harvester',
@@ -195,24 +197,12 @@ class OSCARHarvester(NextGEOSSHarvester):
     def _get_config(self, harvest_job):
         return json.loads(harvest_job.source.config)
     
-    def _get_imported_harvest_objects_by_source(self, source_id):   
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
-
     def _get_last_harvesting_index(self, source_id, parameter):
         """
         Return the token / restart date of the last product harvested 
         or none if no previous harvesting job
         """
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            index = self._get_object_extra(last_object, parameter , None)
-            return index
-        else:
-            return None
+        return self._get_checkpoint(source_id).get(parameter)
 
     def get_list_identifiers(self, session, url):
         req = session.get(url)
@@ -352,7 +342,6 @@ class OSCARHarvester(NextGEOSSHarvester):
                                                     .first()  # noqa: E712
                                                 if previous_obj:
                                                     previous_obj.current = False
-                                                    previous_obj.save()
 
                                                 if self.update_all:
                                                     self.log.debug('{} already exists and will be updated.'.format(
@@ -382,14 +371,14 @@ class OSCARHarvester(NextGEOSSHarvester):
                                                 ])
                                             obj.content = json.dumps(content)
                                             obj.package = None if status == 'new' else package
-                                            obj.save()
-                                            ids.append(obj.id)
+                                            ids.append(self._save_harvest_object(obj))  # noqa: E501
 
                                 if not valid_deployment:
                                     self.log.debug('Station {} does not have valid deployments.'.format(station))
                             else:
                                 self.log.debug('Station {} is not valid.'.format(station))
                     station_index += 1    
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
@@ -3,12 +3,8 @@
 import logging
 import json
 
-from sqlalchemy import desc
-
-from ckan.model import Session
 from ckan.plugins.core import implements
 
-from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.interfaces import IHarvester
 
 from ckanext.nextgeossharvest.lib.plan4all_base import OLUHarvester
@@ -20,6 +16,8 @@ class Plan4AllHarvester(OLUHarvester, CSWSearchHarvester, NextGEOSSHarvester):
     """A Harvester for ESA Sentinel Products."""
     implements(IHarvester)
 
+    checkpoint_keys = ('restart_record',)
+
     def info(self):
         return {
             'name': 'plan4all',
@@ -66,23 +64,12 @@ class Plan4AllHarvester(OLUHarvester, CSWSearchHarvester, NextGEOSSHarvester):
         self.update_all = self.source_config.get('update_all', False)
 
         # If we need to restart, we can do so from the ingestion timestamp
-        # of the last harvest object for the source. So, query the harvest
-        # object table to get the most recently created harvest object
-        # and then get its restart_date extra, and use that to restart
+        # of the last harvest object for the source. The import stage
+        # stores its restart_record extra in the checkpoint of the source, and
+        # we use that to restart
         # the queries
-        last_object = Session.query(HarvestObject). \
-            filter(HarvestObject.harvest_source_id == self.job.source_id,
-                   HarvestObject.import_finished != None). \
-            order_by(desc(HarvestObject.import_finished)).limit(1)  # noqa: E711, E501
-        if last_object:
-            try:
-                last_object = last_object[0]
-                restart_record = self._get_object_extra(last_object,
-                                                        'restart_record', '1')
-            except IndexError:
-                restart_record = '1'
-        else:
-            restart_record = '1'
+        checkpoint = self._get_checkpoint(self.job.source_id)
+        restart_record = checkpoint.get('restart_record', '1')
         log.debug('Restart Record is {}'.format(restart_record))
 
         base_url = 'https://micka.lesprojekt.cz'
@@ -5,14 +5,12 @@ import logging
 import json
 import uuid
 from datetime import datetime, timedelta
-import time
 from bs4 import BeautifulSoup
+from itertools import izip
 from os import path
 from urllib import urlencode, unquote
 from urlparse import urlparse, urlunparse, parse_qsl
-from sqlalchemy import desc
 
-import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import Timeout
 
@@ -22,6 +20,7 @@ from ckan.plugins.core import implements
 from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.interfaces import IHarvester
 
+from ckanext.nextgeossharvest.lib import feed_parser, prefetch
 from ckanext.nextgeossharvest.lib.opensearch_base import OpenSearchHarvester
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 
@@ -37,6 +36,8 @@ COLLECTION_TEMPLATE = 'PROBAV_{type}_{resolution}_V001'
 
 URL_TEMPLATE = 'http://www.vito-eodata.be/openSearch/findProducts.atom?collection=urn:ogc:def:EOP:VITO:{}&platform=PV01&start={}&end={}&count=500'  # count=500  # noqa: E501
 DATE_FORMAT = '%Y-%m-%d'
+# The dc:date range of an entry, for _get_checkpoint_cursor()
+DC_DATE = re.compile(r'<dc:date>([^<]*)</dc:date>')
 
 log = logging.getLogger(__name__)
 
@@ -201,8 +202,16 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                  or "PROBAV_L2A_333M_V001"''')
             if type(config_obj.get('make_private', False)) != bool:
                 raise ValueError('make_private must be true or false')
+            for key in ['parse_at_gather', 'keep_raw_content']:
+                if key in config_obj and not isinstance(config_obj[key], bool):
+                    raise ValueError('{} must be boolean'.format(key))
             if type(config_obj.get('update_all', False)) != bool:
                 raise ValueError('update_all must be true or false')
+            if 'metalink_workers' in config_obj:
+                workers = config_obj['metalink_workers']
+                if not isinstance(workers, int) or workers < 1:
+                    raise ValueError('metalink_workers must be a positive integer')  # noqa: E501
+            self._validate_rate_limit_config(config_obj)
         except ValueError as e:
             raise e
 
@@ -295,24 +304,30 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                 if _id:
                     ids.append(_id)
 
+        self._flush_harvest_objects()
         return ids
 
+    def _get_checkpoint_cursor(self, harvest_object):
+        """The restart date is the end of the dc:date range of the product."""
+        record = self._get_record(harvest_object.content)
+        if record is not None:
+            date_range_end = record['timerange_end']
+        else:
+            # The import stage runs this for every object, so look for the
+            # date instead of parsing the whole entry again.
+            date_range = DC_DATE.search(harvest_object.content)
+            if date_range is None:
+                return None
+            date_range_end = date_range.group(1).split('/')[1]
+        return {'restart_date': date_range_end.split('T')[0]}
+
     def _get_last_harvesting_date(self, source_id):
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            soup = BeautifulSoup(last_object.content)
-            restart_date = soup.find('dc:date').string.split('/')[1].split('T')[0]  # noqa: E501
+        restart_date = self._get_checkpoint(source_id).get('restart_date')
+        if restart_date is not None:
             return datetime.strptime(restart_date, '%Y-%m-%d')
         else:
             return None
 
-    def _get_imported_harvest_objects_by_source(self, source_id):
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
-
     def _generate_harvest_url(self, collection, start_date, end_date):
         date_format = '%Y-%m-%d'
         return URL_TEMPLATE.format(collection,
@@ -521,7 +536,8 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
         log.info('getting %s', url)
         if auth:
             kwargs['auth'] = HTTPBasicAuth(*auth)
-        response = requests.get(url, **kwargs)
+        # Within the provider's rate limit, retrying while it throttles us
+        response = self._get_with_backoff(url, **kwargs)
         response.raise_for_status()
         return response
 
@@ -534,26 +550,38 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                 open_search_url, auth=auth, timeout=timeout):
             for open_search_entry in self._parse_open_search_entries(
                     open_search_page):
-                guid = self._parse_identifier_element(open_search_entry)
+                guid = self._parse_entry_identifier(open_search_entry)
                 restart_date = self._parse_restart_date(open_search_entry)
-                content = open_search_entry.encode()
+                content = feed_parser.serialize(open_search_entry)
                 yield self._create_harvest_object(guid, restart_date, content)  # noqa: E501
 
     def _gather_L3(self, open_search_url, auth=None, timeout=10):
+        """
+        Yield a harvest object for each file of each entry.
+
+        The metalinks that list the files of the entries of a page are
+        fetched by `metalink_workers` threads at once.
+        """
+        workers = self.source_config.get('metalink_workers',
+                                         prefetch.DEFAULT_WORKERS)
+
+        def get_metalink(entry):
+            return self._get_metalink(entry[0], auth)
+
         for open_search_page in self._open_search_pages_from(
                 open_search_url, auth=auth, timeout=timeout):
-            for open_search_entry in self._parse_open_search_entries(
-                    open_search_page):
-                metalink_url = self._parse_metalink_url(open_search_entry)
-                metalink_xml = self._get_xml_from_url(metalink_url, auth)
+            # The entries are cleared as the page is read, so keep what we
+            # need from them first.
+            entries = [self._read_L3_entry(open_search_entry)
+                       for open_search_entry in
+                       self._parse_open_search_entries(open_search_page)]
+            metalinks = prefetch.ordered_map(get_metalink, entries, workers)
+            for entry, metalink_xml in izip(entries, metalinks):
+                _, identifier, restart_date, content = entry
                 for metalink_file_entry in self._get_metalink_file_elements(
                         metalink_xml):
-                    identifier = self._parse_identifier_element(
-                        open_search_entry)
                     file_name = self._parse_file_name(metalink_file_entry)
                     guid = self._generate_L3_guid(identifier, file_name)
-                    restart_date = self._parse_restart_date(open_search_entry)  # noqa: E501
-                    content = open_search_entry.encode()
                     extras = {
                         'file_name': file_name,
                         'file_url': self._parse_file_url(metalink_file_entry)
@@ -561,6 +589,23 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                     yield self._create_harvest_object(
                         guid, restart_date, content, extras=extras)
 
+    def _read_L3_entry(self, open_search_entry):
+        """
+        Return the metalink URL, identifier, restart date and content of an
+        entry.
+        """
+        return (self._parse_metalink_url(open_search_entry),
+                self._parse_entry_identifier(open_search_entry),
+                self._parse_restart_date(open_search_entry),
+                feed_parser.serialize(open_search_entry))
+
+    def _get_metalink(self, metalink_url, auth=None):
+        """
+        Return the metalink of an entry. It runs in the metalink threads.
+        """
+        # _get_url() waits until the provider's rate limit allows it
+        return self._get_xml_from_url(metalink_url, auth)
+
     def _create_harvest_object(self, guid, restart_date, content, extras={}):
         return {
             'identifier': self._parse_name(guid),
@@ -573,28 +618,29 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
         }
 
     def _parse_restart_date(self, open_search_entry):
-        return open_search_entry.find('updated').string
+        return feed_parser.text(feed_parser.find(open_search_entry, 'updated'))
+
+    def _parse_entry_identifier(self, open_search_entry):
+        return feed_parser.text(feed_parser.find(open_search_entry,
+                                                 'identifier'))
 
     def _generate_L3_guid(self, identifier, file_name):
         return '{}:{}'.format(identifier, file_name)
 
-    # lxml was used befor instead of lxml-xml
     def _open_search_pages_from(self,
                                 harvest_url,
                                 limit=100,
                                 timeout=10,
                                 auth=None,
-                                provider=None,
-                                parser='lxml-xml'):  # noqa: E501
+                                provider=None):  # noqa: E501
         """
-        Iterate through the results, create harvest objects,
-        and return the ids.
+        Iterate through the results and yield each page as a StreamingFeed.
+
+        The entries of a page are parsed while the caller iterates over them,
+        so the next URL is only read once the caller is done with the page.
         """
         retrieved_entries = 0
         while retrieved_entries < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
-
             # Make a request to the website
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
@@ -628,25 +674,21 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                         self.provider, timestamp, r.status_code,
                         r.elapsed.total_seconds()))  # noqa: E128, E501
 
-            soup = BeautifulSoup(r.content, parser)  # r.text????
+            page = feed_parser.StreamingFeed(r.content)
+            yield page
 
-            retrieved_entries += self._parse_items_per_page(soup)
+            retrieved_entries += self._parse_items_per_page(page)
             # Get the URL for the next loop, or None to break the loop
-            harvest_url = self._get_next_url(soup)
+            harvest_url = page.next_url
             log.debug('next url: %s', harvest_url)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
-            yield soup
-
     def _parse_items_per_page(self, open_search_page):
-        return int(open_search_page.find('itemsPerPage').string)
+        open_search_page.consume()
+        return int(feed_parser.text(open_search_page.find('itemsPerPage')))
 
-    def _parse_open_search_entries(self, soup):
+    def _parse_open_search_entries(self, open_search_page):
         """Extract the entries from an OpenSearch response."""
-        return soup.find_all('entry')
+        return open_search_page
 
     HDF5_FILENAME_REGEX = re.compile(r'.*\.HDF5$')
 
@@ -655,8 +697,9 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
             name='file', attrs={'name': self.HDF5_FILENAME_REGEX})
 
     def _parse_metalink_url(self, openseach_entry):
-        return openseach_entry.find(
-            'link', type="application/metalink+xml")['href']
+        return feed_parser.find(
+            openseach_entry, 'link',
+            {'type': 'application/metalink+xml'}).get('href')
 
     def _create_contents_json(self, opensearch_entry,
                               metalink_file_entry=None):
@@ -685,7 +728,6 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                 .first()  # noqa: E712
             if previous_obj:
                 previous_obj.current = False
-                previous_obj.save()
 
             if self.update_all:
                 log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -701,10 +743,10 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                                     HOExtra(key='restart_date', value=entry_restart_date)
                                 ])
 
-            obj.content = entry['content']
+            obj.content = self._get_gather_content(entry['content'],
+                                                   status)
             obj.package = package
-            obj.save()
-            return obj.id
+            return self._save_harvest_object(obj)
 
         elif not package:
             # It's a product we haven't harvested before.
@@ -718,7 +760,6 @@ class PROBAVHarvester(OpenSearchHarvester, NextGEOSSHarvester):
                     HOExtra(key='status', value='new'),
                     HOExtra(key='restart_date', value=entry_restart_date)
                 ])
-            obj.content = entry['content']
+            obj.content = self._get_gather_content(entry['content'])
             obj.package = None
-            obj.save()
-            return obj.id
+            return self._save_harvest_object(obj)
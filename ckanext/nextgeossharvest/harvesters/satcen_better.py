@@ -10,7 +10,6 @@ from ckanext.nextgeossharvest.collection_description.satcen_better import COLLEC
 
 from ckanext.nextgeossharvest.interfaces.opensearch import OPENSEARCH as INTERFACE
 
-from sqlalchemy import desc
 
 from requests.exceptions import Timeout
 
@@ -86,23 +85,20 @@ class SatcenBetterHarvester(NextGEOSSHarvester):
     def _get_config(self, harvest_job):
         return json.loads(harvest_job.source.config)
     
-    def _get_imported_harvest_objects_by_source(self, source_id):   
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
+    @property
+    def checkpoint_keys(self):
+        """The index is kept in the extra named after the page parameter."""
+        return (self.source_config.get('page_start_keyword'),)
 
     def _get_last_harvesting_index(self, source_id, interface):
         """
         Return the index of the last product harvested or none
         if no previous harvesting job
         """
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            index = self._get_object_extra(last_object,
-                                           interface.get_pagination_mechanism(),
-                                           interface.get_mininum_pagination_value())
+        checkpoint = self._get_checkpoint(source_id)
+        if checkpoint:
+            index = checkpoint.get(interface.get_pagination_mechanism(),
+                                   interface.get_minimum_pagination_value())
             return index
         else:
             return None
@@ -156,7 +152,6 @@ class SatcenBetterHarvester(NextGEOSSHarvester):
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(
@@ -183,9 +178,10 @@ class SatcenBetterHarvester(NextGEOSSHarvester):
                 ])
             obj.content = json.dumps(entry)
             obj.package = None if status == 'new' else package
-            obj.save()
+            self._save_harvest_object(obj)
             interface.increment_index()
             ids.append(obj.id)
+        self._flush_harvest_objects()
         return ids
 
 
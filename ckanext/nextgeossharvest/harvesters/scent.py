@@ -3,7 +3,6 @@
 import json
 import logging
 from datetime import datetime
-from sqlalchemy import desc
 import uuid
 from os import path
 import mimetypes
@@ -36,6 +35,8 @@ class SCENTHarvester(NextGEOSSHarvester):
     '''
     implements(IHarvester)
 
+    checkpoint_keys = ('index',)
+
     def info(self):
         info =  {   'name': 'scent',
                     'title': 'SCENT Harvester',
@@ -69,6 +70,9 @@ class SCENTHarvester(NextGEOSSHarvester):
             
             if type(config_obj.get('update_all', False)) != bool:
                 raise ValueError('update_all must be true or false')
+
+            if type(config_obj.get('skip_untagged', False)) != bool:
+                raise ValueError('skip_untagged must be true or false')
         except ValueError as e:
             raise e
 
@@ -110,6 +114,9 @@ class SCENTHarvester(NextGEOSSHarvester):
         entries = result['features']
         name = '{}_{}'.format(collection.lower(), '{}')
         ids = []
+        if tag_typename:
+            tag_urls = self._get_tag_urls(wfs, tag_typename,
+                                          [entry['id'] for entry in entries])
         for entry in entries:
             entry_guid = unicode(uuid.uuid4())
             entry_name = name.format(convert_to_clean_snakecase(entry['id']))
@@ -118,12 +125,8 @@ class SCENTHarvester(NextGEOSSHarvester):
             
             content = {}
             content['collection_content'] = entry
-            if tag_typename:
-                wfs.set_collection(tag_typename)
-                filterxml = wfs.set_filter_equal_to('image_id', entry['id'])
-                result = wfs.make_request(constraint=filterxml)
-                result = wfs.get_request(constraint=filterxml)
-                content['tag_url'] = result
+            if tag_typename and entry['id'] in tag_urls:
+                content['tag_url'] = tag_urls[entry['id']]
 
             package_query = Session.query(Package)
             query_filtered = package_query.filter(Package.name == entry_name)
@@ -138,7 +141,6 @@ class SCENTHarvester(NextGEOSSHarvester):
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(
@@ -165,30 +167,53 @@ class SCENTHarvester(NextGEOSSHarvester):
                 ])
             obj.content = json.dumps(content)
             obj.package = None if status == 'new' else package
-            obj.save()
+            self._save_harvest_object(obj)
             last_product_index += 1
             ids.append(obj.id)
+        self._flush_harvest_objects()
         return ids
 
     def fetch_stage(self, harvest_object):
         return True
 
-    def _get_imported_harvest_objects_by_source(self, source_id):   
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
+    def _get_tag_urls(self, wfs, tag_typename, image_ids):
+        """
+        Return the URLs of the tags of the images, by image ID.
+
+        The URLs are only built, not requested. With skip_untagged, the tags
+        of all the images of the page are requested at once, and only the
+        images that have tags get a URL.
+        """
+        wfs.set_collection(tag_typename)
+        tag_urls = {}
+        for image_id in image_ids:
+            filterxml = wfs.set_filter_equal_to('image_id', image_id)
+            tag_urls[image_id] = wfs.get_request(constraint=filterxml)
+
+        if image_ids and self.source_config.get('skip_untagged', False):
+            filterxml = wfs.set_filter_any_of('image_id', image_ids)
+            try:
+                result = wfs.make_request(max_dataset=None,
+                                          constraint=filterxml)
+            except Exception as e:
+                log.warning('Could not get the tags of the page, linking '
+                            'the tags of every image: {}'.format(e))
+            else:
+                tagged = {feature['properties'].get('image_id')
+                          for feature in result['features']}
+                tag_urls = {image_id: url for image_id, url
+                            in tag_urls.items() if image_id in tagged}
+
+        return tag_urls
 
     def _get_last_harvesting_index(self, source_id):
         """
         Return the index of the last product harvested or none
         if no previous harvesting job
         """
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            index = self._get_object_extra(last_object,'index', '1')
-            return int(index)
+        checkpoint = self._get_checkpoint(source_id)
+        if checkpoint:
+            return int(checkpoint.get('index', '1'))
         else:
             return None
 
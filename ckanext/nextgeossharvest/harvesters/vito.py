@@ -10,7 +10,6 @@ from ckanext.nextgeossharvest.lib.aux_harvest import AuxHarvester
 from ckanext.nextgeossharvest.collection_description.vito_collection import COLLECTION
 from ckanext.nextgeossharvest.interfaces.opensearch import OPENSEARCH as INTERFACE
 
-from sqlalchemy import desc
 
 from requests.exceptions import Timeout
 
@@ -47,23 +46,20 @@ class VITO_Harvest(NextGEOSSHarvester, AuxHarvester):
     def _get_config(self, harvest_job):
         return json.loads(harvest_job.source.config)
     
-    def _get_imported_harvest_objects_by_source(self, source_id):   
-        return Session.query(HarvestObject).filter(
-            HarvestObject.harvest_source_id == source_id,
-            HarvestObject.import_finished is not None)
+    @property
+    def checkpoint_keys(self):
+        """The index is kept in the extra named after the page parameter."""
+        return (self.source_config.get('page_start_keyword'),)
 
     def _get_last_harvesting_index(self, source_id, interface):
         """
         Return the index of the last product harvested or none
         if no previous harvesting job
         """
-        objects = self._get_imported_harvest_objects_by_source(source_id)
-        sorted_objects = objects.order_by(desc(HarvestObject.import_finished))
-        last_object = sorted_objects.limit(1).first()
-        if last_object is not None:
-            index = self._get_object_extra(last_object,
-                                           interface.get_pagination_mechanism(),
-                                           interface.get_minimum_pagination_value())
+        checkpoint = self._get_checkpoint(source_id)
+        if checkpoint:
+            index = checkpoint.get(interface.get_pagination_mechanism(),
+                                   interface.get_minimum_pagination_value())
             return index
         else:
             return None
@@ -120,7 +116,6 @@ class VITO_Harvest(NextGEOSSHarvester, AuxHarvester):
                     .first()  # noqa: E712
                 if previous_obj:
                     previous_obj.current = False
-                    previous_obj.save()
 
                 if self.update_all:
                     log.debug('{} already exists and will be updated.'.format(
@@ -147,9 +142,10 @@ class VITO_Harvest(NextGEOSSHarvester, AuxHarvester):
                 ])
             obj.content = json.dumps(entry)
             obj.package = None if status == 'new' else package
-            obj.save()
+            self._save_harvest_object(obj)
             interface.increment_index()
             ids.append(obj.id)
+        self._flush_harvest_objects()
         return ids
 
 
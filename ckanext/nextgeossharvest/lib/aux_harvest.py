@@ -10,6 +10,8 @@ import re
 from dateutil.parser import parse
 # from pyproj import Transformer
 
+from ckanext.nextgeossharvest.lib import footprint
+
 class AuxHarvester():
     def clean_snakecase(self, og_string):
         og_string = re.sub('[^0-9a-zA-Z]+', '_', og_string).lower()
@@ -113,18 +115,21 @@ class AuxHarvester():
 
             elif parsing_function == "WKT":
                 shapely_wkt = shapely.wkt.loads(spatial[0])
+                polygon = self._shape_to_geojson(shapely_wkt)
+                if polygon is not None:
+                    return polygon
                 geojson = shapely.geometry.mapping(shapely_wkt)
 
             elif parsing_function == "CardinalPoints":
                 lon1, lat1, lon2, lat2 = spatial
-                geojson = self.bbcoords2geometry(float(lon1),float(lat1),
-                                               float(lon2),float(lat2))
+                return self._shape_to_geojson(footprint.bbox(
+                    float(lon1), float(lat1), float(lon2), float(lat2)))
 
             elif parsing_function == "BboxDiffTagSpace":
                 lon1, lat1 = spatial[0].split(" ")
                 lon2, lat2 = spatial[1].split(" ")
-                geojson = self.bbcoords2geometry(float(lon1),float(lat1),
-                                               float(lon2),float(lat2))
+                return self._shape_to_geojson(footprint.bbox(
+                    float(lon1), float(lat1), float(lon2), float(lat2)))
             else:
                 raise ModuleNotFoundError("{} is not a recognized spatial parsing function".format(parsing_function))
             return json.dumps(geojson)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Per-source harvest checkpoints.
+
+The harvesters used to find where to restart by querying the source's
+most recently imported harvest object and reading its extras or content.
+That query sorts all the objects of the source, which gets slower with
+every harvest. The checkpoint table keeps one row per source instead,
+holding the restart state (a JSON dict, e.g. {"restart_date": "..."})
+written by the import stage in the same transaction as the object it
+comes from.
+"""
+
+import json
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Table, UnicodeText
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import select
+
+from ckan.model import meta
+
+checkpoint_table = Table(
+    'nextgeoss_harvest_checkpoint', meta.metadata,
+    Column('harvest_source_id', UnicodeText, primary_key=True),
+    Column('cursor', UnicodeText, nullable=False),
+    Column('modified', DateTime, default=datetime.utcnow),
+)
+
+
+def setup():
+    """Create the checkpoint table if it does not exist yet."""
+    if not checkpoint_table.exists():
+        checkpoint_table.create()
+
+
+def get_checkpoint(session, source_id):
+    """Return the cursor dict of a source, or None if it has none."""
+    query = select([checkpoint_table.c.cursor]) \
+        .where(checkpoint_table.c.harvest_source_id == source_id)
+    cursor = session.execute(query).scalar()
+    if cursor is None:
+        return None
+    return json.loads(cursor)
+
+
+def save_checkpoint(session, source_id, cursor):
+    """
+    Store the cursor dict of a source.
+
+    The change is only executed, not committed, so that it is committed
+    together with the harvest object it was taken from.
+    """
+    values = {'cursor': unicode(json.dumps(cursor)),
+              'modified': datetime.utcnow()}
+    update = checkpoint_table.update() \
+        .where(checkpoint_table.c.harvest_source_id == source_id) \
+        .values(**values)
+    if session.execute(update).rowcount:
+        return
+    # Another import of the same source may insert the row first, which
+    # must not roll back the rest of the transaction.
+    savepoint = session.begin_nested()
+    try:
+        session.execute(checkpoint_table.insert()
+                        .values(harvest_source_id=source_id, **values))
+        savepoint.commit()
+    except IntegrityError:
+        savepoint.rollback()
+        session.execute(update)
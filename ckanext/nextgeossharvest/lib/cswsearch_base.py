@@ -8,9 +8,7 @@ from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 from datetime import datetime
 import logging
-import requests
 from requests.exceptions import Timeout
-import time
 import uuid
 
 from bs4 import BeautifulSoup as Soup
@@ -70,14 +68,12 @@ class CSWSearchHarvester(HarvesterBase):
         update_counter = 0
 
         while len(ids) < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
-
-            # Make a request to the website
+            # Make a request to the website, within the provider's rate
+            # limit and retrying while it throttles us
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
             try:
-                r = requests.get(harvest_url, timeout=timeout)
+                r = self._get_with_backoff(harvest_url, timeout=timeout)
             except Timeout as e:
                 self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
                 status_code = 408
@@ -134,7 +130,6 @@ class CSWSearchHarvester(HarvesterBase):
                         .first()  # noqa: E712
                     if previous_obj:
                         previous_obj.current = False
-                        previous_obj.save()
 
                     if self.update_all:
                         log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -151,8 +146,7 @@ class CSWSearchHarvester(HarvesterBase):
                                                 value=entry['restart_record'])])  # noqa: E501
                     obj.content = entry['content']
                     obj.package = package
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
                 elif not package:
                     # It's a product we haven't harvested before.
                     log.debug('{} has not been harvested before. Creating a new harvest object.'.format(entry_name))  # noqa: E501
@@ -164,13 +158,12 @@ class CSWSearchHarvester(HarvesterBase):
                     new_counter += 1
                     obj.content = entry['content']
                     obj.package = None
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
+
+            # Commit the harvest objects of the page at once
+            self._flush_harvest_objects(final=False)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -13,6 +13,28 @@ log = logging.getLogger(__name__)
 
 class SentinelHarvester(HarvesterBase):
 
+    def _get_date_windows(self, start_date, end_date, count):
+        """
+        Split the date range from start_date to end_date into `count`
+        consecutive windows of the same length.
+
+        Return a list of (start, end, closing) tuples, where start and end
+        are date strings in the same format as the start_date and end_date
+        settings and closing is the bracket that closes the window's range
+        query. Adjacent windows share their boundary, so every window but
+        the last one excludes its end date (`}`) and a product at the
+        boundary is only gathered by the next window.
+        """
+        date_format = '%Y-%m-%dT%H:%M:%S.%fZ'
+        start = datetime.datetime.strptime(start_date, date_format)
+        end = datetime.datetime.strptime(end_date, date_format)
+        step = (end - start) / count
+        bounds = [start + step * i for i in range(count)] + [end]
+        bounds = ['{}Z'.format(bound.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3])
+                  for bound in bounds]
+        closings = ['}'] * (count - 1) + [']']
+        return zip(bounds[:-1], bounds[1:], closings)
+
     def _normalize_names(self, item_node):
         """
         Return a dictionary of metadata fields with normalized names.
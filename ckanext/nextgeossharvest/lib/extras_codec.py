@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Encoding of the dataset_extra extra.
+
+The harvesters store the metadata of a dataset as a single extra,
+dataset_extra, holding a list of {'key': ..., 'value': ...} dicts.
+
+Version 1 of the format is the repr() of the list, which has to be read
+back with ast.literal_eval(). That is slow on large lists, and it is what
+before_index() spends most of its time on when a catalogue is reindexed.
+Version 2 is JSON. New extras are always written with version 2, and
+decode() reads both, so datasets that have not been migrated yet (see
+the `nextgeoss-extras migrate` command) keep working.
+"""
+
+import ast
+import json
+
+LEGACY_VERSION = 1
+VERSION = 2
+
+
+def encode(extras):
+    """Return the dataset_extra string of a list of extras."""
+    # Values that JSON has no type for, like dates, are stored as text
+    return json.dumps(extras, default=unicode)
+
+
+def version(value):
+    """Return the version of the format of a dataset_extra string."""
+    # JSON strings are always double quoted, repr() single quotes them
+    # unless they contain a single quote.
+    if value.startswith('[{"') or value == '[]':
+        return VERSION
+    return LEGACY_VERSION
+
+
+def decode(value):
+    """Return the list of extras of a dataset_extra string."""
+    if version(value) == VERSION:
+        return json.loads(value)
+    return ast.literal_eval(value)
+
+
+def mentions(value, key):
+    """
+    Return whether a dataset_extra string may contain an extra named `key`,
+    which is much cheaper than decoding it.
+    """
+    return json.dumps(key) in value or repr(str(key)) in value
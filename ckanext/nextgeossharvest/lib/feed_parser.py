@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming parser for OpenSearch and CSW result pages.
+
+BeautifulSoup builds the tree of a whole page before a single entry can be
+read, and keeps every node alive until the page is discarded. StreamingFeed
+walks the page with lxml's iterparse instead, yields one entry element at a
+time and clears it as soon as the next one is requested.
+"""
+
+import re
+from io import BytesIO
+
+from lxml import etree
+
+
+NS_DECLARATION = re.compile(r'\s+xmlns(?::[\w.-]+)?="[^"]*"')
+
+
+def local_name(element):
+    """Return the tag name of an element without its namespace."""
+    return etree.QName(element).localname
+
+
+def qualified_name(element):
+    """Return the tag name of an element with its prefix, e.g. dc:date."""
+    name = local_name(element)
+    if element.prefix:
+        return '{}:{}'.format(element.prefix, name)
+    return name
+
+
+def matches(element, name, attrs=None):
+    """
+    Check an element against a BeautifulSoup-style selector, i.e. the
+    `os_*_name` and `os_*_attr` attributes of the OpenSearch harvesters.
+
+    `name` is a tag name or a tuple of tag names, compared
+    case-insensitively. A prefixed name (dc:identifier) must match the prefix
+    as well, an unprefixed one matches any prefix. `attrs` maps attribute
+    names to the required values; a value of None means that the attribute
+    must be absent.
+    """
+    names = name if isinstance(name, (tuple, list)) else (name,)
+    tags = {qualified_name(element).lower(), local_name(element).lower()}
+    if not any(n.lower() in tags for n in names):
+        return False
+    for key, value in (attrs or {}).items():
+        if element.get(key) != value:
+            return False
+    return True
+
+
+def find(element, name, attrs=None):
+    """Return the first descendant that matches the selector, or None."""
+    for child in element.iterdescendants(tag=etree.Element):
+        if matches(child, name, attrs):
+            return child
+    return None
+
+
+def text(element):
+    """Return all the text of an element, like BeautifulSoup's .text."""
+    return u''.join(element.itertext())
+
+
+def serialize(element):
+    """
+    Return an element as UTF-8 encoded XML.
+
+    lxml repeats every namespace declaration in scope on the root of the
+    serialized element. They are dropped to keep the harvest object content
+    compact and in the same shape as the BeautifulSoup output it replaces.
+    """
+    xml = etree.tostring(element, encoding='utf-8', with_tail=False)
+    end = xml.index(b'>')
+    return NS_DECLARATION.sub(b'', xml[:end]) + xml[end:]
+
+
+class StreamingFeed(object):
+    """
+    One page of results, parsed incrementally.
+
+    Iterating over the feed yields the entry elements in document order.
+    Each entry is cleared once the next one is requested, so callers must
+    extract what they need from it before moving on. Feed-level elements
+    named in `feed_tags` are collected on the way and can be looked up with
+    find() once the entries have been consumed.
+    """
+
+    def __init__(self, content, entry_tag='entry',
+                 feed_tags=('link', 'itemsPerPage')):
+        self.content = content
+        self.entry_tag = entry_tag
+        self.feed_tags = feed_tags
+        self.feed_elements = []
+        self._entries = None
+
+    def __iter__(self):
+        if self._entries is None:
+            self._entries = self._iterparse()
+        return self._entries
+
+    def _iterparse(self):
+        tags = ['{*}' + tag for tag in (self.entry_tag,) + tuple(self.feed_tags)]  # noqa: E501
+        context = etree.iterparse(BytesIO(self.content),
+                                  events=('start', 'end'), tag=tags,
+                                  huge_tree=True)
+        depth = 0
+        for event, element in context:
+            is_entry = local_name(element) == self.entry_tag
+            if event == 'start':
+                if is_entry:
+                    depth += 1
+                elif depth == 0:
+                    self.feed_elements.append(element)
+            elif is_entry:
+                depth -= 1
+                if depth == 0:
+                    yield element
+                    element.clear()
+                    # Drop the siblings processed so far as well, otherwise
+                    # the root keeps an empty node for every entry.
+                    parent = element.getparent()
+                    while element.getprevious() is not None:
+                        del parent[0]
+        del context
+
+    def consume(self):
+        """Skip any remaining entries so that all feed elements are known."""
+        for _ in self:
+            pass
+
+    def find(self, name, attrs=None):
+        """Return the first feed-level element that matches, or None."""
+        for element in self.feed_elements:
+            if matches(element, name, attrs):
+                return element
+        return None
+
+    @property
+    def next_url(self):
+        """Return the URL of the next page, or None at the end of results."""
+        self.consume()
+        link = self.find('link', {'rel': 'next'})
+        if link is not None:
+            return link.get('href')
+        return None
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion of the footprints of the products to GeoJSON polygons.
+
+The footprints come as WKT, hex-encoded WKB or bounding boxes. Polygons
+and multipolygons are converted with all their parts and holes. Each ring
+is handled as a NumPy array: consecutive duplicate vertices, which are not
+valid GeoJSON and make Solr reject the dataset, are dropped in one pass
+and the coordinates are dumped straight to JSON.
+
+Large footprints, like the ones of Sentinel-1 and Sentinel-3, can also be
+simplified with a tolerance (in degrees) and capped to a maximum number of
+vertices per ring, which keeps the index small.
+"""
+
+import json
+
+import numpy as np
+import shapely.geometry
+import shapely.wkb
+import shapely.wkt
+from shapely.errors import ReadingError, WKBReadingError, WKTReadingError
+
+# Fewest vertices of a closed ring, the first one being repeated at the end
+MIN_VERTICES = 4
+
+POLYGON = '{{"type": "Polygon", "coordinates": {}}}'
+MULTIPOLYGON = '{{"type": "MultiPolygon", "coordinates": {}}}'
+
+
+def from_wkt(spatial):
+    """Return the geometry of a WKT string, or None if it is not valid."""
+    try:
+        return shapely.wkt.loads(spatial)
+    except (ReadingError, WKTReadingError):
+        return None
+
+
+def from_wkb(spatial):
+    """Return the geometry of a hex-encoded WKB, or None if not valid."""
+    try:
+        return shapely.wkb.loads(spatial, hex=True)
+    except (ReadingError, WKBReadingError):
+        return None
+
+
+def bbox(min_long, min_lat, max_long, max_lat):
+    """Return the polygon of a bounding box."""
+    return shapely.geometry.Polygon([(min_long, min_lat),
+                                     (min_long, max_lat),
+                                     (max_long, max_lat),
+                                     (max_long, min_lat)])
+
+
+def to_geojson(geometry, tolerance=None, max_vertices=None):
+    """
+    Return the GeoJSON polygon or multipolygon of a geometry.
+
+    Return None if the geometry is not a polygon or a multipolygon.
+    """
+    if geometry is None or geometry.is_empty:
+        return None
+
+    geometry_type = geometry.geom_type.upper()
+    if geometry_type == 'MULTIPOLYGON':
+        return MULTIPOLYGON.format(json.dumps(
+            [_polygon_coords(polygon, tolerance, max_vertices)
+             for polygon in geometry.geoms]))
+    elif geometry_type == 'POLYGON':
+        return POLYGON.format(json.dumps(
+            _polygon_coords(geometry, tolerance, max_vertices)))
+    else:
+        return None
+
+
+def _polygon_coords(polygon, tolerance=None, max_vertices=None):
+    """
+    Return the coordinates of the rings of a polygon, the exterior one
+    first, as lists.
+    """
+    if tolerance:
+        polygon = polygon.simplify(tolerance)
+    rings = _rings(polygon)
+    if max_vertices and any(len(coords) > max_vertices for coords in rings):
+        rings = _cap_vertices(polygon, max_vertices, tolerance)
+
+    # Remove double coordinates -- they are not valid GeoJSON and Solr
+    # will reject them.
+    coordinates = []
+    for coords in rings:
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        coordinates.append(coords[keep].tolist())
+    return coordinates
+
+
+def _rings(polygon):
+    """Return the coordinates of the rings of a polygon as arrays."""
+    return [np.asarray(polygon.exterior.coords)] + \
+        [np.asarray(ring.coords) for ring in polygon.interiors]
+
+
+def _cap_vertices(polygon, max_vertices, tolerance=None):
+    """
+    Return the rings of a polygon simplified down to at most
+    `max_vertices` vertices each.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    extent = max(max_x - min_x, max_y - min_y)
+    # Double the tolerance until the rings are short enough. Past the
+    # extent of the polygon, simplifying further does not remove any vertex.
+    tolerance = (tolerance or extent / 1000.0) * 2
+    rings = _rings(polygon)
+    while any(len(coords) > max_vertices for coords in rings) and \
+            0 < tolerance <= extent * 2:
+        rings = _rings(polygon.simplify(tolerance))
+        tolerance *= 2
+
+    capped = []
+    for coords in rings:
+        if len(coords) > max_vertices:
+            # Keep evenly spaced vertices, including the first and the last
+            # one so that the ring stays closed
+            index = np.linspace(0, len(coords) - 1, max_vertices).astype(int)
+            coords = coords[index]
+        capped.append(coords)
+    return capped
@@ -7,7 +7,6 @@ import uuid
 from ftplib import FTP, error_perm as Ftp5xxErrors
 from os import path
 from bs4 import BeautifulSoup as Soup
-import shapely.geometry
 from dateutil.relativedelta import relativedelta
 
 from ckan.model import Session
@@ -17,6 +16,7 @@ from ckanext.harvest.harvesters.base import HarvesterBase
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 from ckanext.harvest.model import HarvestObject
 
+from ckanext.nextgeossharvest.lib import footprint
 from ckanext.nextgeossharvest.lib.fsscat_config import COLLECTION
 
 log = logging.getLogger(__name__)
@@ -140,18 +140,14 @@ class FSSCATBase(HarvesterBase):
             "gmd:northboundlatitude": "north"
         }
         tmp_item = self._get_elements(normalized_names, info)
-        geojson = self.bbcoords2geometry(float(tmp_item['west']),float(tmp_item['south']),float(tmp_item['east']),float(tmp_item['north']))
+        polygon = footprint.bbox(float(tmp_item['west']),
+                                 float(tmp_item['south']),
+                                 float(tmp_item['east']),
+                                 float(tmp_item['north']))
         item = {}
-        item['spatial'] = json.dumps(geojson)
+        item['spatial'] = self._shape_to_geojson(polygon)
         return item
 
-    def bbcoords2geometry(self, min_long, min_lat, max_long, max_lat):
-	shapely_polygon = shapely.geometry.Polygon([(min_long, min_lat),
-                                                    (min_long, max_lat),
-                                                    (max_long, max_lat),
-                                                    (max_long, min_lat)])
-        return json.loads(json.dumps(shapely.geometry.mapping(shapely_polygon)))
-
     # Required by NextGEOSS base harvester
     def _parse_content(self, content):
         """
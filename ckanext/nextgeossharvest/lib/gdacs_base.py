@@ -3,7 +3,6 @@
 import logging
 import json
 from datetime import timedelta, datetime
-import requests
 from requests.exceptions import ConnectTimeout, ReadTimeout
 from dateutil.relativedelta import relativedelta
 from ckan.model import Session
@@ -182,7 +181,7 @@ class GDACSBase(HarvesterBase):
         log_message = '{:<12} | {} | {} | {}s'
         elapsed = 9999
         try:
-            r = requests.head(url, allow_redirects=True)
+            r = self._get_http_session().head(url, allow_redirects=True)
             status_code = r.status_code
             elapsed = r.elapsed.total_seconds()
         except (ConnectTimeout, ReadTimeout) as e:
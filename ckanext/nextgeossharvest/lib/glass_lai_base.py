@@ -128,9 +128,7 @@ class GLASS_LAI_Base(HarvesterBase):
         obj = HarvestObject(job=self.job, guid=unicode(uuid.uuid4()),
                             extras=extras, content=content)
 
-        obj.save()
-
-        return obj.id
+        return self._save_harvest_object(obj)
 
     def _get_resources(self, metadata):
         """Return a list of resource dictionaries."""
@@ -4,7 +4,6 @@ import logging
 import json
 from datetime import timedelta, datetime
 
-import requests
 from requests.exceptions import Timeout
 
 from ckan.model import Session
@@ -33,9 +32,7 @@ class GOME2Base(HarvesterBase):
         obj = HarvestObject(job=self.job, guid=content_dict['identifier'],
                             extras=extras, content=content)
 
-        obj.save()
-
-        return obj.id
+        return self._save_harvest_object(obj)
 
     def _create_harvest_objects(self):
         """Create harvest objects for all dates in the date range."""
@@ -51,7 +48,10 @@ class GOME2Base(HarvesterBase):
             ho_ids = [self._create_harvest_object(content_dict)
                       for content_dict in content_dicts
                       if not self._missing_or_harvested(coverage, content_dict, provider)]  # noqa: E501
-            ids.extend(ho_ids)
+            # Objects imported in bulk mode have no id to return
+            ids.extend(ho_id for ho_id in ho_ids if ho_id)
+
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -109,7 +109,7 @@ class GOME2Base(HarvesterBase):
         log_message = '{:<12} | {} | {} | {}s'
 
         try:
-            r = requests.get(url, timeout=10)
+            r = self._get_http_session().get(url, timeout=10)
             status_code = r.status_code
             elapsed = r.elapsed.total_seconds()
 
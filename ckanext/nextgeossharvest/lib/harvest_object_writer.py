@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Batched persistence of the harvest objects created during gather.
+
+HarvestObject.save() commits the session, so a gather stage that saves
+each object on its own makes one commit per entry. The writer adds the
+objects to the session instead and commits them, along with their extras
+and any other pending change, once per batch.
+"""
+
+import uuid
+
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class HarvestObjectWriter(object):
+    """
+    Add harvest objects to `session` and commit them every `batch_size`
+    objects, or when flush() is called.
+    """
+
+    def __init__(self, session, batch_size=DEFAULT_BATCH_SIZE):
+        self.session = session
+        self.batch_size = max(1, batch_size)
+        self.pending = 0
+
+    def add(self, obj):
+        """
+        Queue a harvest object and return its id.
+
+        The id is assigned here rather than when the object is inserted,
+        so that it can be returned to the gather stage before the commit.
+        """
+        if not obj.id:
+            obj.id = unicode(uuid.uuid4())
+        self.session.add(obj)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+        return obj.id
+
+    def flush(self):
+        """Commit the queued objects and any other pending change."""
+        self.session.commit()
+        self.pending = 0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled HTTP sessions shared by the harvesters.
+
+A module-level requests.get() opens a new connection, and for HTTPS a new TLS
+handshake, on every call. The sessions created here keep their connections
+alive and are shared by every harvester of the same provider in the process.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from ckanext.nextgeossharvest.lib import rate_limiter
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# 429 and 503 are left to the rate limiter, which slows down all the
+# requests to the provider, see rate_limiter.THROTTLE_STATUSES.
+RETRY_STATUSES = (500, 502, 504)
+# How many times get_with_backoff() retries a throttled request
+DEFAULT_THROTTLE_RETRIES = 3
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+class HarvesterSession(requests.Session):
+    """
+    A requests session that applies a default timeout to each request and
+    reports the replies to the provider's rate limiter, if it has one.
+    """
+
+    def __init__(self, timeout=None):
+        super(HarvesterSession, self).__init__()
+        self.timeout = timeout
+        self.rate_limiter = None
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        response = super(HarvesterSession, self).request(method, url,
+                                                         **kwargs)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(response)
+        return response
+
+
+def create_session(timeout=None, pool_size=DEFAULT_POOL_SIZE,
+                   max_retries=DEFAULT_MAX_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Create a session with a connection pool of `pool_size` connections per
+    host that retries failed requests and 500, 502 and 504 replies with an
+    exponential backoff. The last reply is returned once the retries are
+    exhausted, so callers can still report the status code.
+
+    Read timeouts are not retried, so that they are raised as Timeout, like
+    with requests.get(), instead of ConnectionError after several timeouts.
+    """
+    session = HarvesterSession(timeout)
+    retries = Retry(total=max_retries, read=False,
+                    backoff_factor=backoff_factor,
+                    status_forcelist=RETRY_STATUSES, raise_on_status=False,
+                    # Or urllib3 retries the 429 and 503 with Retry-After
+                    respect_retry_after_header=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_with_backoff(session, limiter, url,
+                     retries=DEFAULT_THROTTLE_RETRIES, **kwargs):
+    """
+    GET `url` within the rate limit of `limiter`, and retry it up to
+    `retries` times while the provider throttles it (429 or 503).
+
+    Each throttled reply makes the limiter back off, so the retry waits for
+    the Retry-After delay. The last reply is returned, throttled or not.
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        response = session.get(url, **kwargs)
+        # A HarvesterSession reports its replies to its own limiter
+        if getattr(session, 'rate_limiter', None) is not limiter:
+            limiter.update(response)
+        if response.status_code not in rate_limiter.THROTTLE_STATUSES:
+            break
+    return response
+
+
+def get_session(provider, timeout=None, pool_size=DEFAULT_POOL_SIZE,
+                max_retries=DEFAULT_MAX_RETRIES,
+                backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Return the shared session of a provider, creating it on first use.
+
+    The session is replaced if it was created with different settings,
+    e.g. after the source config has been edited.
+    """
+    settings = (timeout, pool_size, max_retries, backoff_factor)
+    with _lock:
+        cached = _sessions.get(provider)
+        if cached is None or cached[0] != settings:
+            cached = (settings, create_session(*settings))
+            _sessions[provider] = cached
+        return cached[1]
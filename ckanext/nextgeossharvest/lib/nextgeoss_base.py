@@ -1,30 +1,82 @@
 # -*- coding: utf-8 -*-
 
-import ast
+import hashlib
 import json
 import logging
 import os
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from string import Template
 
 import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import ConnectTimeout, ReadTimeout
+from sqlalchemy import desc, func, or_
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import bindparam, update
 
 import requests_ftp
-import shapely.wkt
 from ckan import logic, model
 from ckan import plugins as p
 from ckan.common import config
+from ckan.lib import search
 from ckan.lib.navl.validators import not_empty
-from ckan.model import Package, Session
+from ckan.model import Package, PackageExtra, Session
 from ckanext.harvest.harvesters.base import HarvesterBase
-from shapely.errors import ReadingError, WKTReadingError
+from ckanext.harvest.model import HarvestObject
+from ckanext.harvest.model import HarvestObjectExtra as HOExtra
+
+from ckanext.nextgeossharvest.lib import checkpoint, extras_codec, footprint
+from ckanext.nextgeossharvest.lib import harvest_object_writer
+from ckanext.nextgeossharvest.lib import http_client, parse_pool
+from ckanext.nextgeossharvest.lib import rate_limiter
 
 log = logging.getLogger(__name__)
 
+# Start of the content of the harvest objects parsed during gather, see
+# NextGEOSSHarvester._get_gather_content().
+RECORD_PREFIX = '{"parsed_content": '
+
+# Number of datasets created per transaction in bulk import mode
+DEFAULT_BULK_BATCH_SIZE = 500
+
+# Validation schemas of the package actions, built once per process by
+# NextGEOSSHarvester._get_package_schema().
+_package_schemas = {}
+
+# Owners of the harvest sources, looked up once per job by
+# NextGEOSSHarvester._get_source_owner().
+_source_owners = {}
+
+
+def _copy_schema(schema):
+    """Copy the dicts and lists of a schema, but not the validators."""
+    if isinstance(schema, dict):
+        return {key: _copy_schema(value) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return list(schema)
+    return schema
+
+
+@contextmanager
+def _deferred_indexing():
+    """
+    Stop CKAN from indexing each dataset when its changes are committed.
+
+    The datasets must be indexed by the caller afterwards.
+    """
+    key = 'ckan.search.automatic_indexing'
+    automatic_indexing = config.get(key)
+    config[key] = False
+    try:
+        yield
+    finally:
+        if automatic_indexing is None:
+            config.pop(key, None)
+        else:
+            config[key] = automatic_indexing
+
 
 class NextGEOSSHarvester(HarvesterBase):
     """
@@ -33,6 +85,20 @@ class NextGEOSSHarvester(HarvesterBase):
     SentinelHarvester's methods (see esa_base.py) to this class.
     """
 
+    # Default rate of requests to the provider, and whether it is shared by
+    # the processes of the machine, see _get_rate_limiter().
+    requests_per_second = rate_limiter.DEFAULT_REQUESTS_PER_SECOND
+    shared_rate_limit = False
+    # Harvest object extras that hold the restart state of the source,
+    # see _get_checkpoint_cursor().
+    checkpoint_keys = ('restart_date',)
+    # Keys of the parsed content that change on every harvest, and are left
+    # out of its fingerprint, see _get_content_hash().
+    volatile_keys = ('uuid',)
+    # Whether the harvester can import its datasets during gather, see
+    # _save_harvest_object(). Its gather stage must then skip the None ids.
+    supports_bulk_import = False
+
     def _get_object_extra(self, harvest_object, key, default=None):
         """
         Helper method for retrieving the value from a harvest object extra.
@@ -42,6 +108,16 @@ class NextGEOSSHarvester(HarvesterBase):
                 return extra.value
         return default
 
+    def _set_object_extra(self, harvest_object, key, value):
+        """
+        Helper method for setting the value of a harvest object extra.
+        """
+        for extra in harvest_object.extras:
+            if extra.key == key:
+                extra.value = value
+                return
+        harvest_object.extras.append(HOExtra(key=key, value=value))
+
     def _get_package_extra(self, package_dict, flagged_extra, default=None):
         """
         Helper method for retrieving the value from a package's extras list.
@@ -49,7 +125,7 @@ class NextGEOSSHarvester(HarvesterBase):
         extras = self.convert_string_extras(package_dict['extras'])
 
         if "dataset_extra" in extras:
-            extras = ast.literal_eval(extras["dataset_extra"])
+            extras = extras_codec.decode(extras["dataset_extra"])
 
         if type(extras) == list:
             for extra in extras:
@@ -62,10 +138,42 @@ class NextGEOSSHarvester(HarvesterBase):
 
         return default
 
+    def _get_packages_with_extra(self, package_ids, key):
+        """
+        Return the ids of the packages in `package_ids` that have a non-empty
+        extra named `key`, either as a regular extra or inside dataset_extra.
+
+        This gives the same answer as _get_package_extra() for each package,
+        but reads the extras table directly, with one query for the whole
+        batch instead of one package_show per package.
+        """
+        if not package_ids:
+            return set()
+
+        query = Session.query(PackageExtra.package_id, PackageExtra.key,
+                              PackageExtra.value) \
+            .filter(PackageExtra.package_id.in_(package_ids)) \
+            .filter(PackageExtra.key.in_([key, 'dataset_extra'])) \
+            .filter(PackageExtra.state == 'active')
+
+        found = set()
+        for package_id, extra_key, value in query:
+            if not value:
+                continue
+            if extra_key == key:
+                found.add(package_id)
+            # Only parse the dataset_extra strings that mention the key.
+            elif extras_codec.mentions(value, key):
+                extras = extras_codec.decode(value)
+                if any(extra['key'] == key and extra['value']
+                       for extra in extras):
+                    found.add(package_id)
+        return found
+
     def convert_string_extras(self, extras_list):
         """Convert extras stored as a string back into a normal extras list."""
         try:
-            extras = ast.literal_eval(extras_list[0]["value"])
+            extras = extras_codec.decode(extras_list[0]["value"])
             assert type(extras) == list
             return extras
         except (Exception, AssertionError):
@@ -82,50 +190,303 @@ class NextGEOSSHarvester(HarvesterBase):
         else:
             self.source_config = {}
 
-    def _get_package_dict(self, package):
+    def _get_http_session(self, provider=None):
         """
-        Return the full package dict for a given package _object_.
+        Return the pooled HTTP session of the harvester's provider.
+
+        The connections are kept alive across requests and shared by all the
+        harvesters of the same provider. The pool size, the retries and the
+        default timeout are taken from the source config (`http_pool_size`,
+        `http_max_retries`, `http_backoff_factor` and `timeout`). Replies are
+        reported to the provider's rate limiter so that it can back off.
+        """
+        source_config = getattr(self, 'source_config', {})
+        provider = self._get_provider_key(provider)
+        session = http_client.get_session(
+            provider,
+            timeout=source_config.get('timeout'),
+            pool_size=source_config.get('http_pool_size',
+                                        http_client.DEFAULT_POOL_SIZE),
+            max_retries=source_config.get('http_max_retries',
+                                          http_client.DEFAULT_MAX_RETRIES),
+            backoff_factor=source_config.get('http_backoff_factor',
+                                             http_client.DEFAULT_BACKOFF_FACTOR))  # noqa: E501
+        session.rate_limiter = self._get_rate_limiter(provider)
+        return session
 
-        (We can probably establish the context once for the whole harvester
-        and save it as a class attribute, as it seems like it will always be
-        the same.)
+    def _get_rate_limiter(self, provider=None):
+        """
+        Return the rate limiter of the harvester's provider.
+
+        The rate is taken from the source config (`requests_per_second` and
+        `request_burst`) and defaults to the harvester's own
+        `requests_per_second`. With `shared_rate_limit`, which defaults to
+        the harvester's own `shared_rate_limit`, the rate is shared by all
+        the harvesting processes of the machine, through a file in
+        `ckanext.nextgeossharvest.rate_limit_dir`, or else in
+        `ckan.storage_path` or the temporary directory.
+        """
+        source_config = getattr(self, 'source_config', {})
+        return rate_limiter.get_rate_limiter(
+            self._get_provider_key(provider),
+            requests_per_second=source_config.get('requests_per_second',
+                                                  self.requests_per_second),
+            burst=source_config.get('request_burst',
+                                    rate_limiter.DEFAULT_BURST),
+            shared=source_config.get('shared_rate_limit',
+                                     self.shared_rate_limit),
+            directory=(config.get('ckanext.nextgeossharvest.rate_limit_dir') or  # noqa: E501
+                       config.get('ckan.storage_path')))
+
+    def _get_with_backoff(self, url, provider=None, **kwargs):
+        """
+        GET a URL of the provider within its rate limit, retrying it up to
+        `throttle_retries` times while the provider answers 429 or 503.
+        """
+        source_config = getattr(self, 'source_config', {})
+        return http_client.get_with_backoff(
+            self._get_http_session(provider), self._get_rate_limiter(provider),
+            url, retries=source_config.get(
+                'throttle_retries', http_client.DEFAULT_THROTTLE_RETRIES),
+            **kwargs)
+
+    def _get_provider_key(self, provider=None):
+        """Return the key of the provider's shared session and limiter."""
+        if provider is None:
+            provider = getattr(self, 'provider', None) or type(self).__name__
+        return provider
+
+    def _save_harvest_object(self, obj):
+        """
+        Queue a harvest object created during gather and return its id.
+
+        The objects are committed in batches of `gather_batch_size` (from
+        the source config) instead of one by one. The gather stage must call
+        _flush_harvest_objects() before it returns the ids.
+
+        In bulk import mode (`bulk_import` in the source config of a
+        harvester that supports it), the objects are imported by the gather
+        stage itself, in batches of `bulk_import_batch_size`, and None is
+        returned instead of the id so that they are not queued for the fetch
+        and import stages.
+        """
+        source_config = getattr(self, 'source_config', {})
+        if self.supports_bulk_import and source_config.get('bulk_import'):
+            batch = getattr(self, 'bulk_objects', None)
+            if batch is None:
+                batch = self.bulk_objects = []
+            batch.append(obj)
+            if len(batch) >= source_config.get('bulk_import_batch_size',
+                                               DEFAULT_BULK_BATCH_SIZE):
+                self._import_harvest_objects(batch)
+                self.bulk_objects = []
+            return None
+
+        writer = getattr(self, 'object_writer', None)
+        if writer is None:
+            writer = harvest_object_writer.HarvestObjectWriter(
+                Session,
+                source_config.get('gather_batch_size',
+                                  harvest_object_writer.DEFAULT_BATCH_SIZE))
+            self.object_writer = writer
+        return writer.add(obj)
+
+    def _flush_harvest_objects(self, final=True):
+        """
+        Commit the harvest objects queued by _save_harvest_object().
+
+        Gathers that flush after each page pass `final=False`, so that the
+        last, incomplete, bulk import batch is only imported at the end.
+        """
+        if final:
+            if getattr(self, 'bulk_objects', None):
+                self._import_harvest_objects(self.bulk_objects)
+            self.bulk_objects = None
+        if getattr(self, 'parse_pool', None) is not None:
+            self.parse_pool.close()
+        self.parse_pool = None
+        writer = getattr(self, 'object_writer', None)
+        if writer is not None:
+            writer.flush()
+        else:
+            Session.commit()
+        self.object_writer = None
+
+    def _get_checkpoint_cursor(self, harvest_object):
+        """
+        Return the restart state carried by a harvest object, or None.
+
+        By default it is made of the object's extras listed in
+        `checkpoint_keys`. Harvesters that keep it in the content override
+        this method.
+        """
+        cursor = {extra.key: extra.value for extra in harvest_object.extras
+                  if extra.key in self.checkpoint_keys}
+        return cursor or None
+
+    def _read_checkpoint_cursor(self, harvest_object):
+        """
+        Return the restart state of a harvest object, or None if it cannot
+        be read, which is logged instead of failing the import.
+        """
+        try:
+            return self._get_checkpoint_cursor(harvest_object)
+        except Exception as e:
+            log.warning('Cannot read the restart state of harvest object {}:'
+                        ' {!r}'.format(harvest_object.id, e))
+            return None
+
+    def _get_checkpoint_id(self, source_id, name=None):
+        """
+        Return the id of a checkpoint of a harvest source.
+
+        A source has one checkpoint, plus one per name for harvesters that
+        keep several cursors (e.g. the date windows of a backfill).
+        """
+        if name:
+            return u'{}/{}'.format(source_id, name)
+        return source_id
+
+    def _get_checkpoint(self, source_id, name=None):
+        """
+        Return the restart state of a harvest source as a dict, which is
+        empty if the source has not been harvested yet.
+
+        Sources that were harvested before the checkpoint table existed
+        get their checkpoint from their last imported harvest object.
+        """
+        checkpoint.setup()
+        checkpoint_id = self._get_checkpoint_id(source_id, name)
+        cursor = checkpoint.get_checkpoint(Session, checkpoint_id)
+        if cursor is None and not name:
+            last_object = Session.query(HarvestObject). \
+                filter(HarvestObject.harvest_source_id == source_id,
+                       HarvestObject.import_finished != None). \
+                order_by(desc(HarvestObject.import_finished)).first()  # noqa: E711, E501
+            if last_object is not None:
+                cursor = self._read_checkpoint_cursor(last_object)
+            if cursor:
+                checkpoint.save_checkpoint(Session, checkpoint_id, cursor)
+                Session.commit()
+        return cursor or {}
+
+    def _get_context(self, **kwargs):
+        """
+        Return a new action context for the harvester's user, with the
+        additional items in `kwargs`.
         """
         context = {
             'model': model,
             'session': model.Session,
             'user': self._get_user_name(),
-            'ignore_auth': True
         }
+        context.update(kwargs)
+        return context
+
+    def _get_source_owner(self, source, job_id):
+        """
+        Return a dict with the `owner_org` and the `organization` name of a
+        harvest source.
+
+        They are looked up once per job and kept for the next calls, until
+        the source config changes. The user needs no cache, HarvesterBase
+        already keeps it in the harvester, which lives as long as the
+        process.
+        """
+        key = (job_id, source.config)
+        owner = _source_owners.get(source.id)
+        if owner is None or owner['key'] != key:
+            owner_org = model.Package.get(source.id).owner_org
+            organization = model.Group.get(owner_org) if owner_org else None
+            owner = {
+                'key': key,
+                'owner_org': owner_org,
+                'organization': organization.name if organization else None,
+            }
+            _source_owners[source.id] = owner
+        return owner
+
+    def _get_package_schema(self, action):
+        """
+        Return the validation schema of `action` (package_create or
+        package_update) with the harvesters' tags and extras schemas.
+
+        The schema is built once per process, and each call returns a copy
+        that can be changed by the caller or by the action.
+        """
+        schema = _package_schemas.get(action)
+        if schema is None:
+            if action == 'package_create':
+                schema = logic.schema.default_create_package_schema()
+                schema['id'] = [unicode]  # noqa: F821
+            else:
+                schema = logic.schema.default_update_package_schema()
+            tag_schema = logic.schema.default_tags_schema()
+            tag_schema['name'] = [not_empty, unicode]  # noqa: F821
+            schema['tags'] = tag_schema
+            schema['extras'] = logic.schema.default_extras_schema()
+            _package_schemas[action] = schema
+        return _copy_schema(schema)
+
+    def _get_package_dict(self, package):
+        """
+        Return the full package dict for a given package _object_.
+        """
+        context = self._get_context(ignore_auth=True)
 
         return logic.get_action('package_show')(context, {'id': package.name})
 
     def _refresh_harvest_objects(self, harvest_object, package_id):
         """
         Perform harvester housekeeping:
-            - Flag the other objects of the source as not current
-            - Set a refernce to the package in the harvest object
-            - Flag it as current
-            - And save the changes
-        """
-        # Flag the other objects of this source as not current
-        from ckanext.harvest.model import harvest_object_table
-        u = update(harvest_object_table) \
-            .where(harvest_object_table.c.package_id == bindparam('pkg_id')) \
-            .values(current=False)
-        Session.execute(u, params={'pkg_id': package_id})
+            - Flag the object as the current one of the package, and the
+              other objects of the package as not current
+            - Set a reference to the package in the harvest object
+            - Update the checkpoint of the source
+            - And commit the changes, at once
+        """
+        self._set_current_objects([(harvest_object, package_id)])
+        self._save_checkpoint(harvest_object)
         Session.commit()
-        # Refresh current object from session, otherwise the
-        # import paster command fails
-        # (Copied from the Gemini harvester--not sure if necessary)
-        Session.remove()
-        Session.add(harvest_object)
-        Session.refresh(harvest_object)
-        # Set reference to package in the HarvestObject and flag it as
-        # the current one
-        if not harvest_object.package_id:
-            harvest_object.package_id = package_id
-        harvest_object.current = True
-        harvest_object.save()
+
+    def _set_current_objects(self, objects):
+        """
+        Flag each harvest object of a list of (harvest object, package id)
+        pairs as the current one of its package, and set its reference to
+        the package, without committing.
+
+        A single UPDATE statement is executed for the whole list. The
+        objects are changed in the session too, so they need not be read
+        again.
+        """
+        if not objects:
+            return
+        # The harvest tables are only defined once ckanext-harvest is set up
+        from ckanext.harvest.model import harvest_object_table as table
+        u = update(table) \
+            .where(or_(table.c.id == bindparam('obj_id'),
+                       table.c.package_id == bindparam('pkg_id'))) \
+            .values(current=(table.c.id == bindparam('obj_id')),
+                    package_id=func.coalesce(table.c.package_id,
+                                             bindparam('pkg_id')))
+        Session.execute(u, [{'obj_id': harvest_object.id, 'pkg_id': package_id}
+                            for harvest_object, package_id in objects])
+        for harvest_object, package_id in objects:
+            if not harvest_object.package_id:
+                set_committed_value(harvest_object, 'package_id', package_id)
+            set_committed_value(harvest_object, 'current', True)
+
+    def _save_checkpoint(self, harvest_object):
+        """
+        Update the checkpoint of the source of an imported harvest object,
+        without committing it.
+        """
+        cursor = self._read_checkpoint_cursor(harvest_object)
+        if cursor:
+            checkpoint_id = self._get_checkpoint_id(
+                harvest_object.harvest_source_id or self.job.source_id,
+                self._get_object_extra(harvest_object, 'checkpoint'))
+            checkpoint.save_checkpoint(Session, checkpoint_id, cursor)
 
     def _create_package_dict(self, parsed_content):
         """
@@ -145,12 +506,102 @@ class NextGEOSSHarvester(HarvesterBase):
         package_dict['private'] = self.source_config.get('make_private', False)
         return package_dict
 
+    def _get_gather_content(self, content, status='new'):
+        """
+        Return the content to store in a harvest object created during
+        gather.
+
+        With `parse_at_gather` in the source config, the content is parsed
+        right away and the output of _parse_content() is stored instead, so
+        that the import stage does not parse the entry again. The entry
+        itself is kept next to it with `keep_raw_content`. Objects that will
+        not be imported, and entries that cannot be parsed, are stored as
+        they are, so that the import stage reports the error of each object.
+        """
+        source_config = getattr(self, 'source_config', {})
+        if not source_config.get('parse_at_gather') or status == 'unchanged':
+            return content
+        try:
+            parsed_content = self._parse_content(content)
+        except Exception as e:
+            log.warning('Cannot parse an entry at gather, it will be parsed'
+                        ' again at import: {!r}'.format(e))
+            return content
+        record = OrderedDict([('parsed_content', parsed_content)])
+        if source_config.get('keep_raw_content'):
+            record['raw_content'] = content
+        # Values JSON has no type for, like dates, are stored as text
+        return json.dumps(record, default=unicode)  # noqa: F821
+
+    def _get_record(self, content):
+        """
+        Return the parsed content stored by _get_gather_content(), or None
+        if the harvest object content was not parsed during gather.
+        """
+        if content.startswith(RECORD_PREFIX):
+            return json.loads(content)['parsed_content']
+        return None
+
+    def _get_parsed_content(self, harvest_object):
+        """Return the parsed content of a harvest object."""
+        record = self._get_record(harvest_object.content)
+        if record is not None:
+            return record
+        return self._parse_content(harvest_object.content)
+
+    def _build_package_dict(self, content):
+        """
+        Return the package dict of a harvest object content and the
+        fingerprint of the content.
+
+        It does not touch the database, so that the parse pool can run it in
+        another process.
+        """
+        parsed_content = self._get_record(content)
+        if parsed_content is None:
+            parsed_content = self._parse_content(content)
+        package_dict = self._create_package_dict(parsed_content)
+        return package_dict, self._get_content_hash(parsed_content,
+                                                    package_dict)
+
+    def _get_content_hash(self, parsed_content, package_dict):
+        """
+        Return a fingerprint of the parsed content of a dataset, which does
+        not depend on the order of its keys or on its `volatile_keys`.
+        """
+        parsed_content = {key: value for key, value in parsed_content.items()
+                          if key not in self.volatile_keys}
+        content = [parsed_content, package_dict['private']]
+        # Values JSON has no type for, like dates, are hashed as text
+        dump = json.dumps(content, sort_keys=True, default=unicode)  # noqa: F821, E501
+        return hashlib.sha1(dump).hexdigest()
+
+    def _get_previous_content_hash(self, package_id):
+        """
+        Return the fingerprint stored by the last imported harvest object of
+        a dataset, or None.
+
+        The gather stages flag the previous object of a dataset as not
+        current when they queue a new one, so the last imported one is
+        looked up instead of the current one.
+        """
+        row = Session.query(HOExtra.value) \
+            .join(HarvestObject,
+                  HOExtra.harvest_object_id == HarvestObject.id) \
+            .filter(HarvestObject.package_id == package_id,
+                    HarvestObject.import_finished != None,  # noqa: E711
+                    HOExtra.key == 'content_hash') \
+            .order_by(desc(HarvestObject.import_finished)) \
+            .first()
+        return row[0] if row else None
+
     def _create_or_update_dataset(self, harvest_object, status):
         """
         Create a data dictionary and then create or update a dataset.
         """
-        parsed_content = self._parse_content(harvest_object.content)
+        parsed_content = self._get_parsed_content(harvest_object)
         package_dict = self._create_package_dict(parsed_content)
+        content_hash = self._get_content_hash(parsed_content, package_dict)
 
         # Add the harvester ID to the extras so that CKAN can find the
         # harvested datasets in searches for stats, etc.
@@ -162,8 +613,17 @@ class NextGEOSSHarvester(HarvesterBase):
         # When updating, never change the iTag tags. Never change the iTag
         # extras. Do not change resources from other harvesters unless forced.
         if status == 'change':
-            log.debug('Updating {}'.format(package_dict['name']))
             old_dataset = harvest_object.package
+            # With update_all, most datasets have not changed since they
+            # were harvested, so do not rewrite and reindex them.
+            if self.source_config.get('skip_unchanged', False) and \
+                    self._get_previous_content_hash(old_dataset.id) == content_hash:  # noqa: E501
+                log.debug('{} has not changed'.format(package_dict['name']))
+                self._set_object_extra(harvest_object, 'status', 'unchanged')
+                self._set_object_extra(harvest_object, 'content_hash',
+                                       content_hash)
+                return {'id': old_dataset.id}
+            log.debug('Updating {}'.format(package_dict['name']))
             old_pkg_dict = self._get_package_dict(old_dataset)
             package_dict['id'] = old_dataset.id
             package_dict['owner_org'] = old_dataset.owner_org
@@ -171,7 +631,6 @@ class NextGEOSSHarvester(HarvesterBase):
                                                      package_dict['tags'])
             package_dict['extras'] = self._update_extras(old_pkg_dict.get('extras', []),  # noqa: E501
                                                          package_dict['extras'])  # noqa: E501
-            package_schema = logic.schema.default_update_package_schema()
             action = 'package_update'
         elif status == 'new':
             log.debug('Creating new dataset for {}'
@@ -179,24 +638,13 @@ class NextGEOSSHarvester(HarvesterBase):
             # Tags, extras, and resources are all new, so we add whatever we
             # get from the parsed content.
             package_dict['id'] = unicode(uuid.uuid4())  # noqa: F821
-            package_dict['owner_org'] = model.Package.get(harvest_object.source.id).owner_org  # noqa: E501
-            package_schema = logic.schema.default_create_package_schema()
-            package_schema['id'] = [unicode]  # noqa: F821
+            package_dict['owner_org'] = self._get_source_owner(
+                harvest_object.source,
+                harvest_object.harvest_job_id)['owner_org']
             action = 'package_create'
 
         # Create context after establishing if we're updating or creating
-        context = {
-            'model': model,
-            'session': model.Session,
-            'user': self._get_user_name(),
-        }
-
-        tag_schema = logic.schema.default_tags_schema()
-        tag_schema['name'] = [not_empty, unicode]  # noqa: F821
-        extras_schema = logic.schema.default_extras_schema()
-        package_schema['tags'] = tag_schema
-        package_schema['extras'] = extras_schema
-        context['schema'] = package_schema
+        context = self._get_context(schema=self._get_package_schema(action))
 
         try:
             package = p.toolkit.get_action(action)(context, package_dict)
@@ -226,41 +674,197 @@ class NextGEOSSHarvester(HarvesterBase):
                                         harvest_object, 'Import')
                 return None
 
+        self._set_object_extra(harvest_object, 'content_hash', content_hash)
         return package
 
+    def _validate_bulk_import_config(self, config_obj):
+        """Check the bulk import settings of a source config."""
+        if not isinstance(config_obj.get('bulk_import', False), bool):
+            raise ValueError('bulk_import must be true or false')
+        batch_size = config_obj.get('bulk_import_batch_size',
+                                    DEFAULT_BULK_BATCH_SIZE)
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('bulk_import_batch_size must be a positive integer')  # noqa: E501
+        workers = config_obj.get('parse_workers', 0)
+        if not isinstance(workers, int) or workers < 0:
+            raise ValueError('parse_workers must be a non-negative integer')
+
+    def _get_parse_pool(self):
+        """
+        Return the pool that builds the package dicts of the bulk import,
+        with `parse_workers` processes from the source config.
+        """
+        pool = getattr(self, 'parse_pool', None)
+        if pool is None:
+            source_config = getattr(self, 'source_config', {})
+            pool = self.parse_pool = parse_pool.ParsePool(
+                self._build_package_dict,
+                source_config.get('parse_workers', 0))
+        return pool
+
+    def _import_harvest_objects(self, harvest_objects):
+        """
+        Import a batch of harvest objects in bulk import mode.
+
+        The package dicts are built first, by the parse pool, and the new
+        datasets and their objects are then saved in a single transaction,
+        in order. The datasets are indexed afterwards with a single Solr
+        commit. The objects whose content cannot be parsed or whose dataset
+        cannot be created get an import error.
+
+        The objects whose dataset already exists, because it was found at
+        gather or because a dataset has the same name, are then imported
+        one by one, as by the import stage.
+        """
+        owner_org = self._get_source_owner(self.job.source,
+                                           self.job.id)['owner_org']
+        results = self._get_parse_pool().map(
+            [harvest_object.content for harvest_object in harvest_objects])
+        names = [result[0]['name'] for parsed, result in results if parsed]
+        existing = {package.name: package for package in
+                    Session.query(Package).filter(Package.name.in_(names))}
+        imported = []
+        errors = []
+        updates = []
+        with _deferred_indexing():
+            for harvest_object, (parsed, result) in zip(harvest_objects,
+                                                        results):
+                Session.add(harvest_object)
+                harvest_object.import_started = datetime.utcnow()
+                if parsed:
+                    package_dict, content_hash = result
+                    package = harvest_object.package or \
+                        existing.get(package_dict['name'])
+                    if package is not None:
+                        harvest_object.package = package
+                        updates.append(harvest_object)
+                        continue
+                    package_dict['id'] = unicode(uuid.uuid4())  # noqa: F821
+                    package_dict['owner_org'] = owner_org
+                    error = self._bulk_create_dataset(package_dict)
+                else:
+                    # The traceback of the worker
+                    error = 'Parse error for {}: {}'.format(
+                        harvest_object.guid, result)
+                if error:
+                    harvest_object.state = 'ERROR'
+                    harvest_object.report_status = 'errored'
+                    errors.append((error, harvest_object))
+                else:
+                    harvest_object.state = 'COMPLETE'
+                    harvest_object.report_status = 'added'
+                    self._set_object_extra(harvest_object, 'content_hash',
+                                           content_hash)
+                    self._save_checkpoint(harvest_object)
+                    imported.append((harvest_object, package_dict['id']))
+                harvest_object.import_finished = datetime.utcnow()
+            Session.flush()
+            self._set_current_objects(imported)
+            Session.commit()
+
+        package_ids = [package_id for _, package_id in imported]
+        for message, harvest_object in errors:
+            self._save_object_error(message, harvest_object, 'Import')
+        if package_ids:
+            search.rebuild(package_ids=package_ids, defer_commit=True)
+            search.commit()
+        for harvest_object in updates:
+            self._import_existing_dataset(harvest_object)
+        log.debug('Bulk import of {} datasets, {} existing ones, {} errors'
+                  .format(len(package_ids), len(updates), len(errors)))
+
+    def _import_existing_dataset(self, harvest_object):
+        """
+        Update the existing dataset of a harvest object of the bulk import,
+        or only flag the object as current if it is unchanged.
+        """
+        self.obj = harvest_object
+        if self._get_object_extra(harvest_object, 'status') == 'unchanged':
+            package = {'id': harvest_object.package.id}
+        else:
+            package = self._create_or_update_dataset(harvest_object, 'change')
+        harvest_object.import_finished = datetime.utcnow()
+        if not package:
+            harvest_object.state = 'ERROR'
+            harvest_object.report_status = 'errored'
+            harvest_object.save()
+            return
+        harvest_object.state = 'COMPLETE'
+        if self._get_object_extra(harvest_object, 'status') == 'unchanged':
+            harvest_object.report_status = 'not modified'
+        else:
+            harvest_object.report_status = 'updated'
+        self._refresh_harvest_objects(harvest_object, package['id'])
+
+    def _bulk_create_dataset(self, package_dict):
+        """
+        Create a dataset without committing it, and return the error
+        message if it cannot be created.
+        """
+        context = self._get_context(
+            schema=self._get_package_schema('package_create'),
+            defer_commit=True)
+        # package_create rolls back the session when the dataset is not
+        # valid, which must not undo the rest of the batch.
+        savepoint = Session.begin_nested()
+        try:
+            p.toolkit.get_action('package_create')(context, package_dict)
+            savepoint.commit()
+        except Exception as e:
+            if savepoint.is_active:
+                savepoint.rollback()
+            return 'Creation error for {}: {}'.format(package_dict['name'],
+                                                      e.message)
+        return None
+
     def _convert_to_geojson(self, spatial):
         """
         Return a GeoJSON polygon if the spatial coordinates are valid.
 
         Return None if not.
         """
-        try:
-            coords = shapely.wkt.loads(spatial)
-        except (ReadingError, WKTReadingError):
-            return None
+        return self._shape_to_geojson(footprint.from_wkt(spatial))
 
-        coords_type = coords.type.upper()
-        if coords_type == 'MULTIPOLYGON':
-            c = coords.geoms[0].exterior.coords
-            c_list = list(c[0])
-        elif coords_type == 'POLYGON':
-            c = coords.exterior.coords
-            c_list = list(c[0])
-        else:
-            return None
+    def _shape_to_geojson(self, geometry):
+        """
+        Return the GeoJSON polygon of a shapely geometry, or None if it is
+        not a polygon.
 
-        # Remove double coordinates -- they are not valid GeoJSON and Solr
-        # will reject them.
-        coords_list = [c_list]
-        for i in c[1:]:
-            new_coord = list(i)
-            if new_coord != coords_list[-1]:
-                coords_list.append(new_coord)
+        The footprint is simplified with the `footprint_tolerance` (in
+        degrees) and capped to `footprint_max_vertices` vertices from the
+        source config, if they are set.
+        """
+        source_config = getattr(self, 'source_config', {})
+        return footprint.to_geojson(
+            geometry,
+            tolerance=source_config.get('footprint_tolerance'),
+            max_vertices=source_config.get('footprint_max_vertices'))
 
-        template = Template('''{"type": "Polygon", "coordinates": [$coords_list]}''')  # noqa: E501
-        geojson = template.substitute(coords_list=coords_list)
+    def _validate_footprint_config(self, config_obj):
+        """Check the footprint settings of a source config."""
+        tolerance = config_obj.get('footprint_tolerance', 0)
+        if isinstance(tolerance, bool) or \
+                not isinstance(tolerance, (int, float)) or tolerance < 0:
+            raise ValueError('footprint_tolerance must be a positive number')
+        max_vertices = config_obj.get('footprint_max_vertices')
+        if max_vertices is not None and (
+                not isinstance(max_vertices, int) or
+                max_vertices < footprint.MIN_VERTICES):
+            raise ValueError('footprint_max_vertices must be an integer of at least {}'.format(footprint.MIN_VERTICES))  # noqa: E501
 
-        return geojson
+    def _validate_rate_limit_config(self, config_obj):
+        """Check the rate limit settings of a source config."""
+        rate = config_obj.get('requests_per_second', 1)
+        if isinstance(rate, bool) or \
+                not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError('requests_per_second must be a positive number')
+        burst = config_obj.get('request_burst', 1)
+        if isinstance(burst, bool) or not isinstance(burst, int) or burst < 1:
+            raise ValueError('request_burst must be a positive integer')
+        retries = config_obj.get('throttle_retries', 0)
+        if isinstance(retries, bool) or not isinstance(retries, int) or \
+                retries < 0:
+            raise ValueError('throttle_retries must be a non-negative integer')  # noqa: E501
 
     def _get_extras(self, parsed_content):
         """Return a list of CKAN extras."""
@@ -268,7 +872,8 @@ class NextGEOSSHarvester(HarvesterBase):
         extras_tmp = [{'key': key, 'value': value}
                       for key, value in parsed_content.items()
                       if key not in skip]
-        extras = [{'key': 'dataset_extra', 'value': str(extras_tmp)}]
+        extras = [{'key': 'dataset_extra',
+                   'value': extras_codec.encode(extras_tmp)}]
 
         return extras
 
@@ -320,7 +925,7 @@ class NextGEOSSHarvester(HarvesterBase):
             # For datasets with multiple sources, the extras are expanded
             # with new fields
             if "dataset_extra" in new_extras[0]['key']:
-                new_values = eval(new_extras[0]['value'])
+                new_values = extras_codec.decode(new_extras[0]['value'])
             else:
                 new_values = new_extras
             new_extra_keys = [new_value['key'] for new_value in new_values]
@@ -329,7 +934,8 @@ class NextGEOSSHarvester(HarvesterBase):
                 if ((old_extra['key'] not in new_extra_keys) and 
                     (old_extra['key'] not in ignore_list)):
                     new_values.append(old_extra)
-            return [{'key': 'dataset_extra', 'value': str(new_values)}]
+            return [{'key': 'dataset_extra',
+                     'value': extras_codec.encode(new_values)}]
         else:
             # For datasets with single source, the extras are replaced
             # with the fields collected in the most recent harvest
@@ -457,8 +1063,9 @@ class NextGEOSSHarvester(HarvesterBase):
         # Perform the necessary harvester housekeeping
         self._refresh_harvest_objects(harvest_object, package_id)
 
-        # Finish up
-        if status == 'unchanged':
+        # Finish up. Changed objects whose content is the same as before are
+        # flagged as unchanged by _create_or_update_dataset().
+        if self._get_object_extra(harvest_object, 'status') == 'unchanged':
             return 'unchanged'
         else:
             log.debug('Package {} was successully harvested.'
@@ -1,17 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import time
 from datetime import datetime
 
-import requests
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import Timeout
-from bs4 import BeautifulSoup as Soup
 
-from ckan import model
-import ckan.logic as logic
-from ckan.lib.helpers import get_pkg_dict_extra
 from ckan.model import Session
 from ckan.model import Package
 
@@ -19,6 +13,8 @@ from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
 from ckanext.harvest.harvesters.base import HarvesterBase
 
+from ckanext.nextgeossharvest.lib import feed_parser, prefetch
+
 
 log = logging.getLogger(__name__)
 
@@ -48,6 +44,29 @@ class OpenSearchHarvester(HarvesterBase):
 
         return entries
 
+    def _get_entries_from_feed(self, feed):
+        """
+        Extract the entries from a streamed OpenSearch response.
+
+        Same as _get_entries_from_results(), but reads a StreamingFeed, so
+        only the entry being processed is kept in memory.
+        """
+        for entry in feed:
+            content = feed_parser.serialize(entry)
+            # The lowercase identifier will serve as the dataset's name,
+            # so we need the lowercase version for the lookup in the next step.
+            identifier = feed_parser.text(feed_parser.find(entry, self.os_id_name, self.os_id_attr)).lower()  # noqa: E501
+            if hasattr(self, 'os_id_mod'):
+                identifier = self.os_id_mod(identifier)
+            guid = feed_parser.text(feed_parser.find(entry, self.os_guid_name, self.os_guid_attr))  # noqa: E501
+            if hasattr(self, 'os_guid_mod'):
+                guid = self.os_guid_mod(guid)
+            restart_date = feed_parser.text(feed_parser.find(entry, self.os_restart_date_name, self.os_restart_date_attr))  # noqa: E501
+            if hasattr(self, 'os_restart_date_mod'):
+                restart_date = self.os_restart_date_mod(restart_date)
+            yield {'content': content, 'identifier': identifier,
+                   'guid': guid, 'restart_date': restart_date}
+
     def _get_next_url(self, soup):
         """
         Get the next URL.
@@ -60,52 +79,147 @@ class OpenSearchHarvester(HarvesterBase):
         else:
             return None
 
-    def _crawl_results(self, harvest_url, limit=100, timeout=5, username=None, password=None, provider=None):  # noqa: E501
+    def _resolve_page_entries(self, entries):
         """
-        Iterate through the results, create harvest objects,
-        and return the ids.
+        Look up the existing packages and current harvest objects for a page
+        of entries using one query per table instead of one per entry.
+
+        Return a dictionary with a `packages` map (entry identifier to
+        Package), a `current_objects` map (entry GUID to the current
+        HarvestObject) and the set of `flagged_packages`, the ids of the
+        packages that already have the flagged extra. Entries without a
+        match are simply absent.
         """
-        ids = []
-        new_counter = 0
-        update_counter = 0
-        while len(ids) < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
+        names = {entry['identifier'] for entry in entries}
+        guids = {entry['guid'] for entry in entries}
+
+        packages = {}
+        if names:
+            query = Session.query(Package).filter(Package.name.in_(names))
+            packages = {package.name: package for package in query}
+
+        current_objects = {}
+        if guids:
+            query = Session.query(HarvestObject) \
+                .filter(HarvestObject.guid.in_(guids)) \
+                .filter(HarvestObject.current == True)  # noqa: E712
+            current_objects = {obj.guid: obj for obj in query}
+
+        # The flagged extra is only checked if we aren't updating everything
+        flagged_packages = set()
+        if packages and not self.update_all and self.flagged_extra:
+            package_ids = [package.id for package in packages.values()]
+            flagged_packages = self._get_packages_with_extra(
+                package_ids, self.flagged_extra)
+
+        return {'packages': packages, 'current_objects': current_objects,
+                'flagged_packages': flagged_packages}
+
+    def _fetch_pages(self, harvest_url, limit, timeout, username, password):
+        """
+        Download and parse the result pages until `limit` entries have been
+        read or there are no more results.
 
-            # Make a request to the website
+        Yield a dictionary for each page with its `entries`, or with an
+        `error` message if the request failed, in which case it is the last
+        page. This runs in the prefetch thread, so it must not use the
+        database session.
+        """
+        retrieved_entries = 0
+        while retrieved_entries < limit and harvest_url:
+            # Make a request to the website, within the provider's rate
+            # limit and retrying while it throttles us
             timestamp = str(datetime.utcnow())
             log_message = '{:<12} | {} | {} | {}s'
             try:
-                r = requests.get(harvest_url,
-                                 auth=HTTPBasicAuth(username, password),
-                                 verify=False, timeout=timeout)
+                r = self._get_with_backoff(harvest_url,
+                                           auth=HTTPBasicAuth(username,
+                                                              password),
+                                           verify=False, timeout=timeout)
             except Timeout as e:
-                self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
                 status_code = 408
-                elapsed = 9999
                 if hasattr(self, 'provider_logger'):
                     self.provider_logger.info(log_message.format(self.provider,
                         timestamp, status_code, timeout))  # noqa: E128
-                return ids
+                yield {'error': 'Request timed out: {}'.format(e)}
+                return
             if r.status_code != 200:
-                self._save_gather_error('{} error: {}'.format(r.status_code, r.text), self.job)  # noqa: E501
                 elapsed = 9999
                 if hasattr(self, 'provider_logger'):
                     self.provider_logger.info(log_message.format(self.provider,
                         timestamp, r.status_code, elapsed))  # noqa: E128
-                return ids
+                yield {'error': '{} error: {}'.format(r.status_code, r.text)}
+                return
 
             if hasattr(self, 'provider_logger'):
                 self.provider_logger.info(log_message.format(self.provider,
                     timestamp, r.status_code, r.elapsed.total_seconds()))  # noqa: E128, E501
 
-            soup = Soup(r.content, 'lxml')
+            feed = feed_parser.StreamingFeed(r.content)
+
+            # Get the entries from the results
+            entries = list(self._get_entries_from_feed(feed))
+            retrieved_entries += len(entries)
 
             # Get the URL for the next loop, or None to break the loop
-            harvest_url = self._get_next_url(soup)
+            harvest_url = feed.next_url
 
-            # Get the entries from the results
-            entries = self._get_entries_from_results(soup)
+            yield {'entries': entries, 'error': None}
+
+    def _crawl_results(self, harvest_url, limit=100, timeout=5, username=None, password=None, provider=None):  # noqa: E501
+        """
+        Iterate through the results, create harvest objects,
+        and return the ids.
+
+        The next pages are downloaded in the background while the harvest
+        objects of the current one are created. The number of pages read
+        ahead is set with `prefetch_pages` in the source config.
+        """
+        depth = self.source_config.get('prefetch_pages',
+                                       prefetch.DEFAULT_DEPTH)
+        pages = self._fetch_pages(harvest_url, limit, timeout, username,
+                                  password)
+        return self._gather_pages(prefetch.prefetch(pages, depth))
+
+    def _crawl_windows(self, harvest_urls, limit=100, timeout=5, username=None, password=None):  # noqa: E501
+        """
+        Crawl several queries at the same time, e.g. the date windows of a
+        backfill, create harvest objects, and return the ids.
+
+        `harvest_urls` maps the name of each query to its URL. Each query
+        reads up to `limit` entries, and its harvest objects get a
+        `checkpoint` extra with its name, so that it restarts from its own
+        checkpoint in the next job.
+        """
+        depth = max(1, self.source_config.get('prefetch_pages',
+                                              prefetch.DEFAULT_DEPTH))
+        windows = [self._fetch_window_pages(name, harvest_url, limit,
+                                            timeout, username, password)
+                   for name, harvest_url in sorted(harvest_urls.items())]
+        return self._gather_pages(prefetch.merge(windows, depth))
+
+    def _fetch_window_pages(self, name, harvest_url, *args):
+        """Same as _fetch_pages(), with the query name added to the pages."""
+        for page in self._fetch_pages(harvest_url, *args):
+            page['checkpoint'] = name
+            yield page
+
+    def _gather_pages(self, pages):
+        """Create the harvest objects of the entries of the result pages."""
+        ids = []
+        new_counter = 0
+        update_counter = 0
+        for page in pages:
+            # A failed request is the last page of its query
+            if page['error']:
+                self._save_gather_error(page['error'], self.job)
+                continue
+
+            entries = page['entries']
+
+            # Resolve the packages and harvest objects of the whole page
+            # at once instead of querying for each entry
+            resolved = self._resolve_page_entries(entries)
 
             # Create a harvest object for each entry
             for entry in entries:
@@ -113,24 +227,16 @@ class OpenSearchHarvester(HarvesterBase):
                 entry_name = entry['identifier']
                 entry_restart_date = entry['restart_date']
 
-                package = Session.query(Package) \
-                    .filter(Package.name == entry_name).first()
+                package = resolved['packages'].get(entry_name)
 
                 if package:
                     # Meaning we've previously harvested this,
                     # but we may want to reharvest it now.
-                    # We need package_show to ensure that all the conversions
-                    # are carried out.
-                    context = {"user": "test_user", "ignore_auth": True,
-                               "model": model, "session": Session}
-                    pkg_dict = logic.get_action('package_show')(context, {"id": package.name})  # noqa: E501
-                    previous_obj = model.Session.query(HarvestObject) \
-                        .filter(HarvestObject.guid == entry_guid) \
-                        .filter(HarvestObject.current == True) \
-                        .first()  # noqa: E712
+                    # The previous object is flagged as not current here and
+                    # the change is committed along with the new object.
+                    previous_obj = resolved['current_objects'].get(entry_guid)
                     if previous_obj:
                         previous_obj.current = False
-                        previous_obj.save()
 
                     if self.update_all:
                         log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -138,7 +244,7 @@ class OpenSearchHarvester(HarvesterBase):
                         update_counter += 1
                     # E.g., a Sentinel dataset exists,
                     # but doesn't have a NOA resource yet.
-                    elif self.flagged_extra and not get_pkg_dict_extra(pkg_dict, self.flagged_extra):  # noqa: E501
+                    elif self.flagged_extra and package.id not in resolved['flagged_packages']:  # noqa: E501
                         log.debug('{} already exists and will be extended.'.format(entry_name))  # noqa: E501
                         status = 'change'
                         update_counter += 1
@@ -151,10 +257,9 @@ class OpenSearchHarvester(HarvesterBase):
                                                 value=status),
                                                 HOExtra(key='restart_date',
                                                 value=entry_restart_date)])
-                    obj.content = entry['content']
+                    obj.content = self._get_gather_content(entry['content'],
+                                                           status)
                     obj.package = package
-                    obj.save()
-                    ids.append(obj.id)
                 elif not package:
                     # It's a product we haven't harvested before.
                     log.debug('{} has not been harvested before. Creating a new harvest object.'.format(entry_name))  # noqa: E501
@@ -164,15 +269,17 @@ class OpenSearchHarvester(HarvesterBase):
                                                 HOExtra(key='restart_date',
                                                 value=entry_restart_date)])
                     new_counter += 1
-                    obj.content = entry['content']
+                    obj.content = self._get_gather_content(entry['content'])
                     obj.package = None
-                    obj.save()
-                    ids.append(obj.id)
+                if page.get('checkpoint'):
+                    obj.extras.append(HOExtra(key='checkpoint',
+                                              value=page['checkpoint']))
+                ids.append(self._save_harvest_object(obj))
+
+            # Commit the harvest objects of the page at once
+            self._flush_harvest_objects(final=False)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
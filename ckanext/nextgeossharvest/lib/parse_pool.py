@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Parse harvest object contents in a pool of worker processes.
+
+Turning an entry into a package dict (parsing, normalizing the names,
+building the resources and the footprint) is pure CPU work and does not
+depend on the other entries, while writing the datasets is bound by the
+database. A ParsePool runs the first part in worker processes and hands
+the results back in order, so that the caller's process, the only one that
+touches the database, can write them one after the other.
+"""
+
+import multiprocessing
+import traceback
+
+# The function run by a worker. The workers are forked, so they inherit it
+# from the parent instead of receiving it pickled.
+_function = None
+
+
+def _init_worker(function):
+    global _function
+    _function = function
+
+
+def _call(function, item):
+    """Return (True, result) or (False, the traceback of the error)."""
+    try:
+        return True, function(item)
+    except Exception:
+        return False, traceback.format_exc()
+
+
+def _work(item):
+    return _call(_function, item)
+
+
+class ParsePool(object):
+    """
+    Apply a function to a list of items in `workers` processes.
+
+    The function may be a bound method of the harvester, but it must not
+    use the database session: the workers share the parent's connections.
+    Its results must be picklable. With 0 workers the items are processed
+    in the calling process.
+    """
+
+    def __init__(self, function, workers=0):
+        self.function = function
+        self.workers = workers
+        self.pool = None
+
+    def map(self, items):
+        """
+        Return a (True, result) or (False, traceback) tuple for each item,
+        in the order of the items.
+        """
+        if self.workers < 1:
+            return [_call(self.function, item) for item in items]
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, _init_worker,
+                                             (self.function,))
+        return self.pool.map(_work, items)
+
+    def close(self):
+        """Wait for the workers to exit."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Read ahead of a slow iterator in a background thread.
+
+The crawl loops alternate between waiting for the provider and writing
+harvest objects to the database. Wrapping the page iterator with
+prefetch() lets the next pages download while the current one is being
+persisted, so a page takes about max(network, database) time instead of
+their sum. ordered_map() does the same for the requests made for each
+entry of a page.
+"""
+
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+from Queue import Empty, Full, Queue
+
+
+DEFAULT_DEPTH = 1
+DEFAULT_WORKERS = 4
+# How often a blocked producer checks whether the consumer has given up.
+POLL_INTERVAL = 0.5
+
+_DONE = object()
+
+
+class _Failure(object):
+    """An exception raised by the producer, re-raised for the consumer."""
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+
+def prefetch(iterable, depth=DEFAULT_DEPTH):
+    """
+    Iterate over `iterable` while a background thread computes up to
+    `depth` items ahead.
+
+    The producer must not touch the database session, which belongs to the
+    consumer's thread. Exceptions raised by the producer are re-raised when
+    the consumer reaches the failed item. If the consumer stops early, the
+    producer stops after the item it is working on.
+
+    With a depth of 0 the items are computed in the calling thread.
+    """
+    return merge([iterable], depth)
+
+
+def merge(iterables, depth=DEFAULT_DEPTH):
+    """
+    Iterate over the items of several iterables, each computed by its own
+    background thread up to `depth` items ahead, in the order in which
+    they become available.
+
+    The same rules as for prefetch() apply to the producers. With a depth
+    of 0 the iterables are consumed one after the other in the calling
+    thread.
+    """
+    iterables = list(iterables)
+    if depth < 1:
+        for iterable in iterables:
+            for item in iterable:
+                yield item
+        return
+
+    queue = Queue(maxsize=depth * max(1, len(iterables)))
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce(iterable):
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception:
+            put(_Failure(sys.exc_info()))
+            return
+        put(_DONE)
+
+    threads = []
+    for iterable in iterables:
+        thread = threading.Thread(target=produce, args=(iterable,),
+                                  name='prefetch')
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    try:
+        running = len(threads)
+        while running:
+            try:
+                item = queue.get(timeout=POLL_INTERVAL)
+            except Empty:
+                if queue.empty() and not any(thread.is_alive()
+                                             for thread in threads):
+                    return
+                continue
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, _Failure):
+                exc_type, exc_value, exc_traceback = item.exc_info
+                raise exc_type, exc_value, exc_traceback
+            yield item
+    finally:
+        stopped.set()
+
+
+def ordered_map(function, items, workers=DEFAULT_WORKERS):
+    """
+    Iterate over function(item) for each of `items`, in the order of the
+    items, while up to `workers` threads compute them.
+
+    It is meant for the requests that a crawl loop makes for every entry of
+    a page, like the PROBA-V metalinks. The same rules as for prefetch()
+    apply to `function`, and `items` should be a list: it is read ahead by
+    the pool. An exception raised by `function` is re-raised when the
+    consumer reaches the failed item.
+
+    With fewer than 2 workers the items are computed in the calling thread.
+    """
+    if workers < 2:
+        for item in items:
+            yield function(item)
+        return
+
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap(function, items):
+            yield result
+    finally:
+        pool.terminate()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Token-bucket rate limiting for the harvesters' requests to providers.
+
+Each provider gets one limiter per process. Crawl loops call acquire()
+before each request, which only blocks if the provider's allowance has
+been used up. When a provider answers 429 or 503, the limiter pauses all
+the requests to that provider for the time given in the Retry-After header
+and halves its rate. The configured rate is restored step by step while the
+provider keeps answering normally.
+
+A shared limiter keeps its bucket in a file instead, so that every process
+of the machine that harvests the same provider, e.g. all the fetch
+consumers, draws from a single allowance.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import mktime_tz, parsedate_tz
+
+
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+DEFAULT_BURST = 1
+THROTTLE_STATUSES = (429, 503)
+# The lowest fraction of the configured rate that a limiter backs off to.
+MIN_RATE_FACTOR = 0.125
+
+log = logging.getLogger(__name__)
+
+_limiters = {}
+_lock = threading.Lock()
+
+
+def parse_retry_after(value):
+    """
+    Return the number of seconds to wait according to a Retry-After
+    header, which is either a number of seconds or an HTTP date, or None
+    if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, mktime_tz(date) - time.time())
+
+
+class RateLimiter(object):
+    """
+    Allow `requests_per_second` requests on average and up to `burst`
+    requests at once.
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 burst=DEFAULT_BURST, clock=time.time, sleep=time.sleep):
+        if not requests_per_second > 0:
+            raise ValueError('requests_per_second must be a positive number')
+        self.max_rate = float(requests_per_second)
+        self.rate = self.max_rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock on the state of the bucket."""
+        with self._lock:
+            yield
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - max(self._updated, self.paused_until))
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+    def acquire(self):
+        """Block until a request may be made and take a token for it."""
+        while True:
+            with self._locked():
+                now = self._clock()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now,
+                           (1 - self.tokens) / self.rate)
+            self._sleep(wait)
+
+    def backoff(self, retry_after=None):
+        """
+        Slow down after the provider has throttled a request.
+
+        Requests are paused for `retry_after` seconds, or for one interval
+        at the reduced rate if the provider did not say how long to wait.
+        """
+        with self._locked():
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FACTOR)
+            if retry_after is None:
+                retry_after = 1 / self.rate
+            # Only one request may be made as soon as the pause is over.
+            self.tokens = 1.0
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+    def recover(self):
+        """Move the rate back towards the configured one."""
+        if self.rate >= self.max_rate:
+            return
+        with self._locked():
+            self.rate = min(self.max_rate,
+                            self.rate + self.max_rate * MIN_RATE_FACTOR)
+
+    def update(self, response):
+        """Back off or recover depending on the status of a response."""
+        if response.status_code in THROTTLE_STATUSES:
+            self.backoff(parse_retry_after(
+                response.headers.get('Retry-After')))
+        else:
+            self.recover()
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    A RateLimiter whose bucket, pause and rate are shared through the file
+    at `path` by all the processes that use it.
+
+    The file is locked with flock() while the state is read and written.
+    If the file cannot be opened, e.g. because it belongs to another user,
+    the limiter only limits the requests of its own process.
+    """
+
+    STATE = ('tokens', '_updated', 'paused_until', 'rate')
+
+    def __init__(self, path, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 burst=DEFAULT_BURST, clock=time.time, sleep=time.sleep):
+        super(SharedRateLimiter, self).__init__(requests_per_second, burst,
+                                                clock, sleep)
+        self.path = path
+        self._file = None
+        self._pid = None
+
+    def _open(self):
+        """Return the state file, or None if it cannot be opened."""
+        # flock() locks are shared with the children forked by a process,
+        # so each process opens the file itself.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                self._file = os.fdopen(fd, 'r+')
+            except (IOError, OSError) as e:
+                log.warning('Cannot open the shared rate limit file {}, '
+                            'limiting the requests of this process only: {}'
+                            .format(self.path, e))
+                self._file = None
+        return self._file
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            state_file = self._open()
+            if state_file is None:
+                yield
+                return
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                try:
+                    state = json.loads(state_file.read())
+                except ValueError:
+                    # A new file, or the file of a crashed process
+                    state = {}
+                for name in self.STATE:
+                    setattr(self, name, state.get(name, getattr(self, name)))
+                # The settings of this process win over the file's
+                self.rate = min(self.rate, self.max_rate)
+                self.tokens = min(self.tokens, self.burst)
+                yield
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(
+                    {name: getattr(self, name) for name in self.STATE}))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    # recover() is inherited: the rate of this process is read from the
+    # file by every acquire(), so the file is only locked and rewritten
+    # while the shared rate is below the configured one.
+
+
+def get_shared_path(provider, directory=None):
+    """
+    Return the file that holds the shared bucket of a provider, in
+    `directory` or else in the temporary directory.
+    """
+    return os.path.join(directory or tempfile.gettempdir(),
+                        'nextgeossharvest-{}.rate'.format(provider))
+
+
+def get_rate_limiter(provider, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                     burst=DEFAULT_BURST, shared=False, directory=None):
+    """
+    Return the limiter of a provider, creating it on first use.
+
+    With `shared`, the limiter is a SharedRateLimiter, whose allowance is
+    shared with the other processes of the machine through a file in
+    `directory`, see get_shared_path().
+
+    The limiter is replaced if it was created with different settings,
+    e.g. after the source config has been edited.
+    """
+    settings = (requests_per_second, burst, shared, directory)
+    with _lock:
+        cached = _limiters.get(provider)
+        if cached is None or cached[0] != settings:
+            if shared:
+                limiter = SharedRateLimiter(
+                    get_shared_path(provider, directory),
+                    requests_per_second, burst)
+            else:
+                limiter = RateLimiter(requests_per_second, burst)
+            cached = (settings, limiter)
+            _limiters[provider] = cached
+        return cached[1]
@@ -6,13 +6,13 @@ from ckan.model import Package
 from ckan.model import Session
 from ckanext.harvest.model import HarvestObject
 from ckanext.harvest.model import HarvestObjectExtra as HOExtra
+from ckanext.nextgeossharvest.lib import feed_parser
 from datetime import datetime
 from string import Template
 from bs4 import BeautifulSoup as Soup
 import logging
-import requests
 from requests.exceptions import Timeout
-import time
+from urlparse import parse_qs, urlparse
 import uuid
 import re
 import json
@@ -226,18 +226,28 @@ class CSAGHarvester(HarvesterBase):
 
         return resources
 
-    def _get_entries_from_results(self, soup, restart_record, next_record):
+    def _get_records_from_feed(self, feed):
+        """
+        Extract the content and identifier of every record of a streamed
+        CSWSearch response.
+        """
+        records = []
+
+        for record in feed:
+            content = feed_parser.serialize(record)
+            identifier = feed_parser.text(feed_parser.find(record, 'dc:identifier'))  # noqa: E501
+            records.append({'content': content, 'identifier': identifier})
+
+        return records
+
+    def _get_entries_from_results(self, records, restart_record, next_record):
         """Extract the entries from an CSWSearch response."""
         entries = []
 
-        for entry in soup.find_all({'csw:summaryrecord'}):
-            content = entry.encode()
-            # The lowercase identifier will serve as the dataset's name,
-            # so we need the lowercase version for the lookup in the next step.
-            identifier = entry.find('dc:identifier').text  # noqa: E501
+        for record in records:
             guid = unicode(uuid.uuid4())
 
-            entries.append({'content': content, 'identifier': identifier, 'guid': guid, 'restart_record': restart_record})  # noqa: E501
+            entries.append({'content': record['content'], 'identifier': record['identifier'], 'guid': guid, 'restart_record': restart_record})  # noqa: E501
 
         # If this job is interrupted mid-way, then the new job will re-harvest
         # the collections of this job (restart_record is the initial record)
@@ -264,6 +274,8 @@ class CSAGHarvester(HarvesterBase):
     def _get_entry_time_and_author(self, base_url, identifier, timeout):
         """Extract time information from an entry"""
         record_url = base_url + '/pycsw/?service=CSW&request=GetRecordById&version=2.0.2&id=' + identifier + '&mode=opensearch'  # noqa: E501
+        # Wait until the provider's rate limit allows another request
+        self._get_rate_limiter().acquire()
         response = self._make_request(record_url, timeout)
         extra_content = {}
         if response == None:
@@ -271,22 +283,100 @@ class CSAGHarvester(HarvesterBase):
             extra_content['timerange_end'] = None
         else:
             for entry in response.find_all({'atom:entry'}):
-                extra_content['timerange_start'] = entry.find('timerange_start').text
-                extra_content['timerange_end'] = entry.find('timerange_end').text
-                extra_content['author'] = entry.find('atom:name').text
+                extra_content.update(self._get_time_and_author(entry))
 
         return extra_content
 
-    def _make_request(self, harvest_url, timeout):
-        """Make request to the data source interface"""
+    def _get_entries_time_and_author(self, base_url, identifiers, timeout):
+        """
+        Return the time information of several entries, by identifier.
+
+        GetRecordById accepts a comma-separated list of ids, so the entries
+        of a page are requested at once. The ones that are missing from the
+        reply, or all of them if the request fails, are requested one by
+        one. The results are kept for the rest of the job.
+        """
+        cache = self._entry_time_and_author
+        key = self._normalize_identifier
+        pending = [x for x in identifiers if key(x) not in cache]
+        if len(pending) > 1:
+            record_url = base_url + '/pycsw/?service=CSW&request=GetRecordById&version=2.0.2&id=' + ','.join(pending) + '&mode=opensearch'  # noqa: E501
+            self._get_rate_limiter().acquire()
+            # The records are requested one by one if this fails, so it is
+            # not an error of the job yet.
+            response = self._make_request(record_url, timeout,
+                                          record_error=False)
+            if response is not None:
+                for entry in response.find_all({'atom:entry'}):
+                    identifier = self._get_reply_identifier(entry)
+                    if identifier is not None:
+                        cache[key(identifier)] = \
+                            self._get_time_and_author(entry)
+            else:
+                log.warning('Batched GetRecordById failed, requesting the '
+                            'records one by one.')
+
+        for identifier in pending:
+            if key(identifier) not in cache:
+                cache[key(identifier)] = self._get_entry_time_and_author(
+                    base_url, identifier, timeout)
+
+        return {x: cache[key(x)] for x in identifiers}
+
+    def _normalize_identifier(self, identifier):
+        """Return the key of an identifier in the time and author cache."""
+        return identifier.strip().lower()
+
+    def _get_reply_identifier(self, entry):
+        """
+        Return the identifier of an entry of a GetRecordById reply, from
+        dc:identifier, or else from atom:id, which may be the URL of the
+        record, or None.
+        """
+        element = entry.find('dc:identifier') or entry.find('atom:id')
+        if element is None:
+            return None
+        identifier = element.text.strip()
+        if '://' in identifier:
+            query = parse_qs(urlparse(identifier).query)
+            # The query keys are case insensitive in CSW
+            ids = [value for name, value in query.items()
+                   if name.lower() == 'id']
+            if ids:
+                identifier = ids[0][0]
+        return identifier
+
+    def _get_time_and_author(self, entry):
+        """Return the time information and the author of an Atom entry."""
+        return {'timerange_start': entry.find('timerange_start').text,
+                'timerange_end': entry.find('timerange_end').text,
+                'author': entry.find('atom:name').text}
+
+    def _make_request(self, harvest_url, timeout, record_error=True):
+        """Make request to the data source interface and parse the reply"""
+        r = self._get_response(harvest_url, timeout, record_error)
+        if r is None:
+            return None
+
+        soup = Soup(r.content, 'lxml')
+        return soup
+
+    def _get_response(self, harvest_url, timeout, record_error=True):
+        """
+        Make request to the data source interface.
+
+        Return None if it fails, after saving a gather error unless
+        `record_error` is False.
+        """
 
         # Make a request to the website
         timestamp = str(datetime.utcnow())
         log_message = '{:<12} | {} | {} | {}s'
         try:
-            r = requests.get(harvest_url, timeout=timeout)
+            r = self._get_http_session().get(harvest_url, timeout=timeout)
         except Timeout as e:
-            self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
+            if record_error:
+                self._save_gather_error('Request timed out: {}'.format(e), self.job)  # noqa: E501
             status_code = 408
             elapsed = 9999
             if hasattr(self, 'provider_logger'):
@@ -294,7 +384,8 @@ class CSAGHarvester(HarvesterBase):
                     timestamp, status_code, timeout))  # noqa: E128
             return None
         if r.status_code != 200:
-            self._save_gather_error('{} error: {}'.format(r.status_code, r.text), self.job)  # noqa: E501
+            if record_error:
+                self._save_gather_error('{} error: {}'.format(r.status_code, r.text), self.job)  # noqa: E501
             elapsed = 9999
             if hasattr(self, 'provider_logger'):
                 self.provider_logger.info(log_message.format(self.provider,
@@ -305,8 +396,7 @@ class CSAGHarvester(HarvesterBase):
             self.provider_logger.info(log_message.format(self.provider,
                 timestamp, r.status_code, r.elapsed.total_seconds()))  # noqa: E128, E501
 
-        soup = Soup(r.content, 'lxml')
-        return soup
+        return r
 
     def _crawl_results(self, harvest_url, limit=100, timeout=5):  # noqa: E501
         """
@@ -317,20 +407,26 @@ class CSAGHarvester(HarvesterBase):
         new_counter = 0
         update_counter = 0
         base_url = self.source_config.get('source_url')
+        self._entry_time_and_author = {}
 
         while len(ids) < limit and harvest_url:
-            # We'll limit ourselves to one request per second
-            start_request = time.time()
+            # Wait until the provider's rate limit allows another request
+            self._get_rate_limiter().acquire()
 
-            soup = self._make_request(harvest_url, timeout)
+            r = self._get_response(harvest_url, timeout)
 
-            if not soup:
+            if r is None:
                 return ids
 
-            next_url = soup.find('csw:searchresults', elementset="summary")
-            records_returned = next_url['numberofrecordsreturned']
-            next_record = next_url['nextrecord']
-            number_records_matched = next_url['numberofrecordsmatched']
+            feed = feed_parser.StreamingFeed(r.content,
+                                             entry_tag='SummaryRecord',
+                                             feed_tags=('SearchResults',))
+            records = self._get_records_from_feed(feed)
+
+            next_url = feed.find('SearchResults', {'elementSet': 'summary'})
+            records_returned = next_url.get('numberOfRecordsReturned')
+            next_record = next_url.get('nextRecord')
+            number_records_matched = next_url.get('numberOfRecordsMatched')
 
             if next_record != '0':
                 current_record = str(eval(next_record) - eval(records_returned))  # noqa: E501
@@ -342,7 +438,10 @@ class CSAGHarvester(HarvesterBase):
             harvest_url = self._get_next_url(harvest_url, records_returned, next_record, limit)  # noqa: E501
 
             # Get the entries from the results
-            entries = self._get_entries_from_results(soup, current_record, next_record)  # noqa: E501
+            entries = self._get_entries_from_results(records, current_record, next_record)  # noqa: E501
+
+            extra_contents = self._get_entries_time_and_author(
+                base_url, [entry['identifier'] for entry in entries], timeout)
 
             # Create a harvest object for each entry
             for entry in entries:
@@ -350,7 +449,7 @@ class CSAGHarvester(HarvesterBase):
                 entry_name = 'saeon_csag_' + entry['identifier'].lower().replace('.', '_').replace('/', '-')  # noqa: E501
 
                 full_content = {}
-                full_content['extra_content'] = self._get_entry_time_and_author(base_url, entry['identifier'], timeout)  # noqa: E501
+                full_content['extra_content'] = extra_contents[entry['identifier']]  # noqa: E501
                 full_content['raw_content'] = entry['content']
 
                 package = Session.query(Package) \
@@ -365,7 +464,6 @@ class CSAGHarvester(HarvesterBase):
                         .first()  # noqa: E712
                     if previous_obj:
                         previous_obj.current = False
-                        previous_obj.save()
 
                     if self.update_all:
                         log.debug('{} already exists and will be updated.'.format(entry_name))  # noqa: E501
@@ -382,8 +480,7 @@ class CSAGHarvester(HarvesterBase):
                                                 value=entry['restart_record'])])  # noqa: E501
                     obj.content = json.dumps(full_content)
                     obj.package = package
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
                 elif not package:
                     # It's a product we haven't harvested before.
                     log.debug('{} has not been harvested before. Creating a new harvest object.'.format(entry_name))  # noqa: E501
@@ -395,13 +492,12 @@ class CSAGHarvester(HarvesterBase):
                     new_counter += 1
                     obj.content = json.dumps(full_content)
                     obj.package = None
-                    obj.save()
-                    ids.append(obj.id)
+                    ids.append(self._save_harvest_object(obj))
+
+            # Commit the harvest objects of the page at once
+            self._flush_harvest_objects(final=False)
 
-            end_request = time.time()
-            request_time = end_request - start_request
-            if request_time < 1.0:
-                time.sleep(1 - request_time)
+        self._flush_harvest_objects()
 
         harvester_msg = '{:<12} | {} | jobID:{} | {} | {}'
         if hasattr(self, 'harvester_logger'):
@@ -1,6 +1,6 @@
 
 from owslib.wfs import WebFeatureService
-from owslib.fes import *
+from owslib.fes import Or, PropertyIsLike
 from owslib.etree import etree
 import json
 
@@ -66,3 +66,13 @@ class WFS():
         constraint = PropertyIsLike(propertyname=propertyname, literal=value)
         filterxml = etree.tostring(constraint.toXML()).decode("utf-8")
         return filterxml
+
+    def set_filter_any_of(self, propertyname, values):
+        constraints = [PropertyIsLike(propertyname=propertyname, literal=value)
+                       for value in values]
+        if len(constraints) == 1:
+            constraint = constraints[0]
+        else:
+            constraint = Or(constraints)
+        filterxml = etree.tostring(constraint.toXML()).decode("utf-8")
+        return filterxml
@@ -1,17 +1,30 @@
 import ckan.plugins as plugins
 import shapely
 import json
-import ast
 from ignore_list.ignore_list import IGNORE_LIST
 import logging
+from collections import Counter
+
+from ckan import model
+
+from ckanext.nextgeossharvest.lib import checkpoint, extras_codec
 
 log = logging.getLogger(__name__)
 
 
 class NextgeossharvestPlugin(plugins.SingletonPlugin):
     plugins.implements(plugins.IConfigurer, inherit=True)
+    plugins.implements(plugins.IConfigurable, inherit=True)
     plugins.implements(plugins.IPackageController, inherit=True)
 
+    def configure(self, config):
+        """
+        Create the checkpoint table before any harvest object is imported.
+        """
+        # The database is not initialized yet when running `paster db init`
+        if model.package_table.exists():
+            checkpoint.setup()
+
     def before_index(self, pkg_dict):
         """Expand extras if they're saved as a single string."""
         # If dataset_type is:
@@ -26,11 +39,12 @@ class NextgeossharvestPlugin(plugins.SingletonPlugin):
 
             collection_id = pkg_dict.get('collection_id', None)
             if collection_id:
-                try:
-                    fields_list = IGNORE_LIST[collection_id]
-                    pkg_dict = remove_fields_from_index(pkg_dict, fields_list)
-                except:
-                    pass
+                ignored_fields = IGNORED_FIELDS.get(collection_id)
+                if ignored_fields is not None:
+                    pkg_dict = {key: value for key, value in pkg_dict.items()
+                                if key not in ignored_fields}
+                else:
+                    count_unknown_collection(collection_id)
             else:
                 error_message = ("Couldn't check ignore list in before_index."
                                  " Collection ID not found in package metadata.")
@@ -41,24 +55,39 @@ class NextgeossharvestPlugin(plugins.SingletonPlugin):
 
 def convert_dataset_extra(dataset_extra_string):
     """Convert the dataset_extra string into indexable extras."""
-    extras = ast.literal_eval(dataset_extra_string)
+    extras = extras_codec.decode(dataset_extra_string)
 
     return [(extra["key"], extra["value"]) for extra in extras]
 
 
-def remove_from_dict(pkg_dict, key):
-    key_exists = pkg_dict.get(key, None)
-    if key_exists is not None:
-        pkg_dict.pop(key, None)
-    return pkg_dict
+def compile_ignore_list(ignore_list):
+    """
+    Return the fields to remove from the index of each collection of an
+    ignore list, as a frozenset that also holds their extras_ variants.
+    """
+    return {collection_id: frozenset(list(fields) +
+                                     ['extras_{}'.format(field)
+                                      for field in fields])
+            for collection_id, fields in ignore_list.items()}
+
+
+def count_unknown_collection(collection_id):
+    """
+    Count a dataset indexed without an ignore list for its collection.
 
+    The first dataset of each such collection is logged, then every
+    UNKNOWN_COLLECTION_LOG_INTERVAL datasets, with the running count.
+    """
+    unknown_collections[collection_id] += 1
+    count = unknown_collections[collection_id]
+    if count == 1 or count % UNKNOWN_COLLECTION_LOG_INTERVAL == 0:
+        log.warning('No ignore list for collection {}, {} datasets indexed'
+                    ' without one'.format(collection_id, count))
 
-def remove_fields_from_index(pkg_dict, field_list):
 
-    extras_field_template = "extras_{}"
-    for field in field_list:
-        pkg_dict = remove_from_dict(pkg_dict, field)
-        extras_field = extras_field_template.format(field)
-        pkg_dict = remove_from_dict(pkg_dict, extras_field)
+# Compiled once, when the plugin is loaded
+IGNORED_FIELDS = compile_ignore_list(IGNORE_LIST)
 
-    return pkg_dict
+# Number of datasets indexed per collection that has no ignore list
+unknown_collections = Counter()
+UNKNOWN_COLLECTION_LOG_INTERVAL = 10000
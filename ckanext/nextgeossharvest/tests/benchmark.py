@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks of the parse and gather hot paths.
+
+Run them with
+
+    python -m ckanext.nextgeossharvest.tests.benchmark [-n REPEAT] [NAME ...]
+
+Each benchmark runs in its own process, against the fixtures of this
+directory and with the HTTP requests mocked, so no database, network or
+running CKAN is needed. It reports the number of entries processed per
+second and the peak memory of the process.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from collections import OrderedDict
+
+import requests_mock
+from bs4 import BeautifulSoup as Soup
+
+from ckanext.nextgeossharvest.harvesters.esa import ESAHarvester
+from ckanext.nextgeossharvest.harvesters.gome2 import GOME2Harvester
+from ckanext.nextgeossharvest.harvesters.probav import PROBAVHarvester
+from ckanext.nextgeossharvest.lib import extras_codec, feed_parser
+from ckanext.nextgeossharvest.plugin import NextgeossharvestPlugin
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+HARVEST_URL = 'https://benchmark.example/search'
+
+GOME2_URL = ('https://wdc.dlr.de/data_products/VIEWER/missing_days.php?'
+             'start_date={}&wpid={}')
+GOME2_COVERAGES = ['GOME2_O3', 'GOME2_NO2', 'GOME2_SO2', 'GOME2_SO2mass',
+                   'GOME2_TropNO2']
+GOME2_DATES = ['2018-01-01', '2018-01-02', '2018-01-03']
+
+# Do not let the rate limiter slow down the mocked requests
+SOURCE_CONFIG = {'source': 'esa_scihub',
+                 'requests_per_second': 1000000,
+                 'request_burst': 1000}
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(function):
+    """
+    Register a benchmark.
+
+    The function prepares the benchmark and returns a callable that runs it
+    once and returns the number of entries it processed.
+    """
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def read_fixture(name):
+    with open(os.path.join(directory, name), 'rb') as f:
+        return f.read()
+
+
+def esa_harvester():
+    harvester = ESAHarvester()
+    harvester.source_config = dict(SOURCE_CONFIG)
+    harvester.provider = 'benchmark'
+    harvester.os_id_name = 'str'
+    harvester.os_id_attr = {'name': 'identifier'}
+    harvester.os_guid_name = 'str'
+    harvester.os_guid_attr = {'name': 'uuid'}
+    harvester.os_restart_date_name = 'date'
+    harvester.os_restart_date_attr = {'name': 'ingestiondate'}
+    return harvester
+
+
+def probav_harvester():
+    harvester = PROBAVHarvester()
+    harvester._init()
+    harvester.source_config = dict(SOURCE_CONFIG)
+    harvester.provider = 'benchmark'
+    return harvester
+
+
+def sentinel_entries():
+    feed = feed_parser.StreamingFeed(
+        read_fixture('feeds/sentinel-1-results-feed.xml'))
+    return [feed_parser.serialize(entry) for entry in feed]
+
+
+@benchmark
+def esa_parse_content():
+    harvester = esa_harvester()
+    entries = sentinel_entries()
+
+    def run():
+        for entry in entries:
+            harvester._parse_content(entry)
+        return len(entries)
+    return run
+
+
+@benchmark
+def opensearch_entries_from_results():
+    harvester = esa_harvester()
+    content = read_fixture('feeds/sentinel-1-results-feed.xml')
+
+    def run():
+        soup = Soup(content, 'lxml')
+        return len(harvester._get_entries_from_results(soup))
+    return run
+
+
+@benchmark
+def opensearch_entries_from_feed():
+    harvester = esa_harvester()
+    content = read_fixture('feeds/sentinel-1-results-feed.xml')
+
+    def run():
+        feed = feed_parser.StreamingFeed(content)
+        return len(list(harvester._get_entries_from_feed(feed)))
+    return run
+
+
+@benchmark
+def opensearch_fetch_pages():
+    harvester = esa_harvester()
+    content = read_fixture('feeds/sentinel-1-results-feed.xml')
+    # Every page links to the next one, so read 10 pages
+    content = content.replace(
+        'https://scihub.copernicus.eu/dhus/search?q=*&amp;start=10&amp;rows=10',  # noqa: E501
+        HARVEST_URL)
+    mocker = requests_mock.Mocker()
+    mocker.get(HARVEST_URL, content=content)
+
+    def run():
+        with mocker:
+            pages = harvester._fetch_pages(HARVEST_URL, 100, 5, None, None)
+            return sum(len(page['entries']) for page in pages)
+    return run
+
+
+@benchmark
+def probav_parse_content():
+    harvester = probav_harvester()
+    feed = feed_parser.StreamingFeed(read_fixture('l2a_500_entries.xml'))
+    contents = [harvester._create_harvest_object(
+        'guid', 'date', feed_parser.serialize(entry))['content']
+        for entry in feed]
+
+    def run():
+        for content in contents:
+            harvester._parse_content(content)
+        return len(contents)
+    return run
+
+
+@benchmark
+def probav_gather_L2A():
+    harvester = probav_harvester()
+    mocker = requests_mock.Mocker()
+    mocker.get(HARVEST_URL,
+               content=read_fixture('feeds/PROBAV_L2A_1KM_V001.xml'))
+
+    def run():
+        with mocker:
+            objects = list(harvester._gather_L2A_L1C(HARVEST_URL))
+        for harvest_object in objects:
+            harvester._parse_content(harvest_object['content'])
+        return len(objects)
+    return run
+
+
+@benchmark
+def probav_metalink():
+    harvester = probav_harvester()
+    mocker = requests_mock.Mocker()
+    # The last matcher registered is tried first
+    mocker.get(requests_mock.ANY, content=read_fixture('metalink.xml'))
+    mocker.get(HARVEST_URL, content=read_fixture('s1_100m.xml'))
+
+    def run():
+        with mocker:
+            objects = list(harvester._gather_L3(HARVEST_URL))
+        for harvest_object in objects:
+            harvester._parse_content(harvest_object['content'])
+        return len(objects)
+    return run
+
+
+@benchmark
+def gome2_missing_days():
+    harvester = GOME2Harvester()
+    harvester.source_config = dict(SOURCE_CONFIG)
+    harvester.provider = 'benchmark'
+    harvester.provider_logger = logging.getLogger('benchmark')
+    mocker = requests_mock.Mocker()
+    for coverage in GOME2_COVERAGES:
+        response = read_fixture(
+            'gome2_responses/2018-01-01-{}.json'.format(coverage))
+        for date_string in GOME2_DATES:
+            mocker.get(GOME2_URL.format(date_string, coverage),
+                       content=response)
+    harvester.date_strings = GOME2_DATES
+
+    def run():
+        entries = 0
+        with mocker:
+            for coverage in GOME2_COVERAGES:
+                for content_dict in harvester._content_dict_generator(
+                        coverage):
+                    if not harvester._is_missing(
+                            coverage, content_dict['date_string'],
+                            'benchmark'):
+                        harvester._parse_content(json.dumps(content_dict))
+                    entries += 1
+        return entries
+    return run
+
+
+@benchmark
+def convert_to_geojson():
+    harvester = esa_harvester()
+    soup = Soup(read_fixture('feeds/sentinel-1-results-feed.xml'), 'lxml')
+    footprints = [element.text for element in
+                  soup.find_all('str', {'name': 'footprint'})]
+
+    def run():
+        for footprint in footprints:
+            harvester._convert_to_geojson(footprint)
+        return len(footprints)
+    return run
+
+
+def index_benchmark(encode):
+    """
+    Return a before_index() benchmark whose dataset_extra values are
+    encoded with `encode`.
+    """
+    harvester = esa_harvester()
+    plugin = NextgeossharvestPlugin()
+    pkg_dicts = []
+    for entry in sentinel_entries():
+        item = harvester._parse_content(entry)
+        extras = [{'key': key, 'value': value}
+                  for key, value in sorted(item.items())
+                  if isinstance(value, basestring)]
+        pkg_dicts.append({'dataset_type': 'dataset',
+                          'collection_id': item['collection_id'],
+                          'dataset_extra': encode(extras)})
+
+    def run():
+        for pkg_dict in pkg_dicts:
+            plugin.before_index(dict(pkg_dict))
+        return len(pkg_dicts)
+    return run
+
+
+@benchmark
+def before_index():
+    return index_benchmark(extras_codec.encode)
+
+
+@benchmark
+def before_index_legacy():
+    # The repr() of the datasets that have not been migrated yet, which is
+    # read back with ast.literal_eval()
+    return index_benchmark(str)
+
+
+def measure(name, repeat, connection):
+    """Run a benchmark in this process and send back its results."""
+    run = BENCHMARKS[name]()
+    entries = 0
+    start = time.time()
+    for _ in range(repeat):
+        entries += run()
+    elapsed = time.time() - start
+    # On Linux, ru_maxrss is in kilobytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    connection.send((entries, elapsed, peak))
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run: {}'.format(
+                            ', '.join(BENCHMARKS)))
+    parser.add_argument('-n', '--repeat', type=int, default=10,
+                        help='number of runs of each benchmark')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    row = '{:<32} {:>9} {:>9} {:>11} {:>8}'
+    print row.format('benchmark', 'entries', 'seconds', 'entries/s',
+                     'peak MB')
+    for name in args.names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark {}'.format(name))
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=measure,
+                                          args=(name, args.repeat, sender))
+        process.start()
+        # Only the child holds the sending end, so recv() fails if it dies
+        sender.close()
+        try:
+            entries, elapsed, peak = receiver.recv()
+        except EOFError:
+            print row.format(name, '-', '-', 'failed', '-')
+            continue
+        finally:
+            process.join()
+        print row.format(name, entries, '{:.3f}'.format(elapsed),
+                         '{:.1f}'.format(entries / elapsed),
+                         '{:.1f}'.format(peak))
+
+
+if __name__ == '__main__':
+    main()
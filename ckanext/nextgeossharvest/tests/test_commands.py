@@ -0,0 +1,65 @@
+"""Tests for commands.py."""
+
+import ckan.tests.helpers as helpers
+from ckan import model
+
+from ckanext.nextgeossharvest.commands import DatasetExtraCommand
+from ckanext.nextgeossharvest.lib import extras_codec
+
+EXTRAS = [{'key': 'Filename', 'value': 'S1B_EW_GRDH.SAFE'},
+          {'key': 'uuid', 'value': '02f44244-1c35-481b-9357-764277d949ef'}]
+
+VALUES = {
+    'legacy_1': str(EXTRAS),
+    'legacy_2': str(EXTRAS[:1]),
+    'legacy_3': str(EXTRAS[1:]),
+    'json': extras_codec.encode(EXTRAS),
+    # A byte string that is not UTF-8, which JSON cannot hold
+    'not_utf8': "[{'key': 'title', 'value': '\\xff'}]",
+    'truncated': "[{'key': 'title'",
+}
+
+
+def create_extras():
+    """Create a package with a dataset_extra for each of VALUES."""
+    for name, value in VALUES.items():
+        package = model.Package(name=name.replace('_', '-'))
+        model.Session.add(package)
+        model.Session.add(model.PackageExtra(package=package,
+                                             key=u'dataset_extra',
+                                             value=value))
+    model.repo.commit_and_remove()
+
+
+def read_extras():
+    """Return the dataset_extra values by package name."""
+    return {extra.package.name.replace('-', '_'): extra.value
+            for extra in model.Session.query(model.PackageExtra)
+            .filter(model.PackageExtra.key == u'dataset_extra')}
+
+
+class TestMigrate(object):
+    """Tests for the DatasetExtraCommand.migrate() method."""
+
+    def setup(self):
+        helpers.reset_db()
+
+    def test_migrate(self):
+        create_extras()
+
+        # Several batches, which are paged on the id
+        DatasetExtraCommand('nextgeoss-extras').migrate(batch_size=2)
+
+        values = read_extras()
+        for name in ('legacy_1', 'legacy_2', 'legacy_3'):
+            assert extras_codec.version(values[name]) == extras_codec.VERSION
+            assert extras_codec.decode(values[name]) == \
+                extras_codec.decode(VALUES[name])
+        # The JSON rows are left alone, and the rows that cannot be
+        # converted are skipped without stopping the migration.
+        for name in ('json', 'not_utf8', 'truncated'):
+            assert values[name] == VALUES[name]
+
+        # It can be run again
+        DatasetExtraCommand('nextgeoss-extras').migrate(batch_size=2)
+        assert read_extras() == values
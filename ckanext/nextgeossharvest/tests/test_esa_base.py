@@ -43,3 +43,35 @@ class TestNormalizeNames(object):
         }
 
         assert test_item == expected_item
+
+
+class TestGetDateWindows(object):
+    """Tests for the _get_date_windows() method."""
+
+    def test_windows(self):
+        windows = SentinelHarvester()._get_date_windows(
+            '2018-01-01T00:00:00.000Z', '2018-01-04T00:00:00.000Z', 3)
+
+        assert windows == [
+            ('2018-01-01T00:00:00.000Z', '2018-01-02T00:00:00.000Z', '}'),
+            ('2018-01-02T00:00:00.000Z', '2018-01-03T00:00:00.000Z', '}'),
+            ('2018-01-03T00:00:00.000Z', '2018-01-04T00:00:00.000Z', ']')]
+
+    def test_boundary(self):
+        windows = SentinelHarvester()._get_date_windows(
+            '2018-01-01T00:00:00.000Z', '2018-01-03T00:00:00.000Z', 2)
+
+        def matches(date):
+            """Return the windows whose range query includes date."""
+            return [start for start, end, closing in windows
+                    if start <= date < end or
+                    (closing == ']' and date == end)]
+
+        # The shared boundary belongs to the next window only, and the end
+        # of the last window is still included.
+        assert matches('2018-01-02T00:00:00.000Z') == [
+            '2018-01-02T00:00:00.000Z']
+        assert matches('2018-01-03T00:00:00.000Z') == [
+            '2018-01-02T00:00:00.000Z']
+        assert matches('2018-01-01T00:00:00.000Z') == [
+            '2018-01-01T00:00:00.000Z']
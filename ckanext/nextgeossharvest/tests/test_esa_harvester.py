@@ -1,7 +1,9 @@
 """Tests for nextgeoss_base.py."""
 import json
 import os
+from datetime import timedelta
 
+import requests
 import requests_mock
 from bs4 import BeautifulSoup as Soup
 
@@ -14,11 +16,35 @@ from ckanext.harvest.logic.action.update import harvest_source_update
 from ckanext.harvest.logic.action.get import harvest_source_show
 from ckanext.harvest import queue
 from ckanext.harvest.tests import lib
-from ckanext.harvest.model import HarvestJob
+from ckanext.harvest.model import HarvestJob, HarvestObject
 
 from ckanext.nextgeossharvest.harvesters.esa import ESAHarvester
 
 
+class ThrottledResponse(object):
+    status_code = 429
+    headers = {'Retry-After': '0'}
+    text = 'Too Many Requests'
+
+
+class ThrottlingSession(object):
+    """A session that throttles the first request and then answers."""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        if self.requests == 1:
+            return ThrottledResponse()
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.content
+        response.elapsed = timedelta(seconds=0.1)
+        return response
+
+
 class TestESAHarvester(object):
     """Tests for the ESAHarvester class."""
 
@@ -49,6 +75,38 @@ class TestESAHarvester(object):
         # Replace this with a complete dictionary and assert ==.
         assert parsed_content['name'] == 'S1B_EW_GRDH_1SDH_20180131T104713_20180131T104813_009414_010EA4_BD6D'.lower()  # noqa: E501
 
+    def test_parse_at_gather(self):
+        entries = self.harvester._get_entries_from_results(self.one_page_of_results)  # noqa: E501
+        content = entries[0]['content']
+        self.harvester.source_config = {'source': 'esa_scihub',
+                                        'parse_at_gather': True,
+                                        'keep_raw_content': True}
+        parsed_content = json.loads(json.dumps(
+            self.harvester._parse_content(content)))
+
+        gather_content = self.harvester._get_gather_content(content)
+        harvest_object = HarvestObject(content=gather_content)
+
+        assert self.harvester._get_parsed_content(harvest_object) == parsed_content  # noqa: E501
+        assert json.loads(gather_content)['raw_content'] == content
+        assert self.harvester._get_gather_content(content, 'unchanged') == content  # noqa: E501
+
+    def test_throttled_page(self):
+        harvester = self.harvester
+        harvester.source_config = {'requests_per_second': 1000}
+        harvester.provider = 'esa_throttled'
+        session = ThrottlingSession(self.raw_results)
+        harvester._get_http_session = lambda provider=None: session
+
+        pages = list(harvester._fetch_pages('https://example.com/search', 10,
+                                            5, None, None))
+
+        # The throttled request is retried and the crawl goes on
+        assert session.requests == 2
+        assert len(pages) == 1
+        assert pages[0]['error'] is None
+        assert len(pages[0]['entries']) == 10
+
     def test_harvester(self):
         """
         Test the harvester by running it for real with mocked requests.
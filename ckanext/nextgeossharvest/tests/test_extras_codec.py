@@ -0,0 +1,33 @@
+"""Tests for extras_codec.py."""
+
+from ckanext.nextgeossharvest.lib import extras_codec
+
+EXTRAS = [{'key': 'Instrument', 'value': 'SAR-C SAR'},
+          {'key': 'Filename', 'value': "S1A_IW_'quoted'.SAFE"}]
+
+
+class TestExtrasCodec(object):
+    """Tests for the dataset_extra codec."""
+
+    def test_round_trip(self):
+        value = extras_codec.encode(EXTRAS)
+
+        assert extras_codec.version(value) == extras_codec.VERSION
+        assert extras_codec.decode(value) == EXTRAS
+
+    def test_empty(self):
+        value = extras_codec.encode([])
+
+        assert extras_codec.version(value) == extras_codec.VERSION
+        assert extras_codec.decode(value) == []
+
+    def test_legacy(self):
+        value = str(EXTRAS)
+
+        assert extras_codec.version(value) == extras_codec.LEGACY_VERSION
+        assert extras_codec.decode(value) == EXTRAS
+
+    def test_mentions(self):
+        for value in (str(EXTRAS), extras_codec.encode(EXTRAS)):
+            assert extras_codec.mentions(value, 'Instrument')
+            assert not extras_codec.mentions(value, 'flagged')
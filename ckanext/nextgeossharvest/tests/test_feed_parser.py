@@ -0,0 +1,51 @@
+"""Tests for feed_parser.py."""
+
+import os
+
+from ckanext.nextgeossharvest.lib import feed_parser
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_fixture(name):
+    with open(os.path.join(directory, name), 'rb') as f:
+        return f.read()
+
+
+class TestStreamingFeed(object):
+    """Tests for the StreamingFeed class."""
+
+    def test_sentinel_entries(self):
+        feed = feed_parser.StreamingFeed(
+            read_fixture('feeds/sentinel-1-results-feed.xml'))
+        identifiers = []
+        for entry in feed:
+            element = feed_parser.find(entry, ('str',), {'name': 'identifier'})
+            identifiers.append(feed_parser.text(element))
+
+        assert len(identifiers) == 10
+        assert identifiers[0] == 'S1B_EW_GRDH_1SDH_20180131T104713_20180131T104813_009414_010EA4_BD6D'  # noqa: E501
+        assert feed.next_url == 'https://scihub.copernicus.eu/dhus/search?q=*&start=10&rows=10'  # noqa: E501
+
+    def test_serialize_entry(self):
+        feed = feed_parser.StreamingFeed(
+            read_fixture('feeds/sentinel-1-results-feed.xml'))
+        content = feed_parser.serialize(next(iter(feed)))
+
+        assert content.startswith('<entry>\n<title>S1B_EW_GRDH_1SDH_20180131T104713_20180131T104813_009414_010EA4_BD6D</title>')  # noqa: E501
+
+    def test_prefixed_entries(self):
+        feed = feed_parser.StreamingFeed(read_fixture('l2a_500_entries.xml'))
+        entries = [feed_parser.text(feed_parser.find(entry, 'dc:identifier'))
+                   for entry in feed]
+
+        assert len(entries) == int(feed_parser.text(feed.find('itemsPerPage')))  # noqa: E501
+        assert entries[0] == 'urn:ogc:def:EOP:VITO:PROBAV_L2A_333M_V001:PROBAV_CENTER_L2A_20180101_005544_333M:V101'  # noqa: E501
+        assert feed.next_url is None
+
+    def test_absent_attribute(self):
+        feed = feed_parser.StreamingFeed(read_fixture('l2a_500_entries.xml'))
+        entry = next(iter(feed))
+
+        assert feed_parser.find(entry, 'atom:updated', {'key': None}) is not None  # noqa: E501
+        assert feed_parser.find(entry, 'atom:updated', {'key': 'x'}) is None
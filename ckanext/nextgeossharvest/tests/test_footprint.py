@@ -0,0 +1,110 @@
+"""Tests for footprint.py."""
+
+import json
+import math
+
+import shapely.geometry
+
+from ckanext.nextgeossharvest.lib import footprint
+
+POLYGON = 'POLYGON ((-12.947799 27.343195,-15.513319 27.760723,-15.196670 29.384781,-12.589683 28.970003,-12.947799 27.343195))'  # noqa: E501
+
+
+def circle(vertices):
+    """Return the WKT of a polygon with that many vertices on a circle."""
+    points = ['{} {}'.format(math.cos(2 * math.pi * i / vertices),
+                             math.sin(2 * math.pi * i / vertices))
+              for i in range(vertices)]
+    return 'POLYGON (({}, {}))'.format(', '.join(points), points[0])
+
+
+class TestToGeoJSON(object):
+    """Tests for the to_geojson() function."""
+
+    def test_same_as_template(self):
+        geojson = footprint.to_geojson(footprint.from_wkt(POLYGON))
+
+        assert geojson == '{"type": "Polygon", "coordinates": [[[-12.947799, 27.343195], [-15.513319, 27.760723], [-15.19667, 29.384781], [-12.589683, 28.970003], [-12.947799, 27.343195]]]}'  # noqa: E501
+
+    def test_duplicates(self):
+        wkt = 'POLYGON ((0 0, 0 1, 0 1, 1 1, 1 0, 1 0, 0 0))'
+        geojson = json.loads(footprint.to_geojson(footprint.from_wkt(wkt)))
+
+        assert geojson['coordinates'][0] == [[0, 0], [0, 1], [1, 1], [1, 0],
+                                             [0, 0]]
+
+    def test_multipolygon(self):
+        wkt = 'MULTIPOLYGON (((0 0, 0 1, 1 1, 0 0)), ((5 5, 5 6, 6 6, 5 5)))'
+        geojson = json.loads(footprint.to_geojson(footprint.from_wkt(wkt)))
+
+        # Every part is kept
+        assert geojson == {'type': 'MultiPolygon', 'coordinates': [
+            [[[0, 0], [0, 1], [1, 1], [0, 0]]],
+            [[[5, 5], [5, 6], [6, 6], [5, 5]]]]}
+
+    def test_holes(self):
+        wkt = 'POLYGON ((0 0, 0 10, 10 10, 10 0, 0 0), (2 2, 2 3, 3 3, 3 3, 2 2))'  # noqa: E501
+        geojson = json.loads(footprint.to_geojson(footprint.from_wkt(wkt)))
+
+        assert geojson == {'type': 'Polygon', 'coordinates': [
+            [[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]],
+            [[2, 2], [2, 3], [3, 3], [2, 2]]]}
+
+        wkt = 'MULTIPOLYGON (((0 0, 0 10, 10 10, 10 0, 0 0), (2 2, 2 3, 3 3, 2 2)), ((20 20, 20 21, 21 21, 20 20)))'  # noqa: E501
+        geojson = json.loads(footprint.to_geojson(footprint.from_wkt(wkt)))
+
+        assert geojson['coordinates'][0][1] == [[2, 2], [2, 3], [3, 3],
+                                                [2, 2]]
+        assert len(geojson['coordinates'][1]) == 1
+
+    def test_not_a_polygon(self):
+        assert footprint.to_geojson(footprint.from_wkt('POINT (1 2)')) is None
+        assert footprint.to_geojson(footprint.from_wkt('POLYGON ((10 10, 10))')) is None  # noqa: E501
+        assert footprint.to_geojson(footprint.from_wkb('not hex')) is None
+
+    def test_wkb(self):
+        geometry = footprint.from_wkt(POLYGON)
+
+        assert footprint.to_geojson(footprint.from_wkb(geometry.wkb_hex)) == \
+            footprint.to_geojson(geometry)
+
+    def test_bbox(self):
+        geojson = json.loads(footprint.to_geojson(footprint.bbox(0, 1, 2, 3)))
+
+        assert geojson['coordinates'][0] == [[0, 1], [0, 3], [2, 3], [2, 1],
+                                             [0, 1]]
+
+    def test_tolerance(self):
+        geometry = footprint.from_wkt(circle(500))
+        geojson = json.loads(footprint.to_geojson(geometry, tolerance=0.01))
+        ring = geojson['coordinates'][0]
+
+        assert len(ring) < 100
+        assert ring[0] == ring[-1]
+
+    def test_max_vertices(self):
+        geometry = footprint.from_wkt(circle(500))
+        for max_vertices in (4, 20, 100):
+            geojson = json.loads(footprint.to_geojson(
+                geometry, max_vertices=max_vertices))
+            ring = geojson['coordinates'][0]
+
+            assert 4 <= len(ring) <= max_vertices
+            assert ring[0] == ring[-1]
+
+        geojson = footprint.to_geojson(geometry, max_vertices=1000)
+        assert len(json.loads(geojson)['coordinates'][0]) == 501
+
+    def test_max_vertices_per_ring(self):
+        exterior = footprint.from_wkt(circle(500)).exterior.coords
+        hole = [(x / 2, y / 2) for x, y in exterior]
+        geometry = shapely.geometry.MultiPolygon(
+            [shapely.geometry.Polygon(exterior, [hole]),
+             footprint.bbox(5, 5, 6, 6)])
+        geojson = json.loads(footprint.to_geojson(geometry, max_vertices=20))
+
+        assert [len(polygon) for polygon in geojson['coordinates']] == [2, 1]
+        for polygon in geojson['coordinates']:
+            for ring in polygon:
+                assert 4 <= len(ring) <= 20
+                assert ring[0] == ring[-1]
@@ -0,0 +1,48 @@
+"""Tests for harvest_object_writer.py."""
+
+from ckanext.nextgeossharvest.lib.harvest_object_writer import HarvestObjectWriter  # noqa: E501
+
+
+class FakeSession(object):
+    def __init__(self):
+        self.added = []
+        self.commits = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        self.commits.append(len(self.added))
+
+
+class FakeObject(object):
+    def __init__(self, id=None):
+        self.id = id
+
+
+class TestHarvestObjectWriter(object):
+    """Tests for the HarvestObjectWriter class."""
+
+    def test_batches(self):
+        session = FakeSession()
+        writer = HarvestObjectWriter(session, batch_size=3)
+        for _ in range(7):
+            writer.add(FakeObject())
+        assert session.commits == [3, 6]
+
+        writer.flush()
+        assert session.commits == [3, 6, 7]
+
+    def test_ids(self):
+        session = FakeSession()
+        writer = HarvestObjectWriter(session)
+        ids = [writer.add(FakeObject()) for _ in range(5)]
+
+        assert ids == [obj.id for obj in session.added]
+        assert len(set(ids)) == 5
+        assert session.commits == []
+
+    def test_existing_id(self):
+        writer = HarvestObjectWriter(FakeSession())
+
+        assert writer.add(FakeObject(u'abc')) == u'abc'
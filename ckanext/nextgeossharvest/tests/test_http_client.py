@@ -0,0 +1,154 @@
+"""Tests for http_client.py."""
+
+import BaseHTTPServer
+import socket
+import threading
+import time
+
+from requests.exceptions import Timeout
+
+from ckanext.nextgeossharvest.lib import http_client, rate_limiter
+from ckanext.nextgeossharvest.tests.test_rate_limiter import FakeResponse
+from ckanext.nextgeossharvest.tests.test_rate_limiter import make_limiter
+
+
+class SlowHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers after `delay` seconds and counts the requests."""
+
+    delay = 1.0
+    requests = 0
+
+    def do_GET(self):
+        SlowHandler.requests += 1
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write('ok')
+
+    def finish(self):
+        # The client is gone after the timeout
+        try:
+            BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+        except socket.error:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCreateSession(object):
+    """Tests for the create_session() function."""
+
+    def setup(self):
+        SlowHandler.requests = 0
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), SlowHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+
+    def teardown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_read_timeout(self):
+        session = http_client.create_session(timeout=0.3)
+        start = time.time()
+        try:
+            session.get(self.url)
+        except Timeout:
+            pass
+        else:
+            raise AssertionError('The request did not time out')
+
+        # Read timeouts are not retried
+        assert time.time() - start < 1.0
+        assert SlowHandler.requests == 1
+
+
+class ThrottleHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers 429 and counts the requests."""
+
+    requests = 0
+
+    def do_GET(self):
+        ThrottleHandler.requests += 1
+        self.send_response(429)
+        self.send_header('Retry-After', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestThrottling(object):
+    """The throttling replies are left to the rate limiter."""
+
+    def test_not_retried(self):
+        ThrottleHandler.requests = 0
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), ThrottleHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            session = http_client.create_session(timeout=5)
+            session.rate_limiter = rate_limiter.RateLimiter(4.0)
+            response = session.get(
+                'http://127.0.0.1:{}/'.format(server.server_port))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.status_code == 429
+        assert ThrottleHandler.requests == 1
+        assert session.rate_limiter.rate == 2.0
+
+
+class FakeSession(object):
+    """A session that answers with `statuses`, in order."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        return FakeResponse(self.statuses.pop(0), {'Retry-After': '30'})
+
+
+class TestGetWithBackoff(object):
+    """Tests for the get_with_backoff() function."""
+
+    def test_retried(self):
+        limiter, clock = make_limiter(4.0)
+        session = FakeSession([429, 503, 200])
+
+        response = http_client.get_with_backoff(session, limiter,
+                                                'http://example.com/')
+
+        assert response.status_code == 200
+        assert session.requests == 3
+        # Each retry waited for the Retry-After delay
+        assert clock.slept >= 60
+        assert limiter.rate < limiter.max_rate
+
+    def test_retries_exhausted(self):
+        limiter, clock = make_limiter(4.0)
+        session = FakeSession([429, 429, 429])
+
+        response = http_client.get_with_backoff(session, limiter,
+                                                'http://example.com/',
+                                                retries=2)
+
+        assert response.status_code == 429
+        assert session.requests == 3
+
+    def test_not_throttled(self):
+        limiter, clock = make_limiter(4.0)
+        session = FakeSession([500])
+
+        response = http_client.get_with_backoff(session, limiter,
+                                                'http://example.com/')
+
+        assert response.status_code == 500
+        assert session.requests == 1
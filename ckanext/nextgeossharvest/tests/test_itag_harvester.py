@@ -0,0 +1,317 @@
+"""Tests for itag.py."""
+import json
+import threading
+import time
+from datetime import timedelta
+
+from requests.exceptions import Timeout
+from shapely.geometry import Polygon
+
+from ckan.logic import NotFound
+
+from ckanext.harvest.model import HarvestJob, HarvestObject, HarvestSource
+from ckanext.harvest.model import HarvestObjectExtra as HOExtra
+
+from ckanext.nextgeossharvest.harvesters import itag
+from ckanext.nextgeossharvest.harvesters.itag import ITagEnricher
+from ckanext.nextgeossharvest.lib import rate_limiter
+
+BASE_URL = 'http://itag.example'
+CONTENT = json.dumps({'content': {}})
+
+
+def footprint(i):
+    """Return the GeoJSON and the WKT of the i-th test footprint."""
+    coords = [(i, 0), (i, 1), (i + 1, 1), (i, 0)]
+    spatial = json.dumps({'type': 'Polygon',
+                          'coordinates': [[list(x) for x in coords]]})
+    return spatial, Polygon(coords).wkt
+
+
+class CountingLimiter(object):
+    """A rate limiter that only counts the requests."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            self.acquired += 1
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.elapsed = timedelta(seconds=0.1)
+
+
+class FakeSession(object):
+    """
+    A session that answers the footprints of `replies` with their reply,
+    after their delay. A reply is a status code or an exception to raise.
+    """
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        wkt = url.split('footprint=', 1)[1]
+        self.requested.append((url, timeout))
+        delay, reply = self.replies[wkt]
+        time.sleep(delay)
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(reply, '{} for {}'.format(reply, wkt))
+
+
+class FakeLogic(object):
+    """Stands in for ckan.logic, with the actions of `actions`."""
+
+    def __init__(self, actions):
+        self.actions = actions
+
+    def get_action(self, name):
+        return self.actions[name]
+
+
+class FakeITagEnricher(ITagEnricher):
+    """An ITagEnricher that needs neither iTag nor the database."""
+
+    def __init__(self, replies=None, source_config=None):
+        self.session = FakeSession(replies or {})
+        self.limiter = CountingLimiter()
+        self.source_config = source_config or {'base_url': BASE_URL + '/'}
+        self.objects = []
+        self.errors = []
+        self.refreshed = []
+
+    def _get_rate_limiter(self, provider=None):
+        return self.limiter
+
+    def _get_http_session(self, provider=None):
+        return self.session
+
+    def _get_context(self, **kwargs):
+        return dict(kwargs)
+
+    def _get_package_schema(self, action):
+        return {}
+
+    def _get_source_owner(self, source, job_id):
+        return {'owner_org': 'org-id', 'organization': 'esa'}
+
+    def _save_harvest_object(self, obj):
+        self.objects.append(obj)
+        return obj.guid
+
+    def _flush_harvest_objects(self, final=True):
+        pass
+
+    def _save_object_error(self, message, obj, stage):
+        self.errors.append((message, stage))
+
+    def _refresh_harvest_objects(self, harvest_object, package_id):
+        self.refreshed.append((harvest_object, package_id))
+
+
+class PatchedLogic(object):
+    """Replaces the ckan.logic of itag.py with a FakeLogic."""
+
+    def setup(self):
+        self.actions = {}
+        self.logic = itag.logic
+        itag.logic = FakeLogic(self.actions)
+
+    def teardown(self):
+        itag.logic = self.logic
+
+
+class TestRequestTags(object):
+    """Tests for the _request_tags() method."""
+
+    def test_tags(self):
+        spatial, wkt = footprint(0)
+        harvester = FakeITagEnricher({wkt: (0, 200)})
+
+        response, error = harvester._request_tags(spatial)
+
+        assert (response, error) == ('200 for {}'.format(wkt), None)
+        url, timeout = harvester.session.requested[0]
+        assert url.startswith(BASE_URL + '/?taggers=')
+        assert timeout == 5
+        assert harvester.limiter.acquired == 1
+
+    def test_errors(self):
+        spatial_500, wkt_500 = footprint(0)
+        spatial_timeout, wkt_timeout = footprint(1)
+        harvester = FakeITagEnricher({wkt_500: (0, 500),
+                                      wkt_timeout: (0, Timeout('slow'))})
+
+        assert harvester._request_tags(spatial_500) == \
+            (None, '500 error on request: 500 for {}'.format(wkt_500))
+        assert harvester._request_tags(spatial_timeout) == \
+            (None, 'Request timed out: slow')
+
+    def test_shared_rate_limit(self):
+        harvester = ITagEnricher()
+        harvester.source_config = {}
+
+        # The fetch consumers share the limit by default
+        assert isinstance(harvester._get_rate_limiter('itag'),
+                          rate_limiter.SharedRateLimiter)
+
+        harvester.source_config = {'shared_rate_limit': False}
+        assert not isinstance(harvester._get_rate_limiter('itag'),
+                              rate_limiter.SharedRateLimiter)
+
+
+class TestGather(PatchedLogic):
+    """Tests for the gather_stage() and _get_untagged() methods."""
+
+    def search(self, context, data_dict):
+        """Return the rows of self.datasets after the id cursor."""
+        self.searches.append(data_dict)
+        fq = data_dict['fq']
+        results = self.datasets
+        if ' +id:{' in fq:
+            last_id = fq.split(' +id:{', 1)[1].split(' TO *]')[0]
+            results = [x for x in results if x['id'] > last_id]
+        return {'results': results[:data_dict['rows']]}
+
+    def setup(self):
+        super(TestGather, self).setup()
+        self.searches = []
+        self.actions['package_search'] = self.search
+        # The second dataset has no footprint
+        self.datasets = [{'id': 'a', 'extras_spatial': footprint(0)[0]},
+                         {'id': 'b'},
+                         {'id': 'c', 'extras_spatial': footprint(2)[0]},
+                         {'id': 'd', 'extras_spatial': footprint(3)[0]},
+                         {'id': 'e', 'extras_spatial': footprint(4)[0]}]
+
+    def make_job(self, **source_config):
+        source_config['base_url'] = BASE_URL
+        return HarvestJob(id='job-id', source=HarvestSource(
+            id='source-id', config=json.dumps(source_config)))
+
+    def test_untagged(self):
+        harvester = FakeITagEnricher()
+
+        results = list(harvester._get_untagged({}, '+organization:esa', 3, 2))
+
+        assert [package_id for package_id, _ in results] == ['a', 'c', 'd']
+        assert results[0][1] == self.datasets[0]['extras_spatial']
+        # Only the ids and the footprints are read, a page after the other
+        assert [x['fq'] for x in self.searches] == [
+            '+organization:esa', '+organization:esa +id:{b TO *]']
+        assert [x['rows'] for x in self.searches] == [2, 2]
+        for search in self.searches:
+            assert search['fl'] == ['id', 'extras_spatial']
+            assert search['sort'] == 'id asc'
+
+    def test_last_page(self):
+        harvester = FakeITagEnricher()
+
+        results = list(harvester._get_untagged({}, '', 10, 2))
+
+        assert len(results) == 4
+        assert len(self.searches) == 3
+
+    def test_gather(self):
+        harvester = FakeITagEnricher()
+
+        ids = harvester.gather_stage(self.make_job(datasets_per_job=2))
+
+        assert ids == ['a', 'c']
+        # The objects carry the footprint, not a copy of the package
+        for obj in harvester.objects:
+            assert sorted(x.key for x in obj.extras) == ['spatial', 'status']
+            assert obj.content is None
+        assert harvester.session.requested == []
+
+    def test_batch_fetch(self):
+        # The first footprints take the longest, and the second one fails
+        replies = {}
+        for i, dataset in enumerate(self.datasets):
+            if 'extras_spatial' in dataset:
+                replies[footprint(i)[1]] = ((5 - i) * 0.01, 200)
+        replies[footprint(2)[1]] = (0, 500)
+        harvester = FakeITagEnricher(replies)
+
+        ids = harvester.gather_stage(self.make_job(datasets_per_job=4,
+                                                   batch_fetch=True,
+                                                   fetch_workers=4))
+
+        # The responses are matched to their datasets despite the order in
+        # which they come, and the failure only affects its own dataset,
+        # which is left for the fetch stage.
+        assert ids == ['a', 'c', 'd', 'e']
+        contents = [obj.content for obj in harvester.objects]
+        assert contents == ['200 for {}'.format(footprint(0)[1]), None,
+                            '200 for {}'.format(footprint(3)[1]),
+                            '200 for {}'.format(footprint(4)[1])]
+        assert harvester.limiter.acquired == 4
+
+
+class TestImport(PatchedLogic):
+    """Tests for the import_stage() method."""
+
+    def setup(self):
+        super(TestImport, self).setup()
+        self.shown = []
+        self.updated = []
+        self.actions['package_show'] = self.show
+        self.actions['package_update'] = self.update
+        self.packages = {'a': {'id': 'a', 'name': 'dataset-a',
+                               'tags': [], 'extras': []}}
+
+    def show(self, context, data_dict):
+        self.shown.append(data_dict['id'])
+        if data_dict['id'] not in self.packages:
+            raise NotFound()
+        return self.packages[data_dict['id']]
+
+    def update(self, context, package):
+        self.updated.append(package)
+        return package
+
+    def make_object(self, guid, extras=()):
+        return HarvestObject(guid=guid, content=CONTENT,
+                             extras=[HOExtra(key=key, value=value)
+                                     for key, value in extras])
+
+    def test_package_loaded(self):
+        harvester = FakeITagEnricher()
+        obj = self.make_object('a', [('status', 'change'),
+                                     ('spatial', footprint(0)[0])])
+
+        assert harvester.import_stage(obj)
+
+        # The package is loaded here, not in the gather stage
+        assert self.shown == ['a']
+        assert {'key': 'itag', 'value': 'tagged'} in \
+            self.updated[0]['extras']
+        assert harvester.refreshed == [(obj, 'a')]
+
+    def test_package_extra(self):
+        # Objects gathered before the package was loaded here
+        harvester = FakeITagEnricher()
+        package = {'id': 'a', 'name': 'dataset-a', 'tags': [], 'extras': []}
+        obj = self.make_object('a', [('package', json.dumps(package))])
+
+        assert harvester.import_stage(obj)
+
+        assert self.shown == []
+        assert self.updated[0]['id'] == 'a'
+
+    def test_deleted_package(self):
+        harvester = FakeITagEnricher()
+        obj = self.make_object('z', [('status', 'change')])
+
+        assert not harvester.import_stage(obj)
+
+        assert harvester.errors == [('Dataset z no longer exists', 'Import')]
+        assert self.updated == []
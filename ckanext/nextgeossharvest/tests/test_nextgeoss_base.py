@@ -1,7 +1,18 @@
 """Tests for nextgeoss_base.py."""
 
 import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime
 
+from nose.tools import assert_raises
+
+import ckan.tests.helpers as helpers
+from ckan.model import Package, Session
+from ckanext.harvest.model import HarvestJob, HarvestObject, HarvestSource
+from ckanext.harvest.model import HarvestObjectExtra as HOExtra
+
+from ckanext.nextgeossharvest.lib import checkpoint
 from ckanext.nextgeossharvest.lib.nextgeoss_base import NextGEOSSHarvester
 
 
@@ -25,3 +36,406 @@ class TestConvertToGeoJSON(object):
         geo_dict = json.loads(geojson)
         assert geo_dict['type'] == 'Polygon'
         assert geo_dict['coordinates'][0] == [[-12.947799, 27.343195], [-15.513319, 27.760723], [-15.19667, 29.384781], [-12.589683, 28.970003], [-12.947799, 27.343195]]  # noqa: E501
+
+    def test_footprint_config(self):
+        coords = 'POLYGON ((0 0, 0 1, 0.5 1.01, 1 1, 1 0, 0 0))'
+        harvester = NextGEOSSHarvester()
+        harvester.source_config = {'footprint_tolerance': 0.1}
+        geo_dict = json.loads(harvester._convert_to_geojson(coords))
+
+        assert geo_dict['coordinates'][0] == [[0, 0], [0, 1], [1, 1], [1, 0], [0, 0]]  # noqa: E501
+
+    def test_validate_config(self):
+        harvester = NextGEOSSHarvester()
+        harvester._validate_footprint_config({'footprint_tolerance': 0.001,
+                                              'footprint_max_vertices': 4})
+
+        for config_obj in ({'footprint_tolerance': '0.1'},
+                           {'footprint_tolerance': -1},
+                           {'footprint_max_vertices': 3},
+                           {'footprint_max_vertices': 10.5}):
+            assert_raises(ValueError, harvester._validate_footprint_config,
+                          config_obj)
+
+
+class DictHarvester(NextGEOSSHarvester):
+    """Harvests the JSON dicts stored as content."""
+
+    def _parse_content(self, content):
+        return json.loads(content)
+
+    def _get_resources(self, parsed_content):
+        return []
+
+
+class DatabaseTest(object):
+    """Resets the database and creates the test user before each test."""
+
+    def setup(self):
+        helpers.reset_db()
+        self.context = {'user': 'test_user', 'ignore_auth': True}
+        helpers.call_action('user_create', dict(self.context),
+                            name='test_user', email='test@example.com',
+                            password='testpassword')
+
+    def create_harvest_job(self, config):
+        """Return a job of a new harvest source with that config."""
+        org = helpers.call_action('organization_create', dict(self.context),
+                                  name='test_org')
+        source = helpers.call_action('harvest_source_create',
+                                     dict(self.context),
+                                     url='http://example.com/test',
+                                     name='test_source', owner_org=org['id'],
+                                     source_type='gome2',
+                                     config=json.dumps(config))
+        job = HarvestJob(source=HarvestSource.get(source['id']))
+        job.save()
+        return job
+
+
+def make_content(name, notes='Notes'):
+    """Return the content of a dataset, with a new uuid each time."""
+    return json.dumps({'name': name, 'title': name.title(), 'notes': notes,
+                       'tags': [], 'uuid': str(uuid.uuid4())})
+
+
+def import_object(harvester, job, content, status, package=None):
+    """Import a harvest object as the harvest queue does."""
+    harvest_object = HarvestObject(guid=unicode(uuid.uuid4()), job=job,  # noqa: F821, E501
+                                   content=content,
+                                   extras=[HOExtra(key='status',
+                                                   value=status)])
+    harvest_object.package = package
+    harvest_object.save()
+    result = harvester.import_stage(harvest_object)
+    harvest_object.import_finished = datetime.utcnow()
+    harvest_object.save()
+    return harvest_object, result
+
+
+class TestValidateRateLimitConfig(object):
+    """Tests for the _validate_rate_limit_config() method."""
+
+    def test_validate_config(self):
+        harvester = NextGEOSSHarvester()
+        harvester._validate_rate_limit_config({'requests_per_second': 0.5,
+                                               'request_burst': 2})
+
+        for config_obj in ({'requests_per_second': 0},
+                           {'requests_per_second': -1},
+                           {'requests_per_second': '1'},
+                           {'request_burst': 0}):
+            assert_raises(ValueError, harvester._validate_rate_limit_config,
+                          config_obj)
+
+
+class TestParseAtGather(object):
+    """Tests for the _get_gather_content() method."""
+
+    def test_parse_error(self):
+        harvester = DictHarvester()
+        harvester.source_config = {'parse_at_gather': True}
+
+        assert json.loads(harvester._get_gather_content('{"name": "a"}')) \
+            == {'parsed_content': {'name': 'a'}}
+        # Left to the import stage, which reports the error of the object
+        assert harvester._get_gather_content('not JSON') == 'not JSON'
+
+
+class TestGetPackagesWithExtra(DatabaseTest):
+    """Tests for the _get_packages_with_extra() method."""
+
+    def test_plain_and_dataset_extras(self):
+        packages = {
+            'plain': [{'key': 'noa_download_url', 'value': 'https://noa'}],
+            'nested': [{'key': 'dataset_extra', 'value': str([
+                {'key': 'noa_download_url', 'value': 'https://noa'}])}],
+            'empty': [{'key': 'dataset_extra', 'value': str([
+                {'key': 'noa_download_url', 'value': ''}])}],
+            'other': [{'key': 'dataset_extra', 'value': str([
+                {'key': 'scihub_download_url', 'value': 'https://scihub'}])}],
+        }
+        ids = {}
+        for name, extras in packages.items():
+            package = helpers.call_action('package_create',
+                                          dict(self.context),
+                                          name=name, extras=extras)
+            ids[package['id']] = name
+
+        found = NextGEOSSHarvester()._get_packages_with_extra(
+            list(ids), 'noa_download_url')
+
+        assert {ids[package_id] for package_id in found} == {'plain', 'nested'}  # noqa: E501
+
+
+class TestCheckpoint(DatabaseTest):
+    """Tests for the harvest source checkpoints."""
+
+    def test_cursor_from_extras(self):
+        harvest_object = HarvestObject(extras=[
+            HOExtra(key='status', value='new'),
+            HOExtra(key='restart_date', value='2018-01-01T00:00:00.000Z')])
+
+        cursor = NextGEOSSHarvester()._get_checkpoint_cursor(harvest_object)
+
+        assert cursor == {'restart_date': '2018-01-01T00:00:00.000Z'}
+
+    def test_save_and_get(self):
+        harvester = NextGEOSSHarvester()
+        assert harvester._get_checkpoint(u'source') == {}
+
+        checkpoint.save_checkpoint(Session, u'source', {'restart_date': '1'})
+        checkpoint.save_checkpoint(Session, u'source', {'restart_date': '2'})
+        Session.commit()
+
+        assert harvester._get_checkpoint(u'source') == {'restart_date': '2'}
+
+    def test_concurrent_insert(self):
+        checkpoint.setup()
+
+        checkpoint.save_checkpoint(RacingSession(), u'source',
+                                   {'restart_date': '2'})
+        Session.commit()
+
+        assert checkpoint.get_checkpoint(Session, u'source') == \
+            {'restart_date': '2'}
+
+    def test_unreadable_cursor(self):
+        harvest_object = HarvestObject(content='<entry></entry>')
+
+        assert JSONCursorHarvester()._read_checkpoint_cursor(
+            harvest_object) is None
+
+
+class RacingSession(object):
+    """
+    A session in which another import inserts the checkpoint of the source
+    just after its first UPDATE.
+    """
+
+    def __init__(self):
+        self.updated = False
+
+    def execute(self, statement):
+        result = Session.execute(statement)
+        if not self.updated:
+            self.updated = True
+            checkpoint.save_checkpoint(Session, u'source',
+                                       {'restart_date': '1'})
+        return result
+
+    def begin_nested(self):
+        return Session.begin_nested()
+
+
+class JSONCursorHarvester(NextGEOSSHarvester):
+    def _get_checkpoint_cursor(self, harvest_object):
+        return json.loads(harvest_object.content)
+
+
+class TestGetPackageSchema(object):
+    """Tests for the _get_package_schema() method."""
+
+    def test_cached_copies(self):
+        harvester = NextGEOSSHarvester()
+        schema = harvester._get_package_schema('package_create')
+        schema['tags']['name'].append('changed')
+        schema['extras'] = None
+
+        other = harvester._get_package_schema('package_create')
+
+        assert 'changed' not in other['tags']['name']
+        assert other['extras']
+        assert other['id'] == [unicode]  # noqa: F821
+
+
+class TestContentHash(DatabaseTest):
+    """Tests for the change detection of the import stage."""
+
+    def test_stable_hash(self):
+        harvester = NextGEOSSHarvester()
+        first = OrderedDict([('name', 'a'), ('StartTime', datetime(2018, 1, 1))])  # noqa: E501
+        second = OrderedDict([('StartTime', '2018-01-01 00:00:00'), ('name', 'a')])  # noqa: E501
+        public = {'private': False}
+
+        assert harvester._get_content_hash(first, public) == \
+            harvester._get_content_hash(second, public)
+        assert harvester._get_content_hash(first, public) != \
+            harvester._get_content_hash(first, {'private': True})
+        assert harvester._get_content_hash(first, public) != \
+            harvester._get_content_hash({'name': 'b'}, public)
+        # The uuid of some harvesters is new on every harvest
+        first_uuid = {'name': 'a', 'uuid': '1'}
+        second_uuid = {'name': 'a', 'uuid': '2'}
+        assert harvester._get_content_hash(first_uuid, public) == \
+            harvester._get_content_hash(second_uuid, public)
+
+    def test_skip_unchanged(self):
+        job = self.create_harvest_job({'update_all': True,
+                                       'skip_unchanged': True})
+        harvester = DictHarvester()
+        first, result = import_object(harvester, job, make_content('a'),
+                                      'new')
+        assert result is True
+        package = Package.get(first.package_id)
+        modified = package.metadata_modified
+
+        # The next gather flags the object as not current
+        first.current = False
+        first.save()
+        second, result = import_object(harvester, job, make_content('a'),
+                                       'change', package)
+
+        assert result == 'unchanged'
+        assert harvester._get_object_extra(second, 'status') == 'unchanged'
+        assert Package.get(package.id).metadata_modified == modified
+        assert second.current
+
+        second.current = False
+        second.save()
+        third, result = import_object(harvester, job,
+                                      make_content('a', 'New notes'),
+                                      'change', package)
+
+        assert result is True
+        assert Package.get(package.id).notes == 'New notes'
+
+    def test_set_object_extra(self):
+        harvester = NextGEOSSHarvester()
+        harvest_object = HarvestObject(extras=[
+            HOExtra(key='status', value='change')])
+
+        harvester._set_object_extra(harvest_object, 'status', 'unchanged')
+        harvester._set_object_extra(harvest_object, 'content_hash', 'abc')
+
+        assert [(extra.key, extra.value) for extra in harvest_object.extras] \
+            == [('status', 'unchanged'), ('content_hash', 'abc')]
+
+
+class FakeSource(object):
+    def __init__(self, id, config):
+        self.id = id
+        self.config = config
+
+
+class TestGetSourceOwner(DatabaseTest):
+    """Tests for the _get_source_owner() method."""
+
+    def test_cached_per_job_and_config(self):
+        org = helpers.call_action('organization_create', dict(self.context),
+                                  name='test_org')
+        package = helpers.call_action('package_create', dict(self.context),
+                                      name='source', owner_org=org['id'])
+        source = FakeSource(package['id'], '{}')
+        harvester = NextGEOSSHarvester()
+
+        owner = harvester._get_source_owner(source, 'job')
+
+        assert owner['owner_org'] == org['id']
+        assert owner['organization'] == 'test_org'
+        assert harvester._get_source_owner(source, 'job') is owner
+        assert harvester._get_source_owner(source, 'next_job') is not owner
+        owner = harvester._get_source_owner(source, 'next_job')
+        source.config = '{"update_all": true}'
+        assert harvester._get_source_owner(source, 'next_job') is not owner
+
+
+class FakeWriter(object):
+    """A HarvestObjectWriter that only keeps the objects."""
+
+    def __init__(self):
+        self.objects = []
+
+    def add(self, obj):
+        self.objects.append(obj)
+        return obj.id
+
+    def flush(self):
+        pass
+
+
+class BulkHarvester(NextGEOSSHarvester):
+    supports_bulk_import = True
+
+    def __init__(self, source_config):
+        self.source_config = source_config
+        self.batches = []
+
+    def _import_harvest_objects(self, harvest_objects):
+        self.batches.append(list(harvest_objects))
+
+
+class TestBulkImport(DatabaseTest):
+    """Tests for the bulk import mode."""
+
+    def test_batches(self):
+        harvester = BulkHarvester({'bulk_import': True,
+                                   'bulk_import_batch_size': 2})
+        objects = [HarvestObject(guid=str(i)) for i in range(5)]
+        ids = [harvester._save_harvest_object(obj) for obj in objects]
+        harvester._flush_harvest_objects()
+
+        assert ids == [None] * 5
+        assert harvester.batches == [objects[:2], objects[2:4], objects[4:]]
+
+    def test_pages(self):
+        harvester = BulkHarvester({'bulk_import': True,
+                                   'bulk_import_batch_size': 4})
+        objects = [HarvestObject(guid=str(i)) for i in range(5)]
+        # Pages of 3 objects, flushed as the crawl loops do
+        for page in (objects[:3], objects[3:]):
+            for obj in page:
+                harvester._save_harvest_object(obj)
+            harvester._flush_harvest_objects(final=False)
+        harvester._flush_harvest_objects()
+
+        # The batches are not cut at the end of each page
+        assert harvester.batches == [objects[:4], objects[4:]]
+
+    def test_not_supported(self):
+        harvester = BulkHarvester({'bulk_import': True})
+        harvester.supports_bulk_import = False
+        harvester.object_writer = FakeWriter()
+
+        harvester._save_harvest_object(HarvestObject(guid='a'))
+
+        assert harvester.batches == []
+        assert len(harvester.object_writer.objects) == 1
+
+    def test_existing_dataset(self):
+        config = {'bulk_import': True}
+        job = self.create_harvest_job(config)
+        harvester = DictHarvester()
+        harvester.job = job
+        harvester.source_config = config
+
+        def gather(contents):
+            objects = [HarvestObject(guid=unicode(uuid.uuid4()), job=job,  # noqa: F821, E501
+                                     content=content,
+                                     extras=[HOExtra(key='status',
+                                                     value='new')])
+                       for content in contents]
+            for harvest_object in objects:
+                harvester._save_harvest_object(harvest_object)
+            harvester._flush_harvest_objects()
+            return objects
+
+        gather([make_content('a')])
+        objects = gather([make_content('a', 'New notes'), make_content('b')])
+
+        assert [harvest_object.report_status for harvest_object in objects] \
+            == ['updated', 'added']
+        assert Package.by_name(u'a').notes == 'New notes'
+        assert objects[0].package_id == Package.by_name(u'a').id
+        assert objects[0].current
+        assert Package.by_name(u'b') is not None
+
+    def test_validate_config(self):
+        harvester = NextGEOSSHarvester()
+        harvester._validate_bulk_import_config({'bulk_import': True})
+
+        for config_obj in ({'bulk_import': 'yes'},
+                           {'bulk_import_batch_size': 0},
+                           {'parse_workers': -1}):
+            assert_raises(ValueError, harvester._validate_bulk_import_config,
+                          config_obj)
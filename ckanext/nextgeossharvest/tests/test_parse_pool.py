@@ -0,0 +1,53 @@
+"""Tests for parse_pool.py."""
+
+import os
+
+from ckanext.nextgeossharvest.lib.parse_pool import ParsePool
+
+
+class Parser(object):
+    """Stands for a harvester, whose bound method runs in the workers."""
+
+    def __init__(self):
+        self.parent = os.getpid()
+
+    def parse(self, content):
+        if content == 'bad':
+            raise ValueError('cannot parse {}'.format(content))
+        return {'name': content.upper(), 'forked': os.getpid() != self.parent}
+
+
+class TestParsePool(object):
+    """Tests for the ParsePool class."""
+
+    def test_in_process(self):
+        pool = ParsePool(Parser().parse)
+        results = pool.map(['a', 'b'])
+        pool.close()
+
+        assert results == [(True, {'name': 'A', 'forked': False}),
+                           (True, {'name': 'B', 'forked': False})]
+
+    def test_workers_keep_order(self):
+        contents = ['entry{}'.format(i) for i in range(50)]
+        pool = ParsePool(Parser().parse, workers=3)
+        try:
+            results = pool.map(contents)
+            # The pool is reused for the next batch
+            results += pool.map(contents)
+        finally:
+            pool.close()
+
+        assert [result['name'] for _, result in results] == \
+            [content.upper() for content in contents] * 2
+        assert all(parsed and result['forked'] for parsed, result in results)
+
+    def test_errors(self):
+        for workers in (0, 2):
+            pool = ParsePool(Parser().parse, workers=workers)
+            results = pool.map(['a', 'bad', 'c'])
+            pool.close()
+
+            assert [parsed for parsed, _ in results] == [True, False, True]
+            assert 'ValueError: cannot parse bad' in results[1][1]
+            assert results[2][1]['name'] == 'C'
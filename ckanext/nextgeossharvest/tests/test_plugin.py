@@ -0,0 +1,34 @@
+"""Tests for plugin.py."""
+
+from ckanext.nextgeossharvest import plugin
+from ckanext.nextgeossharvest.lib import extras_codec
+
+
+class TestBeforeIndex(object):
+    """Tests for the before_index() method."""
+
+    def test_ignored_fields(self):
+        extras = [{'key': 'StartTime', 'value': '2018-01-01'},
+                  {'key': 'Instrument', 'value': 'GOME-2'}]
+        pkg_dict = {'dataset_type': 'dataset',
+                    'collection_id': 'METOP_A_GOME2_O3',
+                    'extras_StartTime': '2018-01-01',
+                    'dataset_extra': extras_codec.encode(extras)}
+
+        indexed = plugin.NextgeossharvestPlugin().before_index(pkg_dict)
+
+        assert 'StartTime' not in indexed
+        assert 'extras_StartTime' not in indexed
+        assert indexed['Instrument'] == 'GOME-2'
+
+    def test_unknown_collection(self):
+        pkg_dict = {'dataset_type': 'dataset',
+                    'collection_id': 'UNKNOWN_COLLECTION',
+                    'StartTime': '2018-01-01'}
+
+        for _ in range(2):
+            indexed = plugin.NextgeossharvestPlugin().before_index(
+                dict(pkg_dict))
+
+        assert indexed == pkg_dict
+        assert plugin.unknown_collections['UNKNOWN_COLLECTION'] == 2
@@ -0,0 +1,110 @@
+"""Tests for prefetch.py."""
+
+import threading
+import time
+
+from nose.tools import assert_raises
+
+from ckanext.nextgeossharvest.lib.prefetch import merge, ordered_map, prefetch
+
+
+class TestPrefetch(object):
+    """Tests for the prefetch() function."""
+
+    def test_order(self):
+        for depth in (0, 1, 3):
+            assert list(prefetch(iter(range(10)), depth)) == range(10)
+
+    def test_background_thread(self):
+        threads = []
+
+        def produce():
+            for i in range(3):
+                threads.append(threading.current_thread())
+                yield i
+
+        assert list(prefetch(produce(), 1)) == [0, 1, 2]
+        assert threading.current_thread() not in threads
+
+    def test_exception(self):
+        def produce():
+            yield 1
+            raise ValueError('broken page')
+
+        pages = prefetch(produce(), 2)
+        assert next(pages) == 1
+        assert_raises(ValueError, next, pages)
+
+    def test_early_stop(self):
+        produced = []
+
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        pages = prefetch(produce(), 2)
+        assert next(pages) == 0
+        pages.close()
+
+        assert len(produced) < 100
+
+
+class TestMerge(object):
+    """Tests for the merge() function."""
+
+    def test_all_items(self):
+        for depth in (0, 1, 2):
+            iterables = [iter(range(0, 5)), iter(range(5, 8)), iter([])]
+            assert sorted(merge(iterables, depth)) == range(8)
+
+    def test_concurrent(self):
+        # Each producer waits for the other one, so this only finishes if
+        # they run at the same time.
+        events = [threading.Event(), threading.Event()]
+
+        def produce(mine, other):
+            mine.set()
+            assert other.wait(5)
+            yield mine
+
+        items = list(merge([produce(events[0], events[1]),
+                            produce(events[1], events[0])], 1))
+        assert len(items) == 2
+
+
+class TestOrderedMap(object):
+    """Tests for the ordered_map() function."""
+
+    def test_order(self):
+        def slow_square(i):
+            # The first items take the longest
+            time.sleep((10 - i) * 0.005)
+            return i * i
+
+        for workers in (0, 1, 4):
+            assert list(ordered_map(slow_square, range(10), workers)) == \
+                [i * i for i in range(10)]
+
+    def test_concurrent(self):
+        # Each item waits for the other one, so this only finishes if they
+        # are computed at the same time.
+        events = [threading.Event(), threading.Event()]
+
+        def wait(i):
+            events[i].set()
+            assert events[1 - i].wait(5)
+            return i
+
+        assert list(ordered_map(wait, [0, 1], 2)) == [0, 1]
+
+    def test_exception(self):
+        def fail(i):
+            if i == 2:
+                raise ValueError('item 2')
+            return i
+
+        results = ordered_map(fail, range(5), 2)
+        assert next(results) == 0
+        assert next(results) == 1
+        assert_raises(ValueError, next, results)
@@ -0,0 +1,186 @@
+"""Tests for rate_limiter.py."""
+
+from email.utils import formatdate
+import os
+import tempfile
+import time
+
+from ckanext.nextgeossharvest.lib import rate_limiter
+
+
+class FakeClock(object):
+    """A clock that only moves when the limiter sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def make_limiter(requests_per_second=1.0, burst=1):
+    clock = FakeClock()
+    limiter = rate_limiter.RateLimiter(requests_per_second, burst,
+                                       clock=clock.time, sleep=clock.sleep)
+    return limiter, clock
+
+
+class TestRateLimiter(object):
+    """Tests for the RateLimiter class."""
+
+    def test_rate(self):
+        limiter, clock = make_limiter(requests_per_second=2.0)
+        for _ in range(5):
+            limiter.acquire()
+
+        assert abs(clock.slept - 2.0) < 1e-9
+
+    def test_burst(self):
+        limiter, clock = make_limiter(requests_per_second=1.0, burst=3)
+        for _ in range(3):
+            limiter.acquire()
+        assert clock.slept == 0
+
+        limiter.acquire()
+        assert abs(clock.slept - 1.0) < 1e-9
+
+    def test_retry_after(self):
+        limiter, clock = make_limiter(requests_per_second=4.0)
+        limiter.acquire()
+        limiter.update(FakeResponse(429, {'Retry-After': '30'}))
+        limiter.acquire()
+
+        assert abs(clock.slept - 30.0) < 1e-9
+        assert limiter.rate == 2.0
+
+    def test_backoff_and_recover(self):
+        limiter, _ = make_limiter(requests_per_second=8.0)
+        for _ in range(5):
+            limiter.update(FakeResponse(503))
+        assert limiter.rate == 1.0
+
+        for _ in range(20):
+            limiter.update(FakeResponse(200))
+        assert limiter.rate == 8.0
+
+
+class TestParseRetryAfter(object):
+    """Tests for the parse_retry_after() function."""
+
+    def test_seconds(self):
+        assert rate_limiter.parse_retry_after('120') == 120.0
+
+    def test_http_date(self):
+        value = formatdate(time.time() + 60, usegmt=True)
+        assert 55 < rate_limiter.parse_retry_after(value) <= 60
+
+    def test_invalid(self):
+        assert rate_limiter.parse_retry_after(None) is None
+        assert rate_limiter.parse_retry_after('soon') is None
+
+
+class TestSharedRateLimiter(object):
+    """Tests for the SharedRateLimiter class."""
+
+    def setup(self):
+        self.path = tempfile.mktemp(suffix='.rate')
+
+    def teardown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def make_limiters(self, count, requests_per_second=1.0, burst=1):
+        clock = FakeClock()
+        limiters = [rate_limiter.SharedRateLimiter(
+            self.path, requests_per_second, burst,
+            clock=clock.time, sleep=clock.sleep) for _ in range(count)]
+        return limiters, clock
+
+    def test_shared_bucket(self):
+        (first, second), clock = self.make_limiters(2, burst=2)
+        first.acquire()
+        second.acquire()
+        assert clock.slept == 0
+
+        # Both tokens have been taken, whichever limiter asks
+        first.acquire()
+        assert abs(clock.slept - 1.0) < 1e-9
+        second.acquire()
+        assert abs(clock.slept - 2.0) < 1e-9
+
+    def test_shared_backoff(self):
+        (first, second), clock = self.make_limiters(2, requests_per_second=4)
+        first.acquire()
+        first.backoff(30)
+        second.acquire()
+
+        assert clock.slept >= 30
+        assert second.rate == 2.0
+
+    def test_shared_path(self):
+        assert rate_limiter.get_rate_limiter(
+            'shared-test', shared=True).path == \
+            rate_limiter.get_shared_path('shared-test')
+        assert not isinstance(rate_limiter.get_rate_limiter('shared-test'),
+                              rate_limiter.SharedRateLimiter)
+
+        directory = tempfile.mkdtemp()
+        try:
+            assert rate_limiter.get_rate_limiter(
+                'shared-test', shared=True, directory=directory).path == \
+                os.path.join(directory, 'nextgeossharvest-shared-test.rate')
+        finally:
+            os.rmdir(directory)
+
+    def test_recover_at_max_rate(self):
+        (first, second), clock = self.make_limiters(2, requests_per_second=4)
+        first.acquire()
+        first.backoff()
+        second.acquire()
+
+        # The rate of the file is below the configured one
+        second.recover()
+        assert second.rate == 2.5
+        second.rate = second.max_rate
+        os.utime(self.path, (0, 0))
+
+        # At the configured rate, the file is neither locked nor rewritten
+        second.recover()
+        assert os.stat(self.path).st_mtime == 0
+
+    def test_unopenable_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            clock = FakeClock()
+            limiter = rate_limiter.SharedRateLimiter(
+                os.path.join(directory, 'missing', 'test.rate'), 1.0, 1,
+                clock=clock.time, sleep=clock.sleep)
+            limiter.acquire()
+            limiter.acquire()
+            assert abs(clock.slept - 1.0) < 1e-9
+        finally:
+            os.rmdir(directory)
+
+
+class TestSettings(object):
+    """Tests for the validation of the rate limit settings."""
+
+    def test_positive_rate(self):
+        for requests_per_second in (0, -1):
+            try:
+                rate_limiter.RateLimiter(requests_per_second)
+            except ValueError:
+                pass
+            else:
+                assert False, requests_per_second
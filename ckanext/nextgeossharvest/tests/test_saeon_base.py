@@ -0,0 +1,129 @@
+"""Tests for saeon_base.py."""
+
+import os
+from datetime import timedelta
+
+from ckanext.nextgeossharvest.harvesters.saeon import SAEONHarvester
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+BASE_URL = 'http://csag.example'
+RECORD_URL = BASE_URL + '/pycsw/?service=CSW&request=GetRecordById&version=2.0.2&id={}&mode=opensearch'  # noqa: E501
+
+
+def read_response(name):
+    with open(os.path.join(directory, 'saeon_responses', name)) as f:
+        return f.read()
+
+
+class CountingLimiter(object):
+    """A rate limiter that only counts the requests."""
+
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.text = content
+        self.elapsed = timedelta(seconds=0.1)
+
+
+class FakeSession(object):
+    """A session that answers the URLs of `responses`, and 500 otherwise."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url not in self.responses:
+            return FakeResponse(500, 'Internal Server Error')
+        return FakeResponse(200, self.responses[url])
+
+
+class FakeSAEONHarvester(SAEONHarvester):
+    """A SAEONHarvester that reads its replies from `responses`."""
+
+    def __init__(self, responses):
+        self.session = FakeSession(responses)
+        self.limiter = CountingLimiter()
+        self.gather_errors = []
+        self.job = None
+        self._entry_time_and_author = {}
+
+    def _get_rate_limiter(self, provider=None):
+        return self.limiter
+
+    def _get_http_session(self, provider=None):
+        return self.session
+
+    def _save_gather_error(self, message, job):
+        self.gather_errors.append(message)
+
+
+class TestGetEntriesTimeAndAuthor(object):
+    """Tests for the _get_entries_time_and_author() method."""
+
+    def test_batch(self):
+        identifiers = ['CSAG.CMIP5.pr', 'CSAG.CMIP5.tas', 'CSAG.CMIP5.tasmax']
+        batch_url = RECORD_URL.format(','.join(identifiers))
+        single_url = RECORD_URL.format('CSAG.CMIP5.tasmax')
+        harvester = FakeSAEONHarvester({
+            batch_url: read_response('records_by_id.xml'),
+            single_url: read_response('record_by_id.xml')})
+
+        extra_contents = harvester._get_entries_time_and_author(
+            BASE_URL, identifiers, 5)
+
+        # The entries of the reply are matched by dc:identifier, or else by
+        # the id of the atom:id URL, and the record missing from it is
+        # requested on its own.
+        assert extra_contents == {
+            'CSAG.CMIP5.pr': {
+                'timerange_start': '1950-01-01T00:00:00.000Z',
+                'timerange_end': '2099-12-31T23:59:59.999Z',
+                'author': 'Climate System Analysis Group'},
+            'CSAG.CMIP5.tas': {
+                'timerange_start': '1960-01-01T00:00:00.000Z',
+                'timerange_end': '2100-12-31T23:59:59.999Z',
+                'author': 'Climate System Analysis Group'},
+            'CSAG.CMIP5.tasmax': {
+                'timerange_start': '1970-01-01T00:00:00.000Z',
+                'timerange_end': '2090-12-31T23:59:59.999Z',
+                'author': 'University of Cape Town'}}
+        assert harvester.session.requested == [batch_url, single_url]
+        assert harvester.limiter.acquired == 2
+        assert harvester.gather_errors == []
+
+        # The results are kept for the rest of the job
+        harvester._get_entries_time_and_author(BASE_URL, identifiers, 5)
+        assert len(harvester.session.requested) == 2
+
+    def test_failed_batch(self):
+        identifiers = ['CSAG.CMIP5.tas', 'CSAG.CMIP5.tasmax']
+        single_url = RECORD_URL.format('CSAG.CMIP5.tasmax')
+        harvester = FakeSAEONHarvester({
+            single_url: read_response('record_by_id.xml')})
+
+        extra_contents = harvester._get_entries_time_and_author(
+            BASE_URL, identifiers, 5)
+
+        # Every record is requested on its own, within the rate limit
+        assert harvester.session.requested == [
+            RECORD_URL.format(','.join(identifiers)),
+            RECORD_URL.format('CSAG.CMIP5.tas'),
+            single_url]
+        assert harvester.limiter.acquired == 3
+        assert extra_contents['CSAG.CMIP5.tas'] == {'timerange_start': None,
+                                                    'timerange_end': None}
+        assert extra_contents['CSAG.CMIP5.tasmax']['author'] == \
+            'University of Cape Town'
+        # Only the record that could not be read at all is a job error
+        assert len(harvester.gather_errors) == 1
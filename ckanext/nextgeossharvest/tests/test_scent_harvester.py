@@ -0,0 +1,81 @@
+"""Tests for the SCENT harvester."""
+
+from ckanext.nextgeossharvest.harvesters.scent import SCENTHarvester
+
+
+class FakeWFS(object):
+    """
+    A WFS whose filters are the lists of matching image IDs and whose
+    server knows the tags of `tagged`.
+    """
+
+    def __init__(self, tagged, fail=False):
+        self.tagged = tagged
+        self.fail = fail
+        self.requests = []
+
+    def set_collection(self, collection):
+        self.collection = collection
+        return True
+
+    def set_filter_equal_to(self, propertyname, value):
+        return [value]
+
+    def set_filter_any_of(self, propertyname, values):
+        return list(values)
+
+    def get_request(self, constraint=None, **kwargs):
+        return 'https://wfs.example/{}?image_id={}'.format(self.collection,
+                                                           constraint[0])
+
+    def make_request(self, max_dataset=100, sort_by=None, start_index=0,
+                     constraint=None):
+        self.requests.append(constraint)
+        if self.fail:
+            raise IOError('WFS unavailable')
+        # Two tags of the same image, which come back as two features
+        return {'features': [{'properties': {'image_id': image_id,
+                                             'tag': tag}}
+                             for image_id in constraint
+                             if image_id in self.tagged
+                             for tag in ('tree', 'water')]}
+
+
+class TestGetTagUrls(object):
+    """Tests for the _get_tag_urls() method."""
+
+    image_ids = ['image_1', 'image_2', 'image_3']
+
+    def get_tag_urls(self, wfs, skip_untagged):
+        harvester = SCENTHarvester()
+        harvester.source_config = {'skip_untagged': skip_untagged}
+        return harvester._get_tag_urls(wfs, 'geomesa:tags', self.image_ids)
+
+    def test_every_image(self):
+        wfs = FakeWFS(tagged={'image_2'})
+
+        tag_urls = self.get_tag_urls(wfs, False)
+
+        assert sorted(tag_urls) == self.image_ids
+        assert tag_urls['image_2'] == \
+            'https://wfs.example/geomesa:tags?image_id=image_2'
+        assert wfs.requests == []
+
+    def test_skip_untagged(self):
+        wfs = FakeWFS(tagged={'image_1', 'image_3'})
+
+        tag_urls = self.get_tag_urls(wfs, True)
+
+        # The tags of the page are requested at once and mapped back to
+        # the images by image_id
+        assert wfs.requests == [self.image_ids]
+        assert tag_urls == {
+            'image_1': 'https://wfs.example/geomesa:tags?image_id=image_1',
+            'image_3': 'https://wfs.example/geomesa:tags?image_id=image_3'}
+
+    def test_failed_request(self):
+        wfs = FakeWFS(tagged=set(), fail=True)
+
+        tag_urls = self.get_tag_urls(wfs, True)
+
+        assert sorted(tag_urls) == self.image_ids
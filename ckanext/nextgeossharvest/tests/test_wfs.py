@@ -0,0 +1,38 @@
+"""Tests for wfs.py."""
+
+from owslib.etree import etree
+
+from ckanext.nextgeossharvest.lib.wfs import WFS
+
+
+def parse_filter(filterxml):
+    """Return the property names and literals of a filter, in order."""
+    root = etree.fromstring(filterxml)
+    return ([element.text for element in root.iter()
+             if element.tag.endswith('PropertyName')],
+            [element.text for element in root.iter()
+             if element.tag.endswith('Literal')])
+
+
+class TestSetFilterAnyOf(object):
+    """Tests for the set_filter_any_of() method."""
+
+    def setup(self):
+        # The filters do not need a connection to the server
+        self.wfs = WFS.__new__(WFS)
+
+    def test_or(self):
+        filterxml = self.wfs.set_filter_any_of('image_id',
+                                               ['image_1', 'image_2'])
+
+        assert etree.fromstring(filterxml).tag.endswith('Or')
+        assert parse_filter(filterxml) == (['image_id', 'image_id'],
+                                           ['image_1', 'image_2'])
+
+    def test_single_value(self):
+        # An Or needs at least two operands, so one value is a single match
+        filterxml = self.wfs.set_filter_any_of('image_id', ['image_1'])
+
+        assert filterxml == self.wfs.set_filter_equal_to('image_id',
+                                                         'image_1')
+        assert parse_filter(filterxml) == (['image_id'], ['image_1'])
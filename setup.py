@@ -111,6 +111,8 @@ setup(
         vito=ckanext.nextgeossharvest.harvesters:VITO_Harvest
         noa_epidemics=ckanext.nextgeossharvest.harvesters:NoaEpidemicsHarvester
 
+        [paste.paster_command]
+        nextgeoss-extras=ckanext.nextgeossharvest.commands:DatasetExtraCommand
 
         [babel.extractors]
         ckan = ckan.lib.extract:extract_ckan